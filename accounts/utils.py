@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta, time
 from typing import Iterable, List, Dict, Any, Optional, Tuple
-import requests
 from django.conf import settings
+from market.integrations import http_client
 from django.utils import timezone
 from .models import *
 
@@ -82,7 +82,7 @@ def kakao_address_search(query: str, size: int = 20) -> List[Dict[str, Any]]:
         size = 20
     size = max(1, min(size, 30))
 
-    r = requests.get(url, headers=headers, params={"query": query, "size": size}, timeout=5)
+    r = http_client.get(url, headers=headers, params={"query": query, "size": size}, timeout=5)
     if r.status_code != 200:
         raise Exception(f"Kakao API {r.status_code}: {r.text}")
 
@@ -14,10 +14,18 @@ from point.models import UserPoint
 
 # =============================================================================
 # A. 외부 클라이언트/설정
-#    - OpenAI 클라이언트 초기화
+#    - OpenAI 클라이언트(첫 사용 시 생성)
 # =============================================================================
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+_openai_client: Optional[OpenAI] = None
+
+
+def get_openai_client() -> OpenAI:
+    """레시피/재료 추출용 OpenAI 클라이언트. 처음 쓸 때 만들어 재사용."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    return _openai_client
 
 
 # =============================================================================
@@ -338,7 +346,7 @@ def _safe_json(content: str):
 # ===== F-3. 대화형 요리 제안 (대화 기록 기반) ================================
 
 def gpt_conversational_cook(chat_history):
-    response = client.chat.completions.create(
+    response = get_openai_client().chat.completions.create(
         model="gpt-4o",
         messages=chat_history,
         temperature=0.7,
@@ -375,7 +383,7 @@ def extract_ingredients_from_recipe(recipe_name):
     )
 
     try:
-        response = client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model="gpt-4o", 
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
@@ -432,7 +440,7 @@ def extract_ingredients_from_recipe_v2(recipe_name, allowed_ingredients=None, mo
     ]
 
     try:
-        res = client.chat.completions.create(
+        res = get_openai_client().chat.completions.create(
             model=model,
             messages=messages,
             temperature=0.2,
@@ -527,7 +535,7 @@ def call_gpt(selected_names: List[str], followup: str = "") -> str:
         }
         user_msg = {"role": "user", "content": prompt}
 
-        resp = client.chat.completions.create(
+        resp = get_openai_client().chat.completions.create(
             model="gpt-4o",
             temperature=0.2,
             max_tokens=700,
@@ -2,6 +2,7 @@ from django.shortcuts import render, redirect
 from .utils import *
 from .models import *
 from market.models import ShoppingList, ShoppingListIngredient
+from market.services.precompute import schedule_precompute
 from point.models import UserPoint
 from django.contrib import messages
 from urllib.parse import urlencode
@@ -275,6 +276,9 @@ def confirm_shopping_list(request):
 
     request.session['shopping_list_id'] = shopping_list.id
 
+    # 다음 화면(가까운 마켓)용 추천/경로를 백그라운드에서 미리 계산
+    schedule_precompute(request.user)
+
     items_count = cart_items_count(request.user)
     total_point = get_user_total_point(request.user)
 
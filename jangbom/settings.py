@@ -55,6 +55,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'market.middleware.RouteMemoMiddleware',
 ]
 
 ROOT_URLCONF = 'jangbom.urls'
@@ -141,4 +142,16 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 KAKAO_REST_API_KEY = os.getenv("KAKAO_REST_API_KEY")
 KAKAO_JS_API_KEY = os.getenv("KAKAO_JS_API_KEY")
-TMAP_API_KEY = os.getenv("TMAP_API_KEY")
\ No newline at end of file
+TMAP_API_KEY = os.getenv("TMAP_API_KEY")
+
+# Cache
+# 기본은 프로세스별 LocMemCache. 워커가 여러 개면 REDIS_URL 로 공유 캐시를 지정해야
+# 매칭 결과/랭킹 선계산/경로 메모를 워커끼리 재사용(redis 패키지 필요).
+# 재고/장바구니 버전은 DB 에서 읽으므로(market.services.stock_events) 어느 쪽이든 낡은 결과는 내지 않음.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        }
+    }
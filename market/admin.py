@@ -1,10 +1,172 @@
-from django.contrib import admin
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
 from .models import *
+from .services.stock_import import StockFeedError, format_of, import_stock_feed
+from .services.stock_matrix import apply_diff, build_matrix, parse_cells
+
+
+
+# =============================================================================
+# 목록: __str__ 이 참조하는 FK 는 list_select_related 로 한 번에(행마다 추가 쿼리 방지),
+#       FK 입력은 raw_id_fields(전체 선택지 렌더링 방지)
+# =============================================================================
+@admin.register(Market)
+class MarketAdmin(admin.ModelAdmin):
+    list_display = ("name", "market_type", "dong", "phone", "open_time", "close_time")
+    list_filter = ("market_type",)
+    search_fields = ("name", "address")
+
+
+@admin.register(ShoppingList)
+class ShoppingListAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "market", "created_at", "is_done")
+    list_filter = ("is_done",)
+    list_select_related = ("user", "market")
+    raw_id_fields = ("user", "market")
+    search_fields = ("user__username",)
+
+
+@admin.register(ShoppingListIngredient)
+class ShoppingListIngredientAdmin(admin.ModelAdmin):
+    list_display = ("shopping_list", "ingredient")
+    list_select_related = ("shopping_list__user", "ingredient")
+    raw_id_fields = ("shopping_list", "ingredient")
+    search_fields = ("ingredient__name",)
+
+
+@admin.register(ActivityLog)
+class ActivityLogAdmin(admin.ModelAdmin):
+    list_display = ("user", "shopping_list", "visited_at", "point_earned")
+    list_select_related = ("user", "shopping_list__user")
+    raw_id_fields = ("user", "shopping_list")
+
+
+@admin.register(NearbyPlace)
+class NearbyPlaceAdmin(admin.ModelAdmin):
+    list_display = ("name", "market", "category", "distance_m")
+    list_filter = ("category",)
+    list_select_related = ("market",)
+    raw_id_fields = ("market",)
+    search_fields = ("name", "market__name")
+
+
+@admin.register(MarketFilterSetting)
+class MarketFilterSettingAdmin(admin.ModelAdmin):
+    list_display = ("user", "distance_preference", "type_preference", "updated_at")
+    list_filter = ("distance_preference", "type_preference")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+
+
+@admin.register(RouteCache)
+class RouteCacheAdmin(admin.ModelAdmin):
+    list_display = ("origin_cell", "market", "distance_m", "duration_s", "fetched_at")
+    list_select_related = ("market",)
+    raw_id_fields = ("market",)
+    search_fields = ("origin_cell",)
+
+
+@admin.register(StockChange)
+class StockChangeAdmin(admin.ModelAdmin):
+    """재고 변경 로그: 조회 전용(추가 전용 로그라 수정/삭제 불가)."""
+    list_display = ("seq", "market_id", "ingredient_id", "action", "changed_at")
+    list_filter = ("action",)
+    search_fields = ("=market__id",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# =============================================================================
+# 재고: 피드 파일 업로드 / 매트릭스 편집으로 일괄 반영
+# =============================================================================
+class StockFeedUploadForm(forms.Form):
+    feed = forms.FileField(help_text="CSV(market_id,ingredient) 또는 JSONL, 마켓별로 묶인 전체 재고 목록")
+    dry_run = forms.BooleanField(required=False, help_text="변경 건수만 확인")
+
+
+@admin.register(MarketStock)
+class MarketStockAdmin(admin.ModelAdmin):
+    change_list_template = "admin/market/marketstock/change_list.html"
+    list_display = ("market", "ingredient", "last_updated")
+    list_filter = ("market__market_type",)
+    list_select_related = ("market", "ingredient")
+    raw_id_fields = ("market", "ingredient")
+    search_fields = ("market__name", "ingredient__name")
+
+    def get_urls(self):
+        return [
+            path("import/", self.admin_site.admin_view(self.import_feed_view), name="market_marketstock_import"),
+            path("matrix/", self.admin_site.admin_view(self.matrix_view), name="market_marketstock_matrix"),
+        ] + super().get_urls()
+
+    def _can_bulk_edit(self, request) -> bool:
+        if not self.has_add_permission(request) or not self.has_delete_permission(request):
+            messages.error(request, "재고 추가/삭제 권한이 필요합니다.")
+            return False
+        return True
+
+    def import_feed_view(self, request):
+        if not self._can_bulk_edit(request):
+            return redirect("admin:market_marketstock_changelist")
+
+        form = StockFeedUploadForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["feed"]
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+            try:
+                report = import_stock_feed(stream, format_of(upload.name), dry_run=form.cleaned_data["dry_run"])
+            except StockFeedError as e:
+                messages.error(request, f"피드 오류: {e}")
+            else:
+                messages.success(request, report.summary())
+                return redirect("admin:market_marketstock_changelist")
+
+        return TemplateResponse(request, "admin/market/marketstock/import_feed.html", {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "form": form,
+            "title": "재고 피드 업로드",
+        })
+
+    def matrix_view(self, request):
+        if not self._can_bulk_edit(request):
+            return redirect("admin:market_marketstock_changelist")
+
+        if request.method == "POST":
+            try:
+                add = parse_cells(request.POST.getlist("add"))
+                remove = parse_cells(request.POST.getlist("remove"))
+            except ValueError:
+                messages.error(request, "잘못된 변경 목록입니다.")
+            else:
+                added, removed = apply_diff(add, remove)
+                messages.success(request, f"재고 +{added} / -{removed}")
+            return redirect(request.get_full_path())
 
-admin.site.register(Market)
-admin.site.register(MarketStock)
-admin.site.register(ShoppingList)
-admin.site.register(ShoppingListIngredient)
-admin.site.register(ActivityLog)
-admin.site.register(NearbyPlace)
-admin.site.register(MarketFilterSetting)
\ No newline at end of file
+        params = request.GET
+        matrix = build_matrix(
+            q=params.get("q", "").strip(),
+            market_q=params.get("mq", "").strip(),
+            page=params.get("p", 1),
+            market_page=params.get("mp", 1),
+        )
+        return TemplateResponse(request, "admin/market/marketstock/stock_matrix.html", {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "matrix": matrix,
+            "params": params,
+            "title": "재고 매트릭스",
+        })
@@ -0,0 +1,98 @@
+"""
+외부 API(TMAP, Kakao) 공용 HTTP 클라이언트.
+
+- httpx 기반, 호스트별 클라이언트(커넥션 풀)를 프로세스에서 재사용 → 매 호출 TCP/TLS 핸드셰이크 제거
+- 호스트별 동시 연결/keep-alive 제한(OUTBOUND_HTTP_* 설정)
+- h2 패키지가 설치돼 있으면 HTTP/2 사용
+- 동기(request/get/post)와 비동기(arequest/aget/apost) 진입점 제공
+"""
+import asyncio
+import importlib.util
+import threading
+import weakref
+from typing import Dict
+
+import httpx
+from django.conf import settings
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_TIMEOUT_S = getattr(settings, "OUTBOUND_HTTP_TIMEOUT_S", 10)
+MAX_CONNECTIONS_PER_HOST = getattr(settings, "OUTBOUND_HTTP_MAX_CONNECTIONS_PER_HOST", 10)
+MAX_KEEPALIVE_PER_HOST = getattr(settings, "OUTBOUND_HTTP_MAX_KEEPALIVE_PER_HOST", 5)
+KEEPALIVE_EXPIRY_S = getattr(settings, "OUTBOUND_HTTP_KEEPALIVE_EXPIRY_S", 30)
+
+_clients: Dict[str, httpx.Client] = {}
+# 이벤트 루프별 {호스트: AsyncClient} (루프가 사라지면 함께 정리)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections=MAX_KEEPALIVE_PER_HOST,
+        keepalive_expiry=KEEPALIVE_EXPIRY_S,
+    )
+
+
+def _host_of(url: str) -> str:
+    u = httpx.URL(url)
+    return f"{u.scheme}://{u.netloc.decode()}"
+
+
+def get_client(url: str) -> httpx.Client:
+    """url 호스트 전용 동기 클라이언트(없으면 생성)."""
+    host = _host_of(url)
+    client = _clients.get(host)
+    if client is None:
+        with _lock:
+            client = _clients.get(host)
+            if client is None:
+                client = httpx.Client(http2=HTTP2_AVAILABLE, limits=_limits(), timeout=DEFAULT_TIMEOUT_S)
+                _clients[host] = client
+    return client
+
+
+def get_async_client(url: str) -> httpx.AsyncClient:
+    """url 호스트 + 현재 이벤트 루프 전용 비동기 클라이언트(없으면 생성)."""
+    per_loop = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    host = _host_of(url)
+    client = per_loop.get(host)
+    if client is None:
+        client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=_limits(), timeout=DEFAULT_TIMEOUT_S)
+        per_loop[host] = client
+    return client
+
+
+def request(method: str, url: str, **kwargs) -> httpx.Response:
+    return get_client(url).request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> httpx.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> httpx.Response:
+    return request("POST", url, **kwargs)
+
+
+async def arequest(method: str, url: str, **kwargs) -> httpx.Response:
+    return await get_async_client(url).request(method, url, **kwargs)
+
+
+async def aget(url: str, **kwargs) -> httpx.Response:
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> httpx.Response:
+    return await arequest("POST", url, **kwargs)
+
+
+def close_clients() -> None:
+    """동기 클라이언트 전부 닫기(테스트/벤치마크 정리용). 비동기 클라이언트는 루프 종료와 함께 버림."""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _async_clients.clear()
@@ -1,9 +1,9 @@
-import requests
 from django.conf import settings
+from . import http_client
 
 TMAP_PEDESTRIAN_URL = "https://apis.openapi.sk.com/tmap/routes/pedestrian?version=1"
 
-def get_pedestrian_route(start_lat, start_lng, end_lat, end_lng):
+def get_pedestrian_route(start_lat, start_lng, end_lat, end_lng, timeout=10):
     headers = {
         "appKey": settings.TMAP_API_KEY,
         "Accept": "application/json",
@@ -15,7 +15,7 @@ def get_pedestrian_route(start_lat, start_lng, end_lat, end_lng):
         "reqCoordType": "WGS84GEO", "resCoordType": "WGS84GEO",
         "startName": "출발", "endName": "도착", "searchOption": "0",
     }
-    r = requests.post(TMAP_PEDESTRIAN_URL, headers=headers, json=body, timeout=10)
+    r = http_client.post(TMAP_PEDESTRIAN_URL, headers=headers, json=body, timeout=timeout)
     r.raise_for_status()
     data = r.json()
 
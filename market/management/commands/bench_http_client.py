@@ -0,0 +1,89 @@
+import asyncio
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from django.core.management.base import BaseCommand
+
+from market.integrations import http_client
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """TMAP/Kakao 대신 응답하는 로컬 스텁 (keep-alive 지원)."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = b'{"features": []}'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+def _percentiles(samples_ms):
+    samples_ms = sorted(samples_ms)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1] if len(samples_ms) >= 20 else samples_ms[-1]
+    return statistics.median(samples_ms), p95
+
+
+class Command(BaseCommand):
+    help = "로컬 스텁 서버로 1회성 요청(cold)과 공용 풀 클라이언트(pooled)의 지연 비교"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=5, help="비동기 측정 동시 요청 수")
+
+    def handle(self, *args, **opts):
+        n = opts["requests"]
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/routes"
+
+        try:
+            cold = []
+            for _ in range(n):
+                t0 = time.perf_counter()
+                httpx.get(url, timeout=5)  # 매번 새 연결(기존 requests.get 와 같은 방식)
+                cold.append((time.perf_counter() - t0) * 1000)
+
+            http_client.get(url)  # 풀 예열
+            pooled = []
+            for _ in range(n):
+                t0 = time.perf_counter()
+                http_client.get(url)
+                pooled.append((time.perf_counter() - t0) * 1000)
+
+            async def run_async():
+                sem = asyncio.Semaphore(opts["concurrency"])
+
+                async def one():
+                    async with sem:
+                        await http_client.aget(url)
+
+                t0 = time.perf_counter()
+                await asyncio.gather(*(one() for _ in range(n)))
+                elapsed = time.perf_counter() - t0
+                await http_client.get_async_client(url).aclose()
+                return elapsed
+
+            async_total_s = asyncio.run(run_async())
+        finally:
+            http_client.close_clients()
+            server.shutdown()
+
+        for label, samples in (("cold  ", cold), ("pooled", pooled)):
+            p50, p95 = _percentiles(samples)
+            self.stdout.write(f"{label}  p50={p50:6.2f} ms  p95={p95:6.2f} ms  total={sum(samples):8.1f} ms")
+        self.stdout.write(
+            f"async  {n} req / concurrency {opts['concurrency']}: total={async_total_s * 1000:8.1f} ms "
+            f"(http2={'on' if http_client.HTTP2_AVAILABLE else 'off'})"
+        )
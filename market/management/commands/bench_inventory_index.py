@@ -0,0 +1,82 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from market.services.inventory_index import InventoryIndex
+
+
+def _synthetic_stock(n_markets: int, n_ingredients: int, per_market: int, seed: int):
+    rnd = random.Random(seed)
+    ingredient_ids = list(range(1, n_ingredients + 1))
+    return [
+        (mid, iid)
+        for mid in range(1, n_markets + 1)
+        for iid in rnd.sample(ingredient_ids, per_market)
+    ]
+
+
+def _set_based(rows_by_market, name_of, market_ids, cart_names):
+    """기존 match_ingredients 방식: 마켓별 재고 행 → 재료명 set → 장바구니 이름마다 포함 검사."""
+    out = {}
+    for mid in market_ids:
+        stocked = {name_of[iid] for iid in rows_by_market.get(mid, ())}
+        matched = [n for n in sorted(cart_names) if n in stocked]
+        out[mid] = len(matched)
+    return out
+
+
+class Command(BaseCommand):
+    help = "합성 재고 데이터로 비트셋 인덱스(popcount)와 기존 재료명 set 매칭의 요청당 비용 비교"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--markets", type=int, default=2_000)
+        parser.add_argument("--ingredients", type=int, default=1_000)
+        parser.add_argument("--per-market", type=int, default=150, help="마켓당 재고 재료 수")
+        parser.add_argument("--cart", type=int, default=12, help="장바구니 재료 수")
+        parser.add_argument("--candidates", type=int, nargs="+", default=[1, 50, 500],
+                            help="요청당 매칭할 마켓 수")
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(opts["seed"])
+        rows = _synthetic_stock(opts["markets"], opts["ingredients"], opts["per_market"], opts["seed"])
+
+        rows_by_market = {}
+        for mid, iid in rows:
+            rows_by_market.setdefault(mid, []).append(iid)
+        name_of = {iid: f"재료{iid}" for iid in range(1, opts["ingredients"] + 1)}
+
+        index = InventoryIndex(max_age_s=float("inf"))
+        t0 = time.perf_counter()
+        index.load(rows)
+        self.stdout.write(f"index load: {len(rows):,} rows in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        all_markets = list(rows_by_market)
+        for n in opts["candidates"]:
+            requests = [
+                (rnd.sample(all_markets, min(n, len(all_markets))),
+                 rnd.sample(range(1, opts["ingredients"] + 1), opts["cart"]))
+                for _ in range(opts["requests"])
+            ]
+
+            t0 = time.perf_counter()
+            for market_ids, cart in requests:
+                _set_based(rows_by_market, name_of, market_ids, {name_of[i] for i in cart})
+            set_ms = (time.perf_counter() - t0) * 1000 / len(requests)
+
+            t0 = time.perf_counter()
+            for market_ids, cart in requests:
+                index.count_matches(market_ids, cart)
+            bit_ms = (time.perf_counter() - t0) * 1000 / len(requests)
+
+            # 결과 일치 확인
+            market_ids, cart = requests[0]
+            assert _set_based(rows_by_market, name_of, market_ids, {name_of[i] for i in cart}) \
+                == index.count_matches(market_ids, cart)
+
+            self.stdout.write(
+                f"markets/req={n:>5,}  set-based={set_ms:8.3f} ms/req  "
+                f"bitset={bit_ms:8.3f} ms/req  speedup=x{set_ms / bit_ms:,.1f}"
+            )
@@ -0,0 +1,91 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from market.services.ranking import MarketArrays, rank_markets
+from market.services.schedule import WEEKDAYS_KO
+from market.utils import get_distance_km, is_open_now
+
+# 서울 중심 기준 합성 데이터 범위(도)
+_CENTER = (37.55, 126.99)
+_SPREAD = 0.25
+
+
+def _synthetic_rows(n: int, seed: int):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        ot = datetime.time(rnd.choice([0, 7, 9, 10, 22]), 0)
+        ct = datetime.time(rnd.choice([0, 2, 18, 21, 23]), 0)
+        days = ",".join(d for d in WEEKDAYS_KO if rnd.random() < 0.85)
+        rows.append((
+            i + 1,
+            _CENTER[0] + rnd.uniform(-_SPREAD, _SPREAD),
+            _CENTER[1] + rnd.uniform(-_SPREAD, _SPREAD),
+            rnd.choice(["mart", "mart", "trad"]),
+            days, ot, ct,
+        ))
+    return rows
+
+
+def _python_loop(rows, user_lat, user_lng, max_m, match_counts):
+    """기존 nearest_market_view 후보 루프 + 정렬(마트 우선)을 그대로 재현한 기준선."""
+    candidates = []
+    for mid, lat, lng, mtype, days, ot, ct in rows:
+        d_m = int(round(get_distance_km(user_lat, user_lng, lat, lng) * 1000))
+        if not (0 <= d_m <= max_m):
+            continue
+        if not is_open_now(days, ot, ct):
+            continue
+        candidates.append((mid, mtype, d_m, match_counts.get(mid, 0)))
+    candidates.sort(key=lambda t: (0 if t[1] == "mart" else 1, -t[3], t[2]))
+    return candidates[:1]
+
+
+class Command(BaseCommand):
+    help = "합성 마켓 데이터로 벡터화 랭킹 엔진과 기존 파이썬 루프의 요청당 비용 비교"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+        parser.add_argument("--requests", type=int, default=50, help="크기별 측정 요청 수")
+        parser.add_argument("--max-m", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(opts["seed"])
+        max_m = opts["max_m"]
+        now = timezone.now()
+
+        for n in opts["sizes"]:
+            rows = _synthetic_rows(n, opts["seed"])
+            match_counts = {r[0]: rnd.randint(0, 5) for r in rows}
+            arrays = MarketArrays.from_rows(rows)
+            users = [
+                (_CENTER[0] + rnd.uniform(-_SPREAD, _SPREAD), _CENTER[1] + rnd.uniform(-_SPREAD, _SPREAD))
+                for _ in range(opts["requests"])
+            ]
+
+            t0 = time.perf_counter()
+            for lat, lng in users:
+                rank_markets(
+                    arrays, lat, lng,
+                    distance_range=(0, max_m, False), type_pref="mart",
+                    match_counter=lambda ids: {i: match_counts[i] for i in ids},
+                    when=now, k=10,
+                )
+            vec_ms = (time.perf_counter() - t0) * 1000 / len(users)
+
+            # 파이썬 루프는 느리므로 요청 수를 줄여 측정
+            loop_users = users[: max(1, min(len(users), 5))]
+            t0 = time.perf_counter()
+            for lat, lng in loop_users:
+                _python_loop(rows, lat, lng, max_m, match_counts)
+            loop_ms = (time.perf_counter() - t0) * 1000 / len(loop_users)
+
+            self.stdout.write(
+                f"markets={n:>7,}  vectorized={vec_ms:8.2f} ms/req  "
+                f"python-loop={loop_ms:9.2f} ms/req  speedup=x{loop_ms / vec_ms:,.1f}"
+            )
@@ -0,0 +1,94 @@
+import math
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from market.services.pedestrian_graph import NoRoute, PedestrianGraph
+from market.services.spatial_index import M_PER_DEG_LAT, haversine_m
+
+
+def _synthetic_grid(n: int, spacing_m: float, drop: float, seed: int) -> PedestrianGraph:
+    """n x n 골목 격자(좌표 흔들림 + 간선 일부 제거), 서울 도봉구 부근."""
+    rnd = np.random.default_rng(seed)
+    lat0, lng0 = 37.65, 127.02
+    d_lat = spacing_m / M_PER_DEG_LAT
+    d_lng = d_lat / math.cos(math.radians(lat0))
+    ii, jj = np.meshgrid(np.arange(n), np.arange(n), indexing="ij")
+    lat = lat0 + (ii + rnd.uniform(-0.2, 0.2, ii.shape)) * d_lat
+    lng = lng0 + (jj + rnd.uniform(-0.2, 0.2, jj.shape)) * d_lng
+    idx = np.arange(n * n).reshape(n, n)
+    edges = np.concatenate([
+        np.stack([idx[:, :-1].ravel(), idx[:, 1:].ravel()], axis=1),
+        np.stack([idx[:-1, :].ravel(), idx[1:, :].ravel()], axis=1),
+    ])
+    edges = edges[rnd.random(len(edges)) >= drop]
+    return PedestrianGraph.from_edges(lat.ravel(), lng.ravel(), edges)
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+class Command(BaseCommand):
+    help = "오프라인 보행 그래프 질의 지연(스냅 + A*)과 메모리 사용량 측정. --graph 없으면 합성 격자"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--graph", help=".npz 또는 OSM 추출 파일")
+        parser.add_argument("--grid", type=int, default=400, help="합성 격자 한 변 노드 수")
+        parser.add_argument("--spacing", type=float, default=40.0, help="합성 격자 간격(m)")
+        parser.add_argument("--drop", type=float, default=0.15, help="합성 격자에서 제거할 간선 비율")
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--max-km", type=float, default=2.0, help="질의 출발-도착 최대 직선거리(km)")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        if opts["graph"]:
+            graph = PedestrianGraph.load(opts["graph"])
+        else:
+            graph = _synthetic_grid(opts["grid"], opts["spacing"], opts["drop"], opts["seed"])
+        self.stdout.write(
+            f"graph: {graph.n_nodes:,} nodes, {graph.n_edges:,} directed edges, "
+            f"{graph.nbytes / 1e6:.1f} MB ({graph.nbytes / graph.n_nodes:.0f} B/node), "
+            f"load {(time.perf_counter() - t0) * 1000:.0f} ms"
+        )
+
+        rnd = random.Random(opts["seed"])
+        lat_lo, lat_hi = float(graph.lat.min()), float(graph.lat.max())
+        lng_lo, lng_hi = float(graph.lng.min()), float(graph.lng.max())
+        snap_ms, route_ms, detour = [], [], []
+        failed = 0
+        while len(route_ms) + failed < opts["queries"]:
+            a = (rnd.uniform(lat_lo, lat_hi), rnd.uniform(lng_lo, lng_hi))
+            b = (rnd.uniform(lat_lo, lat_hi), rnd.uniform(lng_lo, lng_hi))
+            straight = haversine_m(*a, *b)
+            if straight > opts["max_km"] * 1000:
+                continue
+
+            t1 = time.perf_counter()
+            try:
+                graph.nearest_node(*a)
+            except NoRoute:
+                pass
+            snap_ms.append((time.perf_counter() - t1) * 1000)
+
+            t1 = time.perf_counter()
+            try:
+                r = graph.route(*a, *b)
+            except NoRoute:
+                failed += 1
+                continue
+            route_ms.append((time.perf_counter() - t1) * 1000)
+            if straight > 0:
+                detour.append(r["distance_m"] / straight)
+
+        self.stdout.write(f"snap:  p50={_pct(snap_ms, .5):.3f} ms  p95={_pct(snap_ms, .95):.3f} ms")
+        if route_ms:
+            self.stdout.write(
+                f"route: p50={_pct(route_ms, .5):.2f} ms  p95={_pct(route_ms, .95):.2f} ms  "
+                f"max={max(route_ms):.2f} ms  (n={len(route_ms)}, no route={failed})"
+            )
+            self.stdout.write(f"walk/straight ratio: p50={_pct(detour, .5):.2f}  p95={_pct(detour, .95):.2f}")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from market.services import isochrone
+
+
+class Command(BaseCommand):
+    help = "마켓별 도보 등시선(5/10/15/20분) 셀 집합(MarketIsochrone) 사전 계산"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--market-id", type=int, help="이 마켓만 다시 계산")
+        parser.add_argument("--only-missing", action="store_true", help="이미 계산된 마켓은 건너뜀")
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+
+        if opts["market_id"]:
+            saved = 1 if isochrone.refresh_market(opts["market_id"]) else 0
+        else:
+            def progress(market_id, saved_so_far):
+                if saved_so_far % 100 == 0:
+                    self.stdout.write(f"  market={market_id} saved={saved_so_far}")
+            saved = isochrone.build_all(only_missing=opts["only_missing"], progress=progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{saved} markets saved (bands {list(isochrone.ISOCHRONE_BANDS)} min, "
+            f"cell {isochrone.ISOCHRONE_CELL_DEG}°, {time.perf_counter() - t0:.1f}s)"
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from market.services.pedestrian_graph import GraphError, PedestrianGraph
+
+
+class Command(BaseCommand):
+    help = "OSM 추출 파일 → 오프라인 보행 그래프(.npz) 변환. 결과 경로를 PEDESTRIAN_GRAPH_PATH 로 지정"
+
+    def add_arguments(self, parser):
+        parser.add_argument("osm_path", help=".osm / .osm.gz / .osm.bz2")
+        parser.add_argument("out_path", help="저장할 .npz 경로")
+
+    def handle(self, *args, **opts):
+        if not opts["out_path"].endswith(".npz"):
+            raise CommandError("out_path 는 .npz 여야 합니다.")
+        t0 = time.perf_counter()
+        try:
+            graph = PedestrianGraph.from_osm(opts["osm_path"])
+        except (OSError, GraphError) as e:
+            raise CommandError(str(e))
+        graph.save(opts["out_path"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{graph.n_nodes:,} nodes, {graph.n_edges:,} directed edges, "
+            f"{graph.nbytes / 1e6:.1f} MB in memory ({time.perf_counter() - t0:.1f}s)"
+        ))
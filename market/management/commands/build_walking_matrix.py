@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from market.services import walking_matrix
+
+
+class Command(BaseCommand):
+    help = "저장된 주소 × 반경 내 마켓 보행 행렬(AddressWalk) 사전 계산"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--address-id", type=int, help="이 주소만 다시 계산")
+        parser.add_argument("--market-id", type=int, help="이 마켓만 다시 계산")
+        parser.add_argument("--only-missing", action="store_true", help="이미 계산된 행은 건너뜀")
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+
+        if opts["address_id"]:
+            saved = walking_matrix.refresh_address(opts["address_id"])
+        elif opts["market_id"]:
+            saved = walking_matrix.refresh_market(opts["market_id"])
+        else:
+            def progress(address, saved_so_far):
+                self.stdout.write(f"  address={address.id} saved={saved_so_far}")
+            saved = walking_matrix.build_all(only_missing=opts["only_missing"], progress=progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{saved} rows saved (radius {walking_matrix.MATRIX_RADIUS_M}m, {time.perf_counter() - t0:.1f}s)"
+        ))
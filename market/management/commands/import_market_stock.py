@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from market.services.stock_import import StockFeedError, format_of, import_stock_feed
+
+
+class Command(BaseCommand):
+    help = "제휴 마트 재고 피드(CSV/JSONL, 마켓별로 묶인 전체 재고 목록)를 스트리밍으로 반영"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="피드 파일 경로('-' 이면 표준 입력)")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="생략 시 확장자로 판단")
+        parser.add_argument("--dry-run", action="store_true", help="변경 건수만 계산하고 반영하지 않음")
+        parser.add_argument("--progress-every", type=int, default=100_000)
+
+    def handle(self, *args, **opts):
+        path = opts["path"]
+        fmt = opts["format"] or format_of(path)
+
+        def progress(report):
+            self.stdout.write(f"  {report.summary()}")
+
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+        try:
+            report = import_stock_feed(
+                stream, fmt, dry_run=opts["dry_run"],
+                progress=progress, progress_every=opts["progress_every"],
+            )
+        except StockFeedError as e:
+            raise CommandError(str(e))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(report.summary()))
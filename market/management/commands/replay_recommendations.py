@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from market.services.replay import compare, load_requests, local_routing, replay
+from market.services.scoring import DEFAULT_WEIGHTS
+
+
+def _weights(raw: str, option: str):
+    """JSON 가중치 변경분 → ScoringWeights (기본값 기준)."""
+    if not raw:
+        return DEFAULT_WEIGHTS
+    try:
+        return DEFAULT_WEIGHTS.with_(**json.loads(raw))
+    except (ValueError, TypeError) as e:
+        raise CommandError(f"{option}: {e}")
+
+
+class Command(BaseCommand):
+    help = (
+        "과거 장바구니 기록으로 마켓 추천을 재생(경로는 로컬 공급자만)해 "
+        "요청당 지연/쿼리 수와 두 가중치 설정 간 1순위 변경률 측정"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="YYYY-MM-DD 이후 생성된 장바구니")
+        parser.add_argument("--until", help="YYYY-MM-DD 이전 생성된 장바구니")
+        parser.add_argument("--limit", type=int)
+        parser.add_argument("--only-visited", action="store_true", help="장보기 완료(ActivityLog) 기록만")
+        parser.add_argument("--a", default="", help='엔진 A 가중치 변경분 JSON (기본: 현재 가중치)')
+        parser.add_argument("--b", default="", help='엔진 B 가중치 변경분 JSON, 예: {"closing_soon": 50}')
+        parser.add_argument("--no-travel", action="store_true", help="1순위 마켓 이동 정보 계산 생략(랭킹만)")
+
+    def handle(self, *args, **opts):
+        weights_a, weights_b = _weights(opts["a"], "--a"), _weights(opts["b"], "--b")
+        since = parse_date(opts["since"]) if opts["since"] else None
+        until = parse_date(opts["until"]) if opts["until"] else None
+
+        requests = load_requests(since, until, opts["limit"], opts["only_visited"])
+        if not requests:
+            self.stdout.write("재생할 기록이 없습니다.")
+            return
+        self.stdout.write(f"{len(requests):,} requests")
+
+        with local_routing():
+            run_a = replay(requests, weights_a, name="a", with_travel=not opts["no_travel"])
+            run_b = replay(requests, weights_b, name="b", with_travel=not opts["no_travel"])
+
+        for run in (run_a, run_b):
+            s = run.summary()
+            self.stdout.write(
+                f"[{run.name}] p50={s['p50_ms']} ms  p95={s['p95_ms']} ms  p99={s['p99_ms']} ms  max={s['max_ms']} ms  "
+                f"queries avg={s['queries_avg']} max={s['queries_max']}  no candidate={s['no_candidate']}"
+            )
+        c = compare(requests, run_a, run_b)
+        self.stdout.write(self.style.SUCCESS(
+            f"chosen market changed: {c['changed']:,}/{c['requests']:,} ({c['change_rate']:.1%})  "
+            f"historical hit rate a={c['hit_rate_a']:.1%} b={c['hit_rate_b']:.1%} (labelled {c['labelled']:,})"
+        ))
@@ -0,0 +1,18 @@
+from .services.route_memo import begin_request, end_request
+
+
+class RouteMemoMiddleware:
+    """
+    요청마다 경로 메모를 열고 닫음.
+    → 한 요청 안에서 같은 유저↔마켓 경로 조회는 한 번만 (services.route_memo 참고)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = begin_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            end_request(token)
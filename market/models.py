@@ -1,7 +1,10 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db.models import Q
 from food.models import Ingredient
+from .services.spatial_index import grid_cell_of, cells_within
+from .services.schedule import compile_schedule
 
 User = get_user_model()
 
@@ -10,7 +13,38 @@ class MarketType(models.TextChoices):
     TRAD = 'trad', '전통시장'
 
 
-class Market(models.Model):
+class OpeningHoursMixin:
+    """
+    open_days / open_time / close_time 을 가진 모델 공통.
+    주간 영업표(schedule.compile_schedule)로 영업 여부/마감까지 남은 분을 O(1)로 조회.
+    영업표는 DB 에 저장하지 않고 프로세스마다 (요일, 시작, 마감) 별로 처음 조회할 때 한 번 컴파일해 공유.
+    """
+
+    @property
+    def schedule(self):
+        return compile_schedule(self.open_days, self.open_time, self.close_time)
+
+    def is_open_now(self, when=None) -> bool:
+        return self.schedule.is_open(when)
+
+    def minutes_until_close(self, when=None) -> int:
+        return self.schedule.minutes_until_close(when)
+
+    def next_opening(self, when=None):
+        return self.schedule.next_opening(when)
+
+
+class MarketQuerySet(models.QuerySet):
+    def near(self, lat, lng, radius_m):
+        """
+        (lat, lng) 반경 radius_m 에 걸치는 격자 셀의 마켓만.
+        grid_cell 이 아직 비어 있는(이전 데이터) 마켓은 누락되지 않도록 함께 포함.
+        """
+        cells = cells_within(lat, lng, radius_m)
+        return self.filter(Q(grid_cell__in=cells) | Q(grid_cell=""))
+
+
+class Market(OpeningHoursMixin, models.Model):
     name = models.CharField(max_length=100)
     market_type = models.CharField(max_length=10, choices=MarketType.choices)
     info = models.CharField(max_length=100) 
@@ -24,6 +58,17 @@ class Market(models.Model):
     open_days = models.CharField(max_length=50, help_text="예: 월,화,수,목,금")
     open_time = models.TimeField(help_text="예: 09:00")
     close_time = models.TimeField(help_text="예: 18:00")
+    # 위경도 격자 셀 키(저장 시 자동 계산) → 반경 후보 조회용
+    grid_cell = models.CharField(max_length=32, blank=True, db_index=True, editable=False)
+
+    objects = MarketQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.grid_cell = grid_cell_of(self.latitude, self.longitude)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "grid_cell"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -42,11 +87,35 @@ class MarketStock(models.Model):
         return f"{self.market.name} - {self.ingredient.name}"
 
 
+# ====== 재고 변경 로그 ======
+class StockChange(models.Model):
+    """
+    마켓 재고 변경 기록(추가 전용). seq 는 단조 증가 → 소비자는 "seq 이후 변경"만 받아 증분 동기화.
+    마켓/재료가 삭제돼도 기록은 남도록 FK 제약 없음.
+    """
+    class Action(models.TextChoices):
+        ADD = 'add', '입고'
+        REMOVE = 'remove', '품절/삭제'
+
+    seq = models.BigAutoField(primary_key=True)
+    market = models.ForeignKey(Market, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    action = models.CharField(max_length=6, choices=Action.choices)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['market', 'seq'], name='stockchange_market_seq')]
+
+    def __str__(self):
+        return f"#{self.seq} {self.market_id} {self.action} {self.ingredient_id}"
+
+
 class ShoppingList(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     market = models.ForeignKey(Market, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_done = models.BooleanField(default=False)
+    arrived_at = models.DateTimeField(null=True, blank=True, help_text='지오펜스 도착 감지 시각')
 
     def __str__(self):
         return f"{self.id} - {self.user.username} - {self.created_at.date()}"
@@ -81,7 +150,7 @@ class ActivityLog(models.Model):
         return f"{self.user} - {self.point_earned}P"
 
 
-class NearbyPlace(models.Model):
+class NearbyPlace(OpeningHoursMixin, models.Model):
     market = models.ForeignKey(Market, on_delete=models.CASCADE, related_name='nearby_places')
 
     name = models.CharField(max_length=100)
@@ -100,6 +169,79 @@ class NearbyPlace(models.Model):
 
 
 
+# ====== 보행 경로 저장소 ======
+class RouteCache(models.Model):
+    """
+    (스냅된 출발 셀, 마켓) → TMAP 보행자 경로.
+    같은 집 주소에서 같은 마켓으로의 반복 조회는 외부 API 호출 없이 여기서 응답.
+    """
+    origin_cell = models.CharField(max_length=32)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE, related_name='route_cache')
+    distance_m = models.PositiveIntegerField()
+    duration_s = models.PositiveIntegerField()
+    path_blob = models.BinaryField(blank=True, default=b'', help_text='zlib 압축 JSON [[lat, lng], ...]')
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['origin_cell', 'market'],
+                name='uniq_routecache_origin_market'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.origin_cell} → {self.market_id} ({self.distance_m}m)"
+
+
+
+# ====== 주소 × 마켓 보행 행렬 ======
+class AddressWalk(models.Model):
+    """
+    저장된 주소(accounts.Address) → 2km 이내 마켓 보행 거리/시간/포인트 사전 계산 값.
+    주소/마켓이 추가되거나 좌표가 바뀌면 해당 행만 다시 계산(services.walking_matrix).
+    """
+    address = models.ForeignKey('accounts.Address', on_delete=models.CASCADE, related_name='market_walks')
+    market = models.ForeignKey(Market, on_delete=models.CASCADE, related_name='address_walks')
+    distance_m = models.PositiveIntegerField()
+    expected_min = models.PositiveIntegerField()
+    point_earned = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['address', 'market'],
+                name='uniq_addresswalk_address_market'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.address_id} → {self.market_id} ({self.expected_min}분)"
+
+
+
+# ====== 마켓 도보 등시선 ======
+class MarketIsochrone(models.Model):
+    """
+    마켓까지 걸어서 5/10/15/20분 안에 닿는 격자 셀 집합(services.isochrone).
+    요청 시에는 사용자 위치 셀이 어느 마켓 등시선에 드는지만 확인(경로 조회 없음).
+    """
+    class Source(models.TextChoices):
+        GRAPH = 'graph', '보행 그래프'
+        ESTIMATE = 'estimate', '직선거리 추정'
+
+    market = models.OneToOneField(Market, on_delete=models.CASCADE, related_name='isochrone')
+    cell_deg = models.FloatField()
+    cells_blob = models.BinaryField(help_text='zlib 압축 int32 배열 [위도 idx, 경도 idx, 분, ...]')
+    source = models.CharField(max_length=10, choices=Source.choices)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.market_id} isochrone ({self.source})"
+
+
+
 # ====== 필터 설정 ======
 class MarketFilterSetting(models.Model):
     class TypePref(models.TextChoices):
@@ -110,6 +252,10 @@ class MarketFilterSetting(models.Model):
     class DistancePref(models.TextChoices):
         WITHIN_1KM = 'within_1km', '1km 이내만 보여주세요'  # d <= 1000m
         ANY_2KM    = 'any_2km',    '상관 없어요'            # d <= 2000m
+        WALK_5     = 'walk_5',     '걸어서 5분 이내'        # 도보 등시선(MarketIsochrone) 기준
+        WALK_10    = 'walk_10',    '걸어서 10분 이내'
+        WALK_15    = 'walk_15',    '걸어서 15분 이내'
+        WALK_20    = 'walk_20',    '걸어서 20분 이내'
 
     user = models.OneToOneField(
         User,
@@ -144,7 +290,17 @@ class MarketFilterSetting(models.Model):
         """
         if self.distance_preference == self.DistancePref.ANY_2KM:
             return (0, 2000, False)
+        if self.walk_minutes:
+            # 도보 거리 >= 직선거리 → 직선 N분 거리(80m/분)로 먼저 좁히고 등시선으로 확정
+            return (0, self.walk_minutes * 80, False)
         return (0, 1000, False)
 
+    @property
+    def walk_minutes(self):
+        """'걸어서 N분 이내' 선택이면 N, 아니면 None."""
+        if self.distance_preference.startswith('walk_'):
+            return int(self.distance_preference[len('walk_'):])
+        return None
+
     def __str__(self):
         return f'{self.user} filter'
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+가벼운 백그라운드 실행기.
+
+요청 응답을 막지 않아야 하는 후처리(행렬 갱신, 선계산 등)를 프로세스 내 스레드에서 실행.
+- run_in_background(): 스레드 풀(BACKGROUND_WORKERS). 외부 API 대기가 긴 작업(선계산)
+- run_serialized(): 쓰기 전용 스레드 1개에서 순서대로. 행을 지우고 다시 쓰는 작업(보행 행렬, 등시선)
+  sqlite 는 쓰기 잠금이 DB(공유 캐시면 테이블) 단위라 여러 스레드가 동시에 쓰면 'database is locked'
+- 잠금 오류는 BACKGROUND_LOCK_RETRIES 회까지 잠시 쉬고 작업 전체를 다시 실행
+  (작업은 모두 지우고 다시 쓰기/update_or_create 라 다시 실행해도 결과 같음)
+작업이 끝나면 그 스레드의 DB 커넥션을 닫아 커넥션이 쌓이지 않게 함.
+"""
+import logging
+import random
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connection
+
+log = logging.getLogger(__name__)
+
+BACKGROUND_LOCK_RETRIES = getattr(settings, "BACKGROUND_LOCK_RETRIES", 5)
+# 첫 재시도 대기(초), 이후 2배씩(±50% 흔들기)
+BACKGROUND_LOCK_RETRY_S = getattr(settings, "BACKGROUND_LOCK_RETRY_S", 0.05)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "BACKGROUND_WORKERS", 2),
+    thread_name_prefix="market-bg",
+)
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="market-bg-write")
+
+
+def _is_locked(e: OperationalError) -> bool:
+    return "locked" in str(e)
+
+
+def _run(fn, args, kwargs):
+    name = getattr(fn, "__name__", fn)
+    close_old_connections()
+    try:
+        for attempt in range(BACKGROUND_LOCK_RETRIES + 1):
+            try:
+                return fn(*args, **kwargs)
+            except OperationalError as e:
+                if not _is_locked(e) or attempt == BACKGROUND_LOCK_RETRIES:
+                    raise
+                log.warning("[background] %s: %s (retry %d)", name, e, attempt + 1)
+                time.sleep(BACKGROUND_LOCK_RETRY_S * (2 ** attempt) * random.uniform(0.5, 1.5))
+    except Exception:
+        log.exception("[background] %s failed", name)
+        raise
+    finally:
+        connection.close()
+
+
+def run_in_background(fn, *args, **kwargs) -> Future:
+    return _executor.submit(_run, fn, args, kwargs)
+
+
+def run_serialized(fn, *args, **kwargs) -> Future:
+    """DB 쓰기 작업: 쓰기 전용 스레드에서 제출 순서대로 하나씩."""
+    return _writer.submit(_run, fn, args, kwargs)
+
+
+def wait_serialized(timeout: Optional[float] = None) -> None:
+    """지금까지 run_serialized 로 넣은 작업이 모두 끝날 때까지 대기(테스트/관리 명령용)."""
+    _writer.submit(lambda: None).result(timeout)
@@ -0,0 +1,96 @@
+"""
+마켓 도착 판정용 지오펜스 격자 인덱스(프로세스 메모리).
+
+- 마켓마다 반경 GEOFENCE_RADIUS_M 원이 걸치는 모든 격자 셀(GEOFENCE_CELL_DEG)에 미리 등록
+  → 위치 핑 1건 = 셀 dict 조회 1번 + 그 셀의 마켓 몇 곳 거리 비교(평면 근사), 외부 호출/DB 조회 없음
+- 마켓 추가/이동/삭제 시 무효화(market.signals), 다른 프로세스 변경은 GEOFENCE_MAX_AGE_S 주기로 재적재
+"""
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from market.models import Market
+from .spatial_index import M_PER_DEG_LAT
+
+GEOFENCE_RADIUS_M = getattr(settings, "GEOFENCE_RADIUS_M", 60)
+GEOFENCE_CELL_DEG = getattr(settings, "GEOFENCE_CELL_DEG", 0.001)
+GEOFENCE_MAX_AGE_S = getattr(settings, "GEOFENCE_MAX_AGE_S", 60 * 10)
+
+Fence = Tuple[int, float, float]  # (market_id, lat, lng)
+
+
+class GeofenceIndex:
+    def __init__(self, radius_m: float = GEOFENCE_RADIUS_M, cell_deg: float = GEOFENCE_CELL_DEG,
+                 max_age_s: float = GEOFENCE_MAX_AGE_S):
+        self.radius_m = radius_m
+        self.cell_deg = cell_deg
+        self.max_age_s = max_age_s
+        self._cells: Dict[Tuple[int, int], List[Fence]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load(self, rows: Optional[Iterable[Fence]] = None) -> None:
+        """(market_id, lat, lng) 전체로 재구성. rows 생략 시 Market 에서 읽음."""
+        if rows is None:
+            rows = Market.objects.values_list("id", "latitude", "longitude").iterator()
+        cells: Dict[Tuple[int, int], List[Fence]] = {}
+        d_lat = self.radius_m / M_PER_DEG_LAT
+        for mid, lat, lng in rows:
+            if lat is None or lng is None:
+                continue
+            d_lng = d_lat / max(math.cos(math.radians(lat)), 1e-6)
+            for i in range(math.floor((lat - d_lat) / self.cell_deg), math.floor((lat + d_lat) / self.cell_deg) + 1):
+                for j in range(math.floor((lng - d_lng) / self.cell_deg), math.floor((lng + d_lng) / self.cell_deg) + 1):
+                    cells.setdefault((i, j), []).append((mid, lat, lng))
+        with self._lock:
+            self._cells = cells
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def _ensure_loaded(self) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.max_age_s:
+            self.load()
+
+    def hits(self, lat: float, lng: float) -> List[Tuple[int, float]]:
+        """(lat, lng) 를 반경 안에 포함하는 마켓 [(market_id, 거리 m)], 가까운 순."""
+        self._ensure_loaded()
+        fences = self._cells.get((math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)))
+        if not fences:
+            return []
+        kx = M_PER_DEG_LAT * math.cos(math.radians(lat))
+        r2 = self.radius_m * self.radius_m
+        out = []
+        for mid, m_lat, m_lng in fences:
+            dy = (lat - m_lat) * M_PER_DEG_LAT
+            dx = (lng - m_lng) * kx
+            d2 = dx * dx + dy * dy
+            if d2 <= r2:
+                out.append((mid, math.sqrt(d2)))
+        out.sort(key=lambda t: t[1])
+        return out
+
+
+_index = GeofenceIndex()
+
+
+def get_geofence_index() -> GeofenceIndex:
+    return _index
+
+
+def arrived_market(pings: Iterable[Tuple[float, float]], target_market_id: Optional[int] = None) -> Optional[int]:
+    """
+    위치 핑(시간순) 중 처음으로 지오펜스에 들어간 마켓 id.
+    target_market_id 가 있으면 그 마켓 도착만 인정(가는 길에 지나치는 다른 마켓 무시).
+    """
+    index = get_geofence_index()
+    for lat, lng in pings:
+        for mid, _ in index.hits(lat, lng):
+            if target_market_id is None or mid == target_market_id:
+                return mid
+    return None
@@ -0,0 +1,163 @@
+"""
+마켓 재고 비트셋 인덱스(프로세스 메모리).
+
+- 재료 id → 조밀한 비트 위치, 마켓별 재고 = 파이썬 int 비트셋
+- 장바구니도 같은 비트셋으로 만들면 매칭수/커버리지/(있음·없음) 분리가 AND + popcount(int.bit_count)
+- MarketStock 저장/삭제 시그널(market.signals)로 해당 비트만 갱신,
+  다른 프로세스에서의 변경은 INVENTORY_INDEX_SYNC_S 주기로 재고 변경 로그(StockChange)의 증분만 반영,
+  INVENTORY_INDEX_MAX_AGE_S 주기로 전체 재적재(커밋 순서가 seq 와 달라 놓친 변경 보정)
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from market.models import MarketStock, StockChange
+from .stock_log import changes_since, head_seq
+
+# False 면 추천 랭킹의 매칭수를 인덱스 대신 DB 집계(utils.count_matches_by_market)로 계산
+INVENTORY_INDEX_ENABLED = getattr(settings, "INVENTORY_INDEX_ENABLED", True)
+INVENTORY_INDEX_MAX_AGE_S = getattr(settings, "INVENTORY_INDEX_MAX_AGE_S", 60 * 5)
+INVENTORY_INDEX_SYNC_S = getattr(settings, "INVENTORY_INDEX_SYNC_S", 10)
+# 밀린 변경이 이보다 많으면 증분 대신 전체 재적재
+INVENTORY_INDEX_SYNC_MAX = getattr(settings, "INVENTORY_INDEX_SYNC_MAX", 5000)
+
+
+class InventoryIndex:
+    def __init__(self, max_age_s: float = INVENTORY_INDEX_MAX_AGE_S, sync_s: float = INVENTORY_INDEX_SYNC_S):
+        self.max_age_s = max_age_s
+        self.sync_s = sync_s
+        self._bit_of: Dict[int, int] = {}   # 재료 id → 비트 위치
+        self._ids: List[int] = []           # 비트 위치 → 재료 id
+        self._stock: Dict[int, int] = {}    # 마켓 id → 재고 비트셋
+        self._loaded_at: Optional[float] = None
+        self._synced_at: float = 0.0
+        self._seq: Optional[int] = None      # 반영한 마지막 변경 로그 seq(rows 를 직접 준 적재는 None → 동기화 안 함)
+        self._lock = threading.RLock()
+
+    # ---- 적재/갱신 -------------------------------------------------------
+    def load(self, rows: Optional[Iterable[Tuple[int, int]]] = None) -> None:
+        """(market_id, ingredient_id) 전체로 재구성. rows 생략 시 MarketStock 에서 읽음."""
+        seq = None
+        if rows is None:
+            # 로그 seq 를 먼저 읽음 → 적재 중 생긴 변경은 다음 동기화에서 다시 반영(추가/삭제는 멱등)
+            seq = head_seq()
+            rows = MarketStock.objects.values_list("market_id", "ingredient_id").iterator()
+        with self._lock:
+            self._bit_of, self._ids, self._stock = {}, [], {}
+            for mid, iid in rows:
+                self._stock[mid] = self._stock.get(mid, 0) | (1 << self._bit(iid))
+            self._seq = seq
+            self._loaded_at = self._synced_at = time.monotonic()
+
+    def sync(self) -> None:
+        """마지막 반영 seq 이후의 재고 변경 로그만 적용."""
+        with self._lock:
+            seq = self._seq
+            self._synced_at = time.monotonic()
+        if seq is None:
+            return
+        rows, more = changes_since(seq, limit=INVENTORY_INDEX_SYNC_MAX)
+        if more:
+            self.load()
+            return
+        with self._lock:
+            if self._seq != seq:
+                return  # 그 사이 재적재됨
+            for _, mid, iid, action in rows:
+                if action == StockChange.Action.ADD:
+                    self._stock[mid] = self._stock.get(mid, 0) | (1 << self._bit(iid))
+                else:
+                    bit = self._bit_of.get(iid)
+                    if bit is not None:
+                        self._stock[mid] = self._stock.get(mid, 0) & ~(1 << bit)
+            if rows:
+                self._seq = rows[-1][0]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self) -> None:
+        loaded_at = self._loaded_at
+        now = time.monotonic()
+        if loaded_at is None or now - loaded_at > self.max_age_s:
+            self.load()
+        elif now - self._synced_at > self.sync_s:
+            self.sync()
+
+    def _bit(self, ingredient_id: int) -> int:
+        bit = self._bit_of.get(ingredient_id)
+        if bit is None:
+            bit = self._bit_of[ingredient_id] = len(self._ids)
+            self._ids.append(ingredient_id)
+        return bit
+
+    def add(self, market_id: int, ingredient_id: int) -> None:
+        with self._lock:
+            if self._loaded_at is None:
+                return  # 다음 조회 때 전체 적재
+            self._stock[market_id] = self._stock.get(market_id, 0) | (1 << self._bit(ingredient_id))
+
+    def discard(self, market_id: int, ingredient_id: int) -> None:
+        with self._lock:
+            bit = self._bit_of.get(ingredient_id)
+            if self._loaded_at is None or bit is None:
+                return
+            self._stock[market_id] = self._stock.get(market_id, 0) & ~(1 << bit)
+
+    # ---- 조회 -------------------------------------------------------------
+    def mask_of(self, ingredient_ids: Iterable[int]) -> int:
+        """재료 id 들 → 비트셋. 어느 마켓에도 없는 재료는 비트 없음(어차피 매칭 불가)."""
+        self._ensure_loaded()
+        bit_of = self._bit_of
+        mask = 0
+        for iid in ingredient_ids:
+            bit = bit_of.get(iid)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def stock_mask(self, market_id: int) -> int:
+        self._ensure_loaded()
+        return self._stock.get(market_id, 0)
+
+    def ids_of(self, mask: int) -> List[int]:
+        ids = self._ids
+        out = []
+        while mask:
+            low = mask & -mask
+            out.append(ids[low.bit_length() - 1])
+            mask ^= low
+        return out
+
+    def count_matches(self, market_ids: Iterable[int], ingredient_ids: Iterable[int]) -> Dict[int, int]:
+        """utils.count_matches_by_market 와 같은 형식 {market_id: 일치 개수}, DB 조회 없음."""
+        cart = self.mask_of(ingredient_ids)
+        stock = self._stock
+        return {mid: (stock.get(mid, 0) & cart).bit_count() for mid in market_ids}
+
+    def split(self, market_id: int, ingredient_ids: Iterable[int]) -> Tuple[List[int], List[int]]:
+        """장바구니 재료 id 를 (재고 있음, 없음)으로 분리. 입력 순서 유지."""
+        stock = self.stock_mask(market_id)
+        bit_of = self._bit_of
+        matched, unmatched = [], []
+        for iid in ingredient_ids:
+            bit = bit_of.get(iid)
+            (matched if bit is not None and (stock >> bit) & 1 else unmatched).append(iid)
+        return matched, unmatched
+
+    def coverage(self, market_id: int, ingredient_ids: Iterable[int]) -> float:
+        """장바구니 중 재고 있는 비율(0~1). 빈 장바구니는 0."""
+        ingredient_ids = list(ingredient_ids)
+        if not ingredient_ids:
+            return 0.0
+        return (self.stock_mask(market_id) & self.mask_of(ingredient_ids)).bit_count() / len(set(ingredient_ids))
+
+
+_index = InventoryIndex()
+
+
+def get_inventory_index() -> InventoryIndex:
+    return _index
@@ -0,0 +1,214 @@
+"""
+마켓별 도보 등시선(5/10/15/20분) → 격자 셀 집합.
+
+- 계산(오프라인, build_isochrones 명령 / 마켓 추가·이동 시 백그라운드):
+  보행 그래프(PEDESTRIAN_GRAPH_PATH)가 있으면 마켓 노드에서 20분 거리까지 다익스트라 → 닿은 노드 주변 셀에 도보 시간 배정,
+  없으면 직선거리 × ISOCHRONE_DETOUR 추정
+- 저장: MarketIsochrone.cells_blob (셀마다 가장 짧은 구간(분) 하나)
+- 조회(요청 시): 전체 마켓 셀을 정렬된 numpy 배열(셀 키, 마켓 id, 분)로 들고 사용자 셀을 이분 탐색
+  → "걸어서 N분 이내" 후보 필터가 경로 조회 없이 셀 소속 확인으로 끝남
+"""
+import math
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from market.models import Market, MarketIsochrone
+from .pedestrian_graph import GraphError, get_pedestrian_graph
+from .spatial_index import M_PER_DEG_LAT, haversine_m
+
+ISOCHRONE_BANDS = tuple(getattr(settings, "ISOCHRONE_BANDS", (5, 10, 15, 20)))
+ISOCHRONE_CELL_DEG = getattr(settings, "ISOCHRONE_CELL_DEG", 0.001)
+# 보행 그래프가 없을 때 직선거리 대비 실제 도보 거리 배수
+ISOCHRONE_DETOUR = getattr(settings, "ISOCHRONE_DETOUR", 1.3)
+ISOCHRONE_MAX_AGE_S = getattr(settings, "ISOCHRONE_MAX_AGE_S", 60 * 10)
+
+# 보행 80m/분 (utils.get_travel_info 와 동일)
+WALK_M_PER_MIN = 80
+
+
+def _key(i, j):
+    """(위도 idx, 경도 idx) → int64 셀 키. numpy 배열/정수 모두 가능."""
+    return (i << 32) + (j & 0xFFFFFFFF)
+
+
+def _band_of(walk_m: np.ndarray) -> np.ndarray:
+    """도보 거리(m) → 그 거리를 포함하는 가장 짧은 구간(분), 어느 구간에도 없으면 0."""
+    bands = np.asarray(ISOCHRONE_BANDS, dtype=np.int32)
+    idx = np.searchsorted(bands * WALK_M_PER_MIN, walk_m, side="left")
+    return np.where(idx < len(bands), bands[np.minimum(idx, len(bands) - 1)], 0)
+
+
+# =============================================================================
+# A. 계산
+# =============================================================================
+def _cells_from_graph(lat: float, lng: float, cell_deg: float) -> Optional[np.ndarray]:
+    try:
+        graph = get_pedestrian_graph()
+    except GraphError:
+        graph = None  # 적재 실패 → 직선거리 등시선
+    if graph is None:
+        return None
+    max_m = max(ISOCHRONE_BANDS) * WALK_M_PER_MIN
+    try:
+        src, snap_m = graph.nearest_node(lat, lng)
+    except GraphError:
+        return None
+    nodes, dist = graph.distances_from(src, max_m - snap_m)
+    n_lat, n_lng, walk = graph.lat[nodes], graph.lng[nodes], dist + snap_m
+
+    # 노드가 속한 셀 + 주변 8칸에 (노드까지 도보 + 셀 중심까지 직선) 배정 → 셀별 최솟값
+    kx = M_PER_DEG_LAT * math.cos(math.radians(lat))
+    ci = np.floor(n_lat / cell_deg).astype(np.int64)
+    cj = np.floor(n_lng / cell_deg).astype(np.int64)
+    keys, costs, ijs = [], [], []
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            i, j = ci + di, cj + dj
+            c_lat, c_lng = (i + 0.5) * cell_deg, (j + 0.5) * cell_deg
+            keys.append(_key(i, j))
+            costs.append(walk + np.hypot((c_lat - n_lat) * M_PER_DEG_LAT, (c_lng - n_lng) * kx))
+            ijs.append(np.stack([i, j], axis=1))
+    keys, costs, ijs = np.concatenate(keys), np.concatenate(costs), np.concatenate(ijs)
+    order = np.lexsort((costs, keys))
+    first = np.flatnonzero(np.r_[True, keys[order][1:] != keys[order][:-1]])
+    best = order[first]
+    return np.column_stack([ijs[best], _band_of(costs[best])])
+
+
+def _cells_estimated(lat: float, lng: float, cell_deg: float) -> np.ndarray:
+    max_m = max(ISOCHRONE_BANDS) * WALK_M_PER_MIN / ISOCHRONE_DETOUR
+    d_lat = max_m / M_PER_DEG_LAT
+    d_lng = d_lat / max(math.cos(math.radians(lat)), 1e-6)
+    i = np.arange(math.floor((lat - d_lat) / cell_deg), math.floor((lat + d_lat) / cell_deg) + 1)
+    j = np.arange(math.floor((lng - d_lng) / cell_deg), math.floor((lng + d_lng) / cell_deg) + 1)
+    ii, jj = (a.ravel() for a in np.meshgrid(i, j, indexing="ij"))
+    c_lat, c_lng = (ii + 0.5) * cell_deg, (jj + 0.5) * cell_deg
+    straight = np.fromiter(
+        (haversine_m(lat, lng, a, b) for a, b in zip(c_lat.tolist(), c_lng.tolist())), dtype=np.float64, count=len(ii)
+    )
+    return np.column_stack([ii, jj, _band_of(straight * ISOCHRONE_DETOUR)])
+
+
+def compute_cells(lat: float, lng: float, cell_deg: float = ISOCHRONE_CELL_DEG) -> Tuple[np.ndarray, str]:
+    """(셀 배열 [[위도 idx, 경도 idx, 분], ...], 출처). 어느 구간에도 안 드는 셀은 제외."""
+    cells = _cells_from_graph(lat, lng, cell_deg)
+    source = MarketIsochrone.Source.GRAPH
+    if cells is None:
+        cells, source = _cells_estimated(lat, lng, cell_deg), MarketIsochrone.Source.ESTIMATE
+    return cells[cells[:, 2] > 0].astype(np.int32), source
+
+
+def pack_cells(cells: np.ndarray) -> bytes:
+    return zlib.compress(np.ascontiguousarray(cells, dtype=np.int32).tobytes())
+
+
+def unpack_cells(blob: bytes) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(bytes(blob)), dtype=np.int32).reshape(-1, 3)
+
+
+def refresh_market(market_id: int) -> Optional[MarketIsochrone]:
+    """마켓 한 곳 등시선 재계산 후 저장."""
+    market = Market.objects.filter(id=market_id).only("id", "latitude", "longitude").first()
+    if market is None or market.latitude is None or market.longitude is None:
+        return None
+    cells, source = compute_cells(market.latitude, market.longitude)
+    iso, _ = MarketIsochrone.objects.update_or_create(
+        market=market,
+        defaults={"cell_deg": ISOCHRONE_CELL_DEG, "cells_blob": pack_cells(cells), "source": source},
+    )
+    get_isochrone_index().invalidate()
+    return iso
+
+
+def build_all(only_missing: bool = False, progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """전체 마켓 등시선 계산. 반환: 저장한 마켓 수."""
+    qs = Market.objects.all()
+    if only_missing:
+        qs = qs.filter(isochrone__isnull=True)
+    saved = 0
+    for market_id in qs.values_list("id", flat=True).iterator():
+        if refresh_market(market_id):
+            saved += 1
+            if progress:
+                progress(market_id, saved)
+    return saved
+
+
+# =============================================================================
+# B. 조회 인덱스(프로세스 메모리)
+# =============================================================================
+class IsochroneIndex:
+    def __init__(self, max_age_s: float = ISOCHRONE_MAX_AGE_S):
+        self.max_age_s = max_age_s
+        self._keys = np.empty(0, dtype=np.int64)       # 셀 키(정렬)
+        self._markets = np.empty(0, dtype=np.int64)    # 같은 위치의 마켓 id
+        self._minutes = np.empty(0, dtype=np.int32)    # 같은 위치의 도보 구간(분)
+        self._covered: Set[int] = set()                # 등시선이 있는 마켓
+        self.cell_deg = ISOCHRONE_CELL_DEG
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load(self, rows: Optional[Iterable[Tuple[int, float, bytes]]] = None) -> None:
+        """(market_id, cell_deg, cells_blob) 전체로 재구성. rows 생략 시 MarketIsochrone 에서 읽음."""
+        if rows is None:
+            rows = MarketIsochrone.objects.values_list("market_id", "cell_deg", "cells_blob").iterator()
+        keys, markets, minutes, covered = [], [], [], set()
+        for mid, cell_deg, blob in rows:
+            if cell_deg != self.cell_deg:
+                continue  # 설정 변경 전 결과(재계산 필요) → 미보유로 취급
+            cells = unpack_cells(blob)
+            keys.append(_key(cells[:, 0].astype(np.int64), cells[:, 1].astype(np.int64)))
+            markets.append(np.full(len(cells), mid, dtype=np.int64))
+            minutes.append(cells[:, 2])
+            covered.add(mid)
+        if keys:
+            k, m, t = np.concatenate(keys), np.concatenate(markets), np.concatenate(minutes)
+            order = np.argsort(k, kind="stable")
+            k, m, t = k[order], m[order], t[order]
+        else:
+            k, m, t = np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int32)
+        with self._lock:
+            self._keys, self._markets, self._minutes, self._covered = k, m, t, covered
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def _ensure_loaded(self) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.max_age_s:
+            self.load()
+
+    def covers(self, market_id: int) -> bool:
+        self._ensure_loaded()
+        return market_id in self._covered
+
+    def minutes_at(self, lat: float, lng: float) -> Dict[int, int]:
+        """(lat, lng) 셀에서 닿는 마켓 {market_id: 도보 구간(분)}."""
+        self._ensure_loaded()
+        key = _key(math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+        keys = self._keys
+        lo, hi = np.searchsorted(keys, key, side="left"), np.searchsorted(keys, key, side="right")
+        return dict(zip(self._markets[lo:hi].tolist(), self._minutes[lo:hi].tolist()))
+
+    def markets_within(self, lat: float, lng: float, minutes: int) -> Set[int]:
+        return {mid for mid, m in self.minutes_at(lat, lng).items() if m <= minutes}
+
+    def is_within(self, market_id: int, lat: float, lng: float, minutes: int) -> Optional[bool]:
+        """(lat, lng) 가 마켓의 N분 등시선 안인지. 마켓 등시선이 아직 없으면 None."""
+        if not self.covers(market_id):
+            return None
+        m = self.minutes_at(lat, lng).get(market_id)
+        return m is not None and m <= minutes
+
+
+_index = IsochroneIndex()
+
+
+def get_isochrone_index() -> IsochroneIndex:
+    return _index
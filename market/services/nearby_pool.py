@@ -0,0 +1,130 @@
+"""
+마켓 주변 장소(NearbyPlace) "지금 영업 중" 풀 + 가중 샘플링.
+
+- 마켓별로 영업 중인 장소만 직렬화해 캐시에 보관, 유효 시간 = 가장 빠른 영업 상태 전환(개점/마감)까지
+  → 요청마다 전체 행 조회 + is_open_now 루프 + shuffle 하지 않음
+- 장소 추가/수정/삭제 시 해당 마켓 풀 삭제(market.signals)
+- sample(): 가중 저수지 샘플링(A-Res, Efraimidis–Spirakis). 가중치 = 가까울수록 ↑ × 풀에서 드문 카테고리일수록 ↑,
+  카테고리별 최고 키를 먼저 골라 같은 카테고리가 겹치지 않게 함
+"""
+import heapq
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from market.models import NearbyPlace
+from .schedule import compile_schedule
+
+# 전환이 없는(24시간/휴무) 장소만 있을 때의 최대 유효 시간
+NEARBY_POOL_MAX_TTL_S = getattr(settings, "NEARBY_POOL_MAX_TTL_S", 60 * 10)
+# 거리 가중치 기준(m): 이 거리에서 가중치 절반
+NEARBY_DISTANCE_SCALE_M = getattr(settings, "NEARBY_DISTANCE_SCALE_M", 300)
+
+_FIELDS = ("id", "name", "category", "info", "distance_m", "image", "link_url",
+           "open_days", "open_time", "close_time")
+
+
+def _pool_key(market_id: int) -> str:
+    return f"nearby_pool:{market_id}"
+
+
+def invalidate_pool(market_id: int) -> None:
+    cache.delete(_pool_key(market_id))
+
+
+def _build_pool(market_id: int, when=None) -> Tuple[List[Dict[str, Any]], int]:
+    """(영업 중 장소 항목들, 유효 시간(초))."""
+    now = timezone.localtime(when or timezone.now())
+    ttl = NEARBY_POOL_MAX_TTL_S
+    entries = []
+    for p in NearbyPlace.objects.filter(market_id=market_id).only(*_FIELDS):
+        change = p.schedule.seconds_until_change(now)
+        if change is not None:
+            ttl = min(ttl, change)
+        if not p.schedule.is_open(now):
+            continue
+        entries.append({
+            "id": p.id,
+            "name": p.name,
+            "category": p.category,
+            "info": p.info,
+            "distance_m": p.distance_m,
+            "image_url": (p.image.url if p.image else ""),
+            "link_url": p.link_url or "",
+            "schedule": (p.open_days, p.open_time, p.close_time),
+        })
+
+    # 가중치: 거리 × 카테고리 희소성
+    freq: Dict[str, int] = {}
+    for e in entries:
+        freq[e["category"]] = freq.get(e["category"], 0) + 1
+    for e in entries:
+        e["weight"] = (1.0 / (1.0 + e["distance_m"] / NEARBY_DISTANCE_SCALE_M)) / math.sqrt(freq[e["category"]])
+    return entries, max(1, ttl)
+
+
+def get_open_pool(market_id: int, when=None) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    (영업 중 장소 풀, 남은 유효 시간(초)). 캐시에 없으면 만들어 전환 시각까지 보관.
+    when 을 지정하면(테스트/재현) 캐시를 쓰지 않음.
+    """
+    if when is not None:
+        return _build_pool(market_id, when)
+
+    pool = cache.get(_pool_key(market_id))
+    if pool is not None:
+        return pool["entries"], max(1, int(pool["valid_until"] - time.time()))
+
+    entries, ttl = _build_pool(market_id)
+    cache.set(_pool_key(market_id), {"entries": entries, "valid_until": time.time() + ttl}, ttl)
+    return entries, ttl
+
+
+def sample(entries: List[Dict[str, Any]], k: int = 3, rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
+    """
+    가중 비복원 샘플 k개(한 번 순회, 메모리 O(카테고리 수 + k)).
+    카테고리별 최고 키 항목을 키 순으로 먼저, 부족하면 전체 상위 키에서 채움.
+    """
+    rng = rng or random
+    top: List[Tuple[float, int]] = []            # 전체 상위 k (키, 위치) 최소 힙
+    best_by_cat: Dict[str, Tuple[float, int]] = {}
+    for i, e in enumerate(entries):
+        w = e.get("weight") or 1e-9
+        key = math.log(rng.random() or 1e-300) / w   # u^(1/w) 의 로그, 클수록 우선
+        if len(top) < k:
+            heapq.heappush(top, (key, i))
+        elif key > top[0][0]:
+            heapq.heapreplace(top, (key, i))
+        cur = best_by_cat.get(e["category"])
+        if cur is None or key > cur[0]:
+            best_by_cat[e["category"]] = (key, i)
+
+    picked = [i for _, i in heapq.nlargest(k, best_by_cat.values())]
+    for _, i in sorted(top, reverse=True):
+        if len(picked) >= k:
+            break
+        if i not in picked:
+            picked.append(i)
+    return [entries[i] for i in picked]
+
+
+def closing_in_minutes(entry: Dict[str, Any], when=None) -> int:
+    return compile_schedule(*entry["schedule"]).minutes_until_close(when)
+
+
+def serialize(entry: Dict[str, Any], when=None) -> Dict[str, Any]:
+    """API 응답 형식(기존 nearby_places_random_api 와 동일 키)."""
+    return {
+        "name": entry["name"],
+        "category": entry["category"],
+        "info": entry["info"],
+        "distance_m": entry["distance_m"],
+        "image_url": entry["image_url"],
+        "link_url": entry["link_url"],
+        "closing_in_minutes": closing_in_minutes(entry, when),
+    }
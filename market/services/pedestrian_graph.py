@@ -0,0 +1,344 @@
+"""
+오프라인 보행 경로 엔진(TMAP 대체/보조).
+
+- 그래프: OSM 추출 파일(.osm/.osm.gz/.osm.bz2, 보행 가능한 way 만)에서 읽거나, 변환해 둔 .npz 를 바로 적재
+- 저장: 배열 기반 인접 리스트(CSR) numpy 배열
+    x, y (float32, 그래프 중심 기준 등장방형 투영 m) / lat, lng (float64) / indptr (int32) / indices (int32) / weight (float32, m)
+  → 노드/간선당 수십 바이트, 파이썬 객체 없음
+- 질의: 출발/도착 좌표를 가장 가까운 노드로 스냅(격자 해시) → A*(직선거리 휴리스틱, 투영 좌표라 일관성 보장)
+- 결과 형식은 tmap_client.get_pedestrian_route 와 같음(path, distance_m, duration_s)
+
+설정: PEDESTRIAN_GRAPH_PATH 가 있으면 routing 체인의 'offline' 공급자로 사용.
+대용량 OSM 은 매 프로세스 파싱이 느리므로 build_pedestrian_graph 명령으로 .npz 변환 권장.
+- 요청 경로에서는 공급자 timeout 을 탐색 마감 시각으로 넘김(예산 초과 시 RouteTimeout)
+- 그래프 적재 실패는 PEDESTRIAN_GRAPH_RETRY_S 동안 기억(요청마다 OSM 재파싱 방지)
+"""
+import bz2
+import gzip
+import heapq
+import logging
+import math
+import threading
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .spatial_index import M_PER_DEG_LAT
+
+PEDESTRIAN_GRAPH_PATH = getattr(settings, "PEDESTRIAN_GRAPH_PATH", "")
+# 좌표 → 노드 스냅 허용 거리(m), 넘으면 경로 없음(다음 공급자로)
+PEDESTRIAN_SNAP_MAX_M = getattr(settings, "PEDESTRIAN_SNAP_MAX_M", 300)
+# A* 가 확정할 최대 노드 수(끊긴 그래프에서 전체 탐색 방지)
+PEDESTRIAN_MAX_SETTLED = getattr(settings, "PEDESTRIAN_MAX_SETTLED", 200_000)
+# 그래프 적재 실패 후 다시 시도하기까지(초). 그 사이 호출은 파일을 다시 읽지 않고 GraphError
+PEDESTRIAN_GRAPH_RETRY_S = getattr(settings, "PEDESTRIAN_GRAPH_RETRY_S", 600)
+
+# 스냅용 격자 한 칸(m)
+_SNAP_CELL_M = 100.0
+
+# 탐색 중 마감 시각 확인 주기(확정 노드 수)
+_DEADLINE_CHECK_EVERY = 1024
+
+# 보행 속도 80m/분 가정 (routing.WALK_M_PER_MIN 과 동일)
+WALK_M_PER_MIN = 80
+
+# 보행 가능한 highway 값(자동차 전용도로 제외)
+WALKABLE_HIGHWAYS = frozenset({
+    "footway", "pedestrian", "path", "steps", "corridor", "living_street", "residential", "service",
+    "unclassified", "track", "cycleway", "tertiary", "tertiary_link", "secondary", "secondary_link",
+    "primary", "primary_link", "road",
+})
+
+
+class GraphError(Exception):
+    pass
+
+
+class NoRoute(GraphError):
+    pass
+
+
+class RouteTimeout(GraphError):
+    pass
+
+
+log = logging.getLogger(__name__)
+
+
+def _walkable(tags: Dict[str, str]) -> bool:
+    if tags.get("highway") not in WALKABLE_HIGHWAYS:
+        return False
+    if tags.get("foot") == "no" or (tags.get("access") in ("no", "private") and tags.get("foot") not in ("yes", "designated")):
+        return False
+    return tags.get("area") != "yes"
+
+
+def _iter_osm(path: str, tag: str) -> Iterator[ET.Element]:
+    """OSM XML 의 최상위 tag 요소를 하나씩. 처리가 끝난 최상위 요소는 루트에서 떼어 버림(트리가 쌓이지 않음)."""
+    opener = gzip.open if path.endswith(".gz") else bz2.open if path.endswith(".bz2") else open
+    with opener(path, "rb") as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        depth = 0
+        for event, elem in context:
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 0:
+                if elem.tag == tag:
+                    yield elem
+                root.clear()
+
+
+# =============================================================================
+# A. 그래프
+# =============================================================================
+class PedestrianGraph:
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, indptr: np.ndarray, indices: np.ndarray,
+                 weight: np.ndarray, ref_lat: float):
+        self.lat = lat
+        self.lng = lng
+        self.indptr = indptr
+        self.indices = indices
+        self.weight = weight
+        self.ref_lat = ref_lat
+        self.ref_lng = float(lng.mean())
+        self._kx = M_PER_DEG_LAT * math.cos(math.radians(ref_lat))
+        # 중심 기준 상대 좌표(절대값 ~1e7m 를 float32 로 두면 1m 단위 오차)
+        self.x = ((lng - self.ref_lng) * self._kx).astype(np.float32)
+        self.y = ((lat - ref_lat) * M_PER_DEG_LAT).astype(np.float32)
+        self._build_snap_grid()
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.lat)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.indices)
+
+    @property
+    def nbytes(self) -> int:
+        """그래프 배열 + 스냅 격자 메모리(바이트)."""
+        arrays = (self.lat, self.lng, self.x, self.y, self.indptr, self.indices, self.weight,
+                  self._cell_keys, self._cell_start, self._cell_nodes)
+        return sum(a.nbytes for a in arrays)
+
+    # ---- 생성 -------------------------------------------------------------
+    @classmethod
+    def from_edges(cls, lat: Iterable[float], lng: Iterable[float],
+                   edges: Iterable[Tuple[int, int]]) -> "PedestrianGraph":
+        """노드 좌표 + 무방향 간선(u, v) → CSR. 가중치는 투영 좌표 직선거리."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        if not len(lat):
+            raise GraphError("빈 그래프")
+        e = np.asarray(list(edges) if not isinstance(edges, np.ndarray) else edges, dtype=np.int64).reshape(-1, 2)
+        e = e[e[:, 0] != e[:, 1]]
+        ref_lat = float(lat.mean())
+        kx = M_PER_DEG_LAT * math.cos(math.radians(ref_lat))
+        u = np.concatenate([e[:, 0], e[:, 1]])
+        v = np.concatenate([e[:, 1], e[:, 0]])
+        w = np.hypot((lng[u] - lng[v]) * kx, (lat[u] - lat[v]) * M_PER_DEG_LAT).astype(np.float32)
+        order = np.lexsort((v, u))
+        u, v, w = u[order], v[order], w[order]
+        indptr = np.zeros(len(lat) + 1, dtype=np.int32)
+        np.add.at(indptr, u + 1, 1)
+        return cls(lat, lng, np.cumsum(indptr, dtype=np.int32), v.astype(np.int32), w, ref_lat)
+
+    @classmethod
+    def from_osm(cls, path: str) -> "PedestrianGraph":
+        """
+        OSM XML 추출 파일을 두 번 스트리밍 파싱: 1) 보행 가능한 way → 간선(OSM 노드 id 쌍) 2) 간선이 참조하는 노드 좌표만.
+        처리한 요소는 바로 버림 → 메모리는 파일 크기가 아니라 보행 그래프 크기(간선/노드 수)에 비례.
+        """
+        refs = array("q")   # 간선 양 끝 OSM 노드 id (u0, v0, u1, v1, ...)
+        for way in _iter_osm(path, "way"):
+            if _walkable({t.get("k"): t.get("v") for t in way.iter("tag")}):
+                ids = [int(nd.get("ref")) for nd in way.iter("nd")]
+                for a, b in zip(ids, ids[1:]):
+                    refs.append(a)
+                    refs.append(b)
+        if not refs:
+            raise GraphError(f"보행 가능한 way 가 없음: {path}")
+
+        used, inverse = np.unique(np.frombuffer(refs, dtype=np.int64), return_inverse=True)
+        del refs
+        index_of = dict(zip(used.tolist(), range(len(used))))
+        lat = np.full(len(used), np.nan)
+        lng = np.full(len(used), np.nan)
+        for node in _iter_osm(path, "node"):
+            i = index_of.get(int(node.get("id")))
+            if i is not None:
+                lat[i] = float(node.get("lat"))
+                lng[i] = float(node.get("lon"))
+
+        # 파일에 좌표가 없는 노드(추출 경계 밖)에 걸린 간선은 제외, 남은 노드만 압축 번호로
+        e = inverse.reshape(-1, 2)
+        e = e[~np.isnan(lat[e]).any(axis=1)]
+        if not len(e):
+            raise GraphError(f"보행 가능한 way 의 노드 좌표가 없음: {path}")
+        keep, inverse = np.unique(e, return_inverse=True)
+        return cls.from_edges(lat[keep], lng[keep], inverse.reshape(-1, 2))
+
+    def save(self, path: str) -> None:
+        np.savez(path, lat=self.lat, lng=self.lng, indptr=self.indptr, indices=self.indices,
+                 weight=self.weight, ref_lat=np.float64(self.ref_lat))
+
+    @classmethod
+    def load(cls, path: str) -> "PedestrianGraph":
+        """.npz(변환본) 또는 OSM 추출 파일."""
+        if path.endswith(".npz"):
+            with np.load(path) as z:
+                return cls(z["lat"], z["lng"], z["indptr"], z["indices"], z["weight"], float(z["ref_lat"]))
+        return cls.from_osm(path)
+
+    # ---- 스냅 -------------------------------------------------------------
+    def _build_snap_grid(self) -> None:
+        """노드를 _SNAP_CELL_M 격자 셀 키로 정렬 → 셀별 노드 구간(이분 탐색)."""
+        keys = self._cell_key(self.x, self.y)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        self._cell_keys, self._cell_start = np.unique(sorted_keys, return_index=True)
+        self._cell_start = np.append(self._cell_start, len(order)).astype(np.int32)
+        self._cell_nodes = order.astype(np.int32)
+
+    @staticmethod
+    def _cell_key(x, y):
+        i = np.floor(np.asarray(y, dtype=np.float64) / _SNAP_CELL_M).astype(np.int64)
+        j = np.floor(np.asarray(x, dtype=np.float64) / _SNAP_CELL_M).astype(np.int64)
+        return (i << 32) + (j & 0xFFFFFFFF)
+
+    def nearest_node(self, lat: float, lng: float, max_m: float = PEDESTRIAN_SNAP_MAX_M) -> Tuple[int, float]:
+        """가장 가까운 노드 (index, 거리 m). max_m 안에 없으면 NoRoute."""
+        x, y = (lng - self.ref_lng) * self._kx, (lat - self.ref_lat) * M_PER_DEG_LAT
+        ci, cj = math.floor(y / _SNAP_CELL_M), math.floor(x / _SNAP_CELL_M)
+        reach = math.ceil(max_m / _SNAP_CELL_M)
+        best, best_d = -1, float("inf")
+        # 안쪽 고리부터, 현재 최선보다 먼 고리는 볼 필요 없음
+        for r in range(reach + 1):
+            if best >= 0 and (r - 1) * _SNAP_CELL_M > best_d:
+                break
+            keys = [
+                ((ci + di) << 32) + ((cj + dj) & 0xFFFFFFFF)
+                for di in range(-r, r + 1) for dj in range(-r, r + 1)
+                if max(abs(di), abs(dj)) == r
+            ]
+            pos = np.searchsorted(self._cell_keys, keys)
+            for k, p in zip(keys, pos):
+                if p < len(self._cell_keys) and self._cell_keys[p] == k:
+                    nodes = self._cell_nodes[self._cell_start[p]:self._cell_start[p + 1]]
+                    d = np.hypot(self.x[nodes] - x, self.y[nodes] - y)
+                    m = int(d.argmin())
+                    if d[m] < best_d:
+                        best, best_d = int(nodes[m]), float(d[m])
+        if best < 0 or best_d > max_m:
+            raise NoRoute(f"{max_m}m 안에 보행 노드 없음")
+        return best, best_d
+
+    # ---- 최단 경로 ----------------------------------------------------------
+    def shortest_path(self, src: int, dst: int, max_settled: int = PEDESTRIAN_MAX_SETTLED,
+                      deadline: Optional[float] = None) -> Tuple[float, List[int]]:
+        """A*. (거리 m, 노드 목록). 닿지 않으면 NoRoute, deadline(time.monotonic) 을 넘기면 RouteTimeout."""
+        if src == dst:
+            return 0.0, [src]
+        indptr, indices, weight, xs, ys = self.indptr, self.indices, self.weight, self.x, self.y
+        tx, ty = float(xs[dst]), float(ys[dst])
+        hypot = math.hypot
+
+        g = {src: 0.0}
+        parent = {src: -1}
+        closed = set()
+        heap = [(hypot(float(xs[src]) - tx, float(ys[src]) - ty), 0.0, src)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u in closed:
+                continue
+            if u == dst:
+                path = [u]
+                while parent[path[-1]] >= 0:
+                    path.append(parent[path[-1]])
+                return d, path[::-1]
+            closed.add(u)
+            if len(closed) > max_settled:
+                break
+            if deadline is not None and not len(closed) % _DEADLINE_CHECK_EVERY and time.monotonic() > deadline:
+                raise RouteTimeout(f"탐색 시간 초과({len(closed)}개 노드 확정)")
+            s, e = indptr[u], indptr[u + 1]
+            for v, w in zip(indices[s:e].tolist(), weight[s:e].tolist()):
+                nd = d + w
+                if nd < g.get(v, math.inf):
+                    g[v] = nd
+                    parent[v] = u
+                    heapq.heappush(heap, (nd + hypot(float(xs[v]) - tx, float(ys[v]) - ty), nd, v))
+        raise NoRoute("연결된 보행 경로 없음")
+
+    def distances_from(self, src: int, max_m: float) -> Tuple[np.ndarray, np.ndarray]:
+        """src 에서 max_m 이내로 닿는 모든 노드(다익스트라). (노드 배열, 거리 배열)."""
+        indptr, indices, weight = self.indptr, self.indices, self.weight
+        dist = {src: 0.0}
+        done = {}
+        heap = [(0.0, src)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done[u] = d
+            s, e = indptr[u], indptr[u + 1]
+            for v, w in zip(indices[s:e].tolist(), weight[s:e].tolist()):
+                nd = d + w
+                if nd <= max_m and nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return (np.fromiter(done.keys(), dtype=np.int64, count=len(done)),
+                np.fromiter(done.values(), dtype=np.float64, count=len(done)))
+
+    def route(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float,
+              timeout: Optional[float] = None) -> Dict[str, Any]:
+        """tmap_client.get_pedestrian_route 형식. 스냅 구간(좌표 ↔ 노드)은 직선으로 더함. timeout(초) 초과 시 RouteTimeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        src, d0 = self.nearest_node(start_lat, start_lng)
+        dst, d1 = self.nearest_node(end_lat, end_lng)
+        dist, nodes = self.shortest_path(src, dst, deadline=deadline)
+        distance_m = int(round(d0 + dist + d1))
+        path = [{"lat": start_lat, "lng": start_lng}]
+        path += [{"lat": float(self.lat[n]), "lng": float(self.lng[n])} for n in nodes]
+        path.append({"lat": end_lat, "lng": end_lng})
+        return {
+            "path": path,
+            "distance_m": distance_m,
+            "duration_s": max(60, int(distance_m / WALK_M_PER_MIN * 60)),
+        }
+
+
+# =============================================================================
+# B. 프로세스 공용 그래프
+# =============================================================================
+_graph: Optional[PedestrianGraph] = None
+_graph_error: Optional[Tuple[float, str]] = None   # (실패 시각 monotonic, 사유)
+_graph_lock = threading.Lock()
+
+
+def get_pedestrian_graph() -> Optional[PedestrianGraph]:
+    """
+    PEDESTRIAN_GRAPH_PATH 의 그래프(첫 호출 시 적재). 설정이 없으면 None.
+    적재에 실패하면 GraphError, 이후 PEDESTRIAN_GRAPH_RETRY_S 동안은 다시 읽지 않고 바로 GraphError.
+    """
+    global _graph, _graph_error
+    if _graph is None and PEDESTRIAN_GRAPH_PATH:
+        with _graph_lock:
+            if _graph is None:
+                if _graph_error is None or time.monotonic() - _graph_error[0] >= PEDESTRIAN_GRAPH_RETRY_S:
+                    try:
+                        _graph, _graph_error = PedestrianGraph.load(PEDESTRIAN_GRAPH_PATH), None
+                    except Exception as e:
+                        log.exception("[pedestrian_graph] load failed: %s", PEDESTRIAN_GRAPH_PATH)
+                        _graph_error = (time.monotonic(), f"{type(e).__name__}: {e}")
+                if _graph is None:
+                    raise GraphError(f"보행 그래프 적재 실패({_graph_error[1]})")
+    return _graph
@@ -0,0 +1,274 @@
+"""
+여러 마켓을 들러 장바구니 전체를 사는 장보기 동선 계획.
+
+1) 후보: rank_for_user 와 같은 규칙(영업 중 + 거리 범위)의 마켓, 재고는 재고 비트셋 인덱스
+2) 마켓 선택: 장바구니 비트셋에 대한 집합 덮개(set cover)
+   - 탐욕법으로 초기 해 → 분기 한정(branch-and-bound)으로 (들를 곳 수, 거리 합) 최소화
+   - 지연 예산(PLANNER_BUDGET_MS)을 넘기면 그때까지의 최선 해 반환(optimal=False)
+3) 방문 순서: 사용자 위치에서 출발해 돌아오는 도보 동선, 최근접 이웃 → 2-opt
+   거리 행렬은 Haversine, 경로 저장소(RouteCache)에 유효한 실제 도보 거리가 있으면 그 값으로 대체(외부 호출 없음)
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from market.models import Market, RouteCache
+from market.utils import get_latest_shopping_items
+from .inventory_index import get_inventory_index
+from .recommendation import rank_for_user
+from .route_store import ROUTE_STORE_TTL_S, snap_origin
+from .spatial_index import haversine_m
+
+PLANNER_BUDGET_MS = getattr(settings, "PLANNER_BUDGET_MS", 50)
+PLANNER_MAX_STOPS = getattr(settings, "PLANNER_MAX_STOPS", 4)
+# 분기 한정에 넣을 최대 후보 수(지배 제거 후, 가까운 순)
+PLANNER_MAX_CANDIDATES = getattr(settings, "PLANNER_MAX_CANDIDATES", 200)
+
+
+@dataclass
+class PlanStop:
+    market_id: int
+    ingredient_ids: List[int]       # 이 마켓에서 살 재료
+    leg_m: int = 0                  # 직전 지점(첫 곳은 사용자 위치)에서 오는 거리
+
+
+@dataclass
+class ShoppingPlan:
+    stops: List[PlanStop] = field(default_factory=list)
+    uncovered: List[int] = field(default_factory=list)   # 계획으로 살 수 없는 재료 id
+    total_m: int = 0                                     # 출발 → 모든 마켓 → 귀가
+    optimal: bool = True
+    elapsed_ms: float = 0.0
+
+    @property
+    def market_ids(self) -> List[int]:
+        return [s.market_id for s in self.stops]
+
+
+# =============================================================================
+# A. 집합 덮개
+# =============================================================================
+def _prune(cands: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    """(id, 덮는 비트, 거리) 중 더 가깝거나 같은 다른 후보에 포함되는 후보 제거."""
+    cands = sorted(cands, key=lambda c: (c[2], -c[1].bit_count()))
+    kept: List[Tuple[int, int, int]] = []
+    for c in cands:
+        if c[1] and not any(c[1] & k[1] == c[1] for k in kept):
+            kept.append(c)
+    return kept
+
+
+def _greedy(cands, need: int, max_stops: int):
+    chosen, covered, cost = [], 0, 0
+    while covered != need and len(chosen) < max_stops:
+        best = max(
+            (c for c in cands if c[1] & ~covered),
+            key=lambda c: ((c[1] & ~covered).bit_count(), -c[2]),
+            default=None,
+        )
+        if best is None:
+            break
+        chosen.append(best)
+        covered |= best[1]
+        cost += best[2]
+    return chosen, covered, cost
+
+
+def choose_markets(cands: Sequence[Tuple[int, int, int]], need: int, max_stops: int,
+                   deadline: float) -> Tuple[List[Tuple[int, int, int]], bool]:
+    """
+    need 비트를 덮는 후보(id, 덮는 비트, 거리) 조합.
+    목적: (덮은 비트 수 ↓, 들를 곳 수 ↑, 거리 합 ↑) 사전식 최소, 최대 max_stops 곳.
+    반환: (선택 후보들, 예산 안에 탐색을 끝냈는지)
+    """
+    cands = _prune(list(cands))[:PLANNER_MAX_CANDIDATES]
+    if not cands:
+        return [], True
+
+    # 어느 후보에도 없는 재료는 목표에서 제외
+    reachable = 0
+    for c in cands:
+        reachable |= c[1]
+    need &= reachable
+
+    g_chosen, g_cov, g_cost = _greedy(cands, need, max_stops)
+    best = {"score": (-g_cov.bit_count(), len(g_chosen), g_cost), "chosen": g_chosen}
+    max_gain = max(c[1].bit_count() for c in cands)
+    min_cost = min(c[2] for c in cands)
+    complete = True
+
+    # 비트별로 그 비트를 덮는 후보(가까운 순)
+    by_bit: Dict[int, List[Tuple[int, int, int]]] = {}
+    for c in cands:
+        m = c[1]
+        while m:
+            low = m & -m
+            by_bit.setdefault(low, []).append(c)
+            m ^= low
+
+    def search(chosen, covered, cost, skipped):
+        nonlocal complete
+        if time.perf_counter() > deadline:
+            complete = False
+            return
+        cov_n = covered.bit_count()
+        score = (-cov_n, len(chosen), cost)
+        if score < best["score"]:
+            best["score"], best["chosen"] = score, list(chosen)
+
+        rest = need & ~covered & ~skipped
+        if not rest or len(chosen) >= max_stops:
+            return
+        # 한정: 이 가지에서 가능한 최선(덮을 수 있는 최대 비트, 그에 필요한 최소 곳 수/거리)도 못 넘으면 중단
+        opt_cov = min(cov_n + rest.bit_count(), cov_n + (max_stops - len(chosen)) * max_gain)
+        more = -(-(opt_cov - cov_n) // max_gain)
+        if (-opt_cov, len(chosen) + more, cost + more * min_cost) >= best["score"]:
+            return
+
+        # 덮는 후보가 가장 적은 비트부터 분기, 마지막 가지는 그 비트를 포기
+        bit = min((b for b in by_bit if b & rest), key=lambda b: len(by_bit[b]))
+        for c in by_bit[bit]:
+            chosen.append(c)
+            search(chosen, covered | c[1], cost + c[2], skipped)
+            chosen.pop()
+            if not complete:
+                return
+        search(chosen, covered, cost, skipped | bit)
+
+    search([], 0, 0, 0)
+    return best["chosen"], complete
+
+
+# =============================================================================
+# B. 방문 순서
+# =============================================================================
+def _distance_matrix(points: List[Tuple[float, float]], market_ids: List[Optional[int]]) -> List[List[int]]:
+    """points[0] = 사용자, 나머지 = 마켓. 경로 저장소 값이 있으면 우선."""
+    n = len(points)
+    d = [[0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            d[i][j] = d[j][i] = int(round(haversine_m(*points[i], *points[j])))
+
+    cells = [snap_origin(*p) for p in points]
+    fresh_after = timezone.now() - timedelta(seconds=ROUTE_STORE_TTL_S)
+    rows = RouteCache.objects.filter(
+        origin_cell__in=set(cells), market_id__in=[m for m in market_ids if m], fetched_at__gte=fresh_after,
+    ).values_list("origin_cell", "market_id", "distance_m")
+    stored = {(c, m): dist for c, m, dist in rows}
+    for i in range(n):
+        for j in range(n):
+            dist = stored.get((cells[i], market_ids[j])) if i != j and market_ids[j] else None
+            if dist:
+                d[i][j] = dist
+    return d
+
+
+def _tour_len(order: List[int], d) -> int:
+    return sum(d[order[i]][order[i + 1]] for i in range(len(order) - 1))
+
+
+def order_stops(d: List[List[int]]) -> List[int]:
+    """0(사용자)에서 출발해 0으로 돌아오는 순서. 최근접 이웃 → 2-opt."""
+    n = len(d)
+    order, left = [0], set(range(1, n))
+    while left:
+        nxt = min(left, key=lambda j: d[order[-1]][j])
+        order.append(nxt)
+        left.remove(nxt)
+    order.append(0)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(order) - 2):
+            for j in range(i + 1, len(order) - 1):
+                cand = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                if _tour_len(cand, d) < _tour_len(order, d):
+                    order, improved = cand, True
+    return order
+
+
+# =============================================================================
+# C. 진입점
+# =============================================================================
+def plan_for_user(user, *, shopping_items: Optional[Dict[int, str]] = None, filt=None, ranked=None,
+                  budget_ms: float = PLANNER_BUDGET_MS, max_stops: int = PLANNER_MAX_STOPS) -> ShoppingPlan:
+    """
+    사용자 장바구니 전체를 덮는 마켓 조합 + 방문 순서.
+    ranked: 이미 계산한 랭킹(선계산 등)이 있으면 후보로 재사용.
+    """
+    t0 = time.perf_counter()
+    deadline = t0 + budget_ms / 1000
+
+    if shopping_items is None:
+        shopping_items = get_latest_shopping_items(user)
+    cart = list(shopping_items)
+    if not cart:
+        return ShoppingPlan(elapsed_ms=(time.perf_counter() - t0) * 1000)
+
+    index = get_inventory_index()
+    need = index.mask_of(cart)
+    if ranked is None:
+        ranked = rank_for_user(user, filt=filt, shopping_items=shopping_items)
+    cands = [(r.market_id, index.stock_mask(r.market_id) & need, r.distance_m) for r in ranked]
+
+    chosen, complete = choose_markets(cands, need, max_stops, deadline)
+    plan = ShoppingPlan(optimal=complete)
+
+    covered = 0
+    for c in chosen:
+        covered |= c[1]
+    covered_ids = set(index.ids_of(covered))
+    plan.uncovered = [iid for iid in cart if iid not in covered_ids]
+    if not chosen:
+        plan.elapsed_ms = (time.perf_counter() - t0) * 1000
+        return plan
+
+    coords = {
+        mid: (lat, lng)
+        for mid, lat, lng in Market.objects.filter(id__in=[c[0] for c in chosen]).values_list("id", "latitude", "longitude")
+    }
+    points = [(user.latitude, user.longitude)] + [coords[c[0]] for c in chosen]
+    d = _distance_matrix(points, [None] + [c[0] for c in chosen])
+    order = order_stops(d)
+
+    # 같은 재료를 여러 곳에서 살 수 있으면 먼저 들르는 곳에서 구입
+    bought = 0
+    for prev, cur in zip(order, order[1:-1]):
+        mid, mask, _ = chosen[cur - 1]
+        plan.stops.append(PlanStop(mid, index.ids_of(mask & ~bought), d[prev][cur]))
+        bought |= mask
+    plan.total_m = _tour_len(order, d)
+    plan.elapsed_ms = (time.perf_counter() - t0) * 1000
+    return plan
+
+
+def serialize_plan(plan: ShoppingPlan, shopping_items: Dict[int, str]) -> Dict:
+    """JSON 응답/템플릿용 dict. shopping_items: {재료 id: 이름}."""
+    markets = Market.objects.in_bulk(plan.market_ids)
+    return {
+        "optimal": plan.optimal,
+        "elapsed_ms": round(plan.elapsed_ms, 1),
+        "total_m": plan.total_m,
+        "stops": [
+            {
+                "market": {
+                    "id": s.market_id,
+                    "name": markets[s.market_id].name,
+                    "market_type": markets[s.market_id].market_type,
+                    "address": markets[s.market_id].address,
+                    "latitude": markets[s.market_id].latitude,
+                    "longitude": markets[s.market_id].longitude,
+                },
+                "leg_m": s.leg_m,
+                "ingredients": [shopping_items.get(i, "") for i in s.ingredient_ids],
+            }
+            for s in plan.stops
+        ],
+        "uncovered": [shopping_items.get(i, "") for i in plan.uncovered],
+    }
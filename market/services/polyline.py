@@ -0,0 +1,136 @@
+"""
+경로 폴리라인 단순화 + 압축 인코딩.
+
+- simplify(): Douglas–Peucker. 허용 오차(m)는 지도 줌 레벨의 화면 1px 보다 작게 잡아 눈으로 보이는 모양은 그대로
+- encode()/decode(): Google Encoded Polyline 형식(정밀도 1e-5 ≈ 1.1m)
+  static/js/polyline.js 의 decodePolyline() 과 짝
+"""
+import math
+from typing import Dict, List, Sequence, Tuple
+
+Point = Tuple[float, float]  # (lat, lng)
+
+_M_PER_DEG_LAT = 111_320.0
+
+# Kakao 지도 레벨 1의 화면 1px 당 대략적 거리(m). 레벨이 1 오를 때마다 2배
+_KAKAO_M_PER_PX_LEVEL1 = 0.25
+# 경로 전체가 들어가도록 맞출 때 기준 화면 크기(px, 모바일 지도 영역)
+_VIEWPORT_PX = 360
+# setBounds 이후 사용자가 더 확대해도 1px 이내가 유지되도록 남겨둘 여유 레벨
+_ZOOM_IN_HEADROOM = 2
+
+
+def meters_per_pixel(level: int) -> float:
+    return _KAKAO_M_PER_PX_LEVEL1 * (2 ** (max(1, level) - 1))
+
+
+def fit_level(points: Sequence[Point]) -> int:
+    """경로 전체가 화면에 들어가는 Kakao 지도 레벨(map.setBounds 결과 근사)."""
+    if len(points) < 2:
+        return 1
+    lats = [p[0] for p in points]
+    lngs = [p[1] for p in points]
+    cos_lat = math.cos(math.radians(sum(lats) / len(lats)))
+    extent_m = max(
+        (max(lats) - min(lats)) * _M_PER_DEG_LAT,
+        (max(lngs) - min(lngs)) * _M_PER_DEG_LAT * cos_lat,
+    )
+    level = 1
+    while meters_per_pixel(level) * _VIEWPORT_PX < extent_m and level < 14:
+        level += 1
+    return level
+
+
+def tolerance_for_level(level: int) -> float:
+    """해당 레벨에서 반 픽셀(m). 여유 레벨만큼 더 확대한 화면 기준."""
+    return meters_per_pixel(level - _ZOOM_IN_HEADROOM) / 2
+
+
+def simplify(points: Sequence[Point], tolerance_m: float) -> List[Point]:
+    """Douglas–Peucker 단순화(반복문 버전). 시작/끝 점은 항상 유지."""
+    n = len(points)
+    if n < 3 or tolerance_m <= 0:
+        return list(points)
+
+    # 국소 평면 근사(m) 좌표로 변환
+    lat0 = math.radians(points[0][0])
+    kx = _M_PER_DEG_LAT * math.cos(lat0)
+    xy = [(p[1] * kx, p[0] * _M_PER_DEG_LAT) for p in points]
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        (x1, y1), (x2, y2) = xy[i], xy[j]
+        dx, dy = x2 - x1, y2 - y1
+        seg_len2 = dx * dx + dy * dy
+
+        max_d2, idx = -1.0, i
+        for k in range(i + 1, j):
+            px, py = xy[k]
+            if seg_len2 == 0:
+                d2 = (px - x1) ** 2 + (py - y1) ** 2
+            else:
+                t = max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / seg_len2))
+                d2 = (px - x1 - t * dx) ** 2 + (py - y1 - t * dy) ** 2
+            if d2 > max_d2:
+                max_d2, idx = d2, k
+
+        if max_d2 > tolerance_m * tolerance_m:
+            keep[idx] = True
+            stack.append((i, idx))
+            stack.append((idx, j))
+
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _encode_value(v: int, out: List[str]) -> None:
+    v = ~(v << 1) if v < 0 else (v << 1)
+    while v >= 0x20:
+        out.append(chr((0x20 | (v & 0x1f)) + 63))
+        v >>= 5
+    out.append(chr(v + 63))
+
+
+def encode(points: Sequence[Point], precision: int = 5) -> str:
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        ilat, ilng = round(lat * factor), round(lng * factor)
+        _encode_value(ilat - prev_lat, out)
+        _encode_value(ilng - prev_lng, out)
+        prev_lat, prev_lng = ilat, ilng
+    return "".join(out)
+
+
+def decode(encoded: str, precision: int = 5) -> List[Point]:
+    factor = 10 ** precision
+    points: List[Point] = []
+    index = lat = lng = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else (result >> 1))
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+    return points
+
+
+def encode_route_path(path: Sequence[Dict[str, float]]) -> str:
+    """TMAP 형식 경로 [{lat, lng}, ...] → 화면 맞춤 레벨 기준 단순화 + 인코딩 문자열."""
+    points = [(p["lat"], p["lng"]) for p in path]
+    return encode(simplify(points, tolerance_for_level(fit_level(points))))
@@ -0,0 +1,109 @@
+"""
+추천 마켓 + 경로 선계산(추측 실행).
+
+장바구니 확정(food.confirm_shopping_list)이나 필터 저장 시점에 이미 장바구니/주소/필터를 알고 있으므로,
+사용자가 "가까운 마켓" 화면으로 넘어오기 전에 백그라운드에서
+  랭킹(상위 RANKING_SESSION_MAX) → 1순위 마켓 경로/이동정보
+를 계산해 캐시에 저장해 둔다. nearest/direction 화면은 지문(fingerprint)이 일치할 때만 재사용.
+
+지문: 출발 좌표 스냅 셀 + 필터(거리/타입) + 장바구니 id/버전 + 후보 재고 버전
+  (후보 재고 버전 = 필터 최대 거리 안 격자 셀의 마켓 × 장바구니 재료의 변경 로그 마지막 seq)
+→ 위치/필터/장바구니/후보 마켓의 장바구니 재료 재고 중 하나라도 바뀌면 자동으로 무효
+  (다른 지역/다른 재료의 재고 변경으로는 무효가 되지 않음). 영업 여부 변화는 PRECOMPUTE_TTL_S 로 제한.
+"""
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from market.models import Market, MarketFilterSetting, ShoppingList, ShoppingListIngredient
+from .background import run_in_background
+from .ranking import RankedMarket
+from .recommendation import RANKING_SESSION_MAX, rank_for_user
+from .route_service import route_user_to_market
+from .route_store import snap_origin
+from .stock_events import cart_version, stock_version_near
+from .walking_matrix import travel_info_for
+
+log = logging.getLogger(__name__)
+
+PRECOMPUTE_TTL_S = getattr(settings, "PRECOMPUTE_TTL_S", 60 * 3)
+
+
+def _key(user_id: int) -> str:
+    return f"precompute:{user_id}"
+
+
+def fingerprint(user, filt=None) -> Tuple:
+    if filt is None:
+        filt, _ = MarketFilterSetting.objects.get_or_create(user=user)
+    sl_id = (
+        ShoppingList.objects
+        .filter(user=user, is_done=False)
+        .order_by('-created_at')
+        .values_list('id', flat=True)
+        .first()
+    )
+    cart_ids = (
+        ShoppingListIngredient.objects.filter(shopping_list_id=sl_id).values_list('ingredient_id', flat=True)
+        if sl_id else ()
+    )
+    return (
+        snap_origin(user.latitude, user.longitude),
+        filt.distance_preference,
+        filt.type_preference,
+        sl_id,
+        cart_version(sl_id) if sl_id else 0,
+        stock_version_near(user.latitude, user.longitude, filt.distance_range_m[1], cart_ids),
+    )
+
+
+def precompute_for_user(user_id: int) -> Optional[Dict[str, Any]]:
+    """랭킹 + 1순위 마켓 경로/이동정보 계산 후 저장. 지문이 같은 결과가 이미 있으면 건너뜀."""
+    user = get_user_model().objects.filter(id=user_id).first()
+    if user is None or user.latitude is None or user.longitude is None:
+        return None
+
+    filt, _ = MarketFilterSetting.objects.get_or_create(user=user)
+    fp = fingerprint(user, filt)
+    current = cache.get(_key(user_id))
+    if current is not None and current["fingerprint"] == fp:
+        return current
+
+    t0 = time.perf_counter()
+    ranked = rank_for_user(user, filt=filt, k=RANKING_SESSION_MAX)
+    entry: Dict[str, Any] = {"fingerprint": fp, "ranked": [tuple(r) for r in ranked], "market_id": None}
+    if ranked:
+        market = Market.objects.get(id=ranked[0].market_id)
+        # 경로 메모(유저 캐시)/경로 저장소도 함께 채워짐
+        entry["market_id"] = market.id
+        entry["route"] = route_user_to_market(user, market)
+        entry["travel"] = travel_info_for(user, market)
+
+    cache.set(_key(user_id), entry, PRECOMPUTE_TTL_S)
+    log.info("[precompute] user=%s market=%s %.0fms", user_id, entry["market_id"], (time.perf_counter() - t0) * 1000)
+    return entry
+
+
+def schedule_precompute(user) -> None:
+    """커밋 후 백그라운드에서 precompute_for_user 실행."""
+    if not getattr(user, "is_authenticated", False):
+        return
+    user_id = user.id
+    transaction.on_commit(lambda: run_in_background(precompute_for_user, user_id))
+
+
+def load_precomputed(user, filt=None) -> Optional[Dict[str, Any]]:
+    """현재 지문과 일치하는 선계산 결과(없거나 낡았으면 None)."""
+    entry = cache.get(_key(user.id))
+    if entry is None or entry["fingerprint"] != fingerprint(user, filt):
+        return None
+    return entry
+
+
+def ranked_of(entry: Dict[str, Any]):
+    return [RankedMarket(*r) for r in entry["ranked"]]
@@ -0,0 +1,173 @@
+"""
+NumPy 벡터화 마켓 랭킹 엔진.
+
+- 마켓 좌표/타입/영업 요일·시간을 연속 배열(MarketArrays)로 보관
+- 거리(Haversine)·거리 범위·영업 여부·마감까지 남은 분을 배열 연산 한 번에 계산
+- 순서는 점수 엔진(scoring)으로 매김, 기본 가중치는 nearest_market_view 의 정렬 + (마트→전통시장) 폴백 규칙과 동일
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from django.utils import timezone
+
+from .schedule import MINUTES_PER_DAY, MINUTES_PER_WEEK, compile_schedule, parse_open_days
+from .scoring import DEFAULT_WEIGHTS, ScoringBatch, ScoringWeights, score, top_k
+
+EARTH_RADIUS_KM = 6371.0
+
+TYPE_CODES = {'mart': 0, 'trad': 1}
+_UNKNOWN_TYPE = 2
+
+
+def day_mask_of(open_days: str) -> int:
+    """'월,화,수' → 요일 비트마스크 (bit0=월 … bit6=일)."""
+    return sum(1 << wd for wd in parse_open_days(open_days))
+
+
+def _seconds_of_day(t) -> float:
+    if t is None:
+        return -1.0
+    return t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6
+
+
+@dataclass
+class MarketArrays:
+    """후보 마켓들의 연속 배열 스냅샷."""
+    ids: np.ndarray         # int64
+    lat_rad: np.ndarray     # float64
+    lng_rad: np.ndarray     # float64
+    type_code: np.ndarray   # int8 (TYPE_CODES)
+    day_mask: np.ndarray    # uint8
+    open_s: np.ndarray      # float64, 자정 기준 초 (-1: 미설정)
+    close_s: np.ndarray     # float64
+    sched_idx: np.ndarray   # int32, until_close 의 행 번호(같은 영업시간끼리 공유)
+    until_close: np.ndarray # uint16 [영업표 수, MINUTES_PER_WEEK], schedule.WeeklySchedule.until_close
+
+    FIELDS = ('id', 'latitude', 'longitude', 'market_type', 'open_days', 'open_time', 'close_time')
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence]) -> "MarketArrays":
+        """
+        rows: (id, lat, lng, market_type, open_days, open_time, close_time) 튜플들.
+        좌표가 없는 행은 제외.
+        """
+        rows = [r for r in rows if r[1] is not None and r[2] is not None]
+        n = len(rows)
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        lat = np.fromiter((r[1] for r in rows), dtype=np.float64, count=n)
+        lng = np.fromiter((r[2] for r in rows), dtype=np.float64, count=n)
+        type_code = np.fromiter(
+            (TYPE_CODES.get((r[3] or '').lower(), _UNKNOWN_TYPE) for r in rows), dtype=np.int8, count=n
+        )
+        day_mask = np.fromiter((day_mask_of(r[4]) for r in rows), dtype=np.uint8, count=n)
+        open_s = np.fromiter((_seconds_of_day(r[5]) for r in rows), dtype=np.float64, count=n)
+        close_s = np.fromiter((_seconds_of_day(r[6]) for r in rows), dtype=np.float64, count=n)
+        keys: Dict[tuple, int] = {}
+        sched_idx = np.fromiter((keys.setdefault((r[4], r[5], r[6]), len(keys)) for r in rows), dtype=np.int32, count=n)
+        until_close = np.zeros((len(keys), MINUTES_PER_WEEK), dtype=np.uint16)
+        for key, i in keys.items():
+            until_close[i] = np.frombuffer(compile_schedule(*key).until_close, dtype=np.uint16)
+        return cls(ids, np.radians(lat), np.radians(lng), type_code, day_mask, open_s, close_s, sched_idx, until_close)
+
+    @classmethod
+    def from_queryset(cls, qs) -> "MarketArrays":
+        return cls.from_rows(qs.values_list(*cls.FIELDS))
+
+
+class RankedMarket(NamedTuple):
+    market_id: int
+    distance_m: int
+    match_count: int
+    type_priority: int = 0
+    fallback: bool = False   # 마트→전통시장 폴백으로 앞에 온 항목
+
+
+def distances_m(arrays: MarketArrays, user_lat: float, user_lng: float) -> np.ndarray:
+    """Haversine 거리(m, 반올림 정수) 배열."""
+    lat1, lng1 = np.radians(user_lat), np.radians(user_lng)
+    d_lat = arrays.lat_rad - lat1
+    d_lng = arrays.lng_rad - lng1
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat1) * np.cos(arrays.lat_rad) * np.sin(d_lng / 2) ** 2
+    km = EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return np.rint(km * 1000).astype(np.int64)
+
+
+def open_mask(arrays: MarketArrays, when=None) -> np.ndarray:
+    """
+    Market.is_open_now(schedule.WeeklySchedule)와 같은 규칙의 영업 여부 배열.
+    자정 넘김, open==close → 24시간, 마감 시각은 영업 종료(open <= t < close).
+    """
+    now = timezone.localtime(when or timezone.now())
+    t = _seconds_of_day(now.time())
+    ot, ct = arrays.open_s, arrays.close_s
+
+    day_ok = ((arrays.day_mask >> now.weekday()) & 1).astype(bool) & (ot >= 0) & (ct >= 0)
+    all_day = ot == ct
+    same_day = (ot < ct) & (ot <= t) & (t < ct)
+    overnight = (ot > ct) & ((t >= ot) | (t < ct))
+    return day_ok & (all_day | same_day | overnight)
+
+
+def minutes_to_close(arrays: MarketArrays, when=None) -> np.ndarray:
+    """
+    마감까지 남은 분(영업 중이 아니면 0). Market.minutes_until_close(WeeklySchedule)와 같은 값:
+    이어지는 영업일의 24시간/자정 넘김 구간까지 합산, 매일 24시간 영업은 MINUTES_PER_WEEK.
+    """
+    now = timezone.localtime(when or timezone.now())
+    minute = now.weekday() * MINUTES_PER_DAY + now.hour * 60 + now.minute
+    run = arrays.until_close[arrays.sched_idx, minute].astype(np.int64)
+    return np.where(run > 0, (run * 60 - now.second) // 60, 0).astype(np.float64)
+
+
+def rank_markets(
+    arrays: MarketArrays,
+    user_lat: float,
+    user_lng: float,
+    *,
+    distance_range: tuple[int, int, bool],
+    type_pref: str = 'none',
+    match_counter: Optional[Callable[[List[int]], Dict[int, int]]] = None,
+    cart_size: Optional[int] = None,
+    weights: Optional[ScoringWeights] = None,
+    when=None,
+    k: Optional[int] = None,
+) -> List[RankedMarket]:
+    """
+    후보 마켓 랭킹 상위 K개.
+    - distance_range: MarketFilterSetting.distance_range_m (min_m, max_m, min_is_strict)
+    - match_counter: 범위/영업 통과 마켓 id 목록 → {id: 재료 일치수} (예: InventoryIndex.count_matches, utils.count_matches_by_market)
+    - cart_size: 장바구니 재료 수(커버리지 = 일치수 / cart_size), 생략 시 1
+    - 순서: scoring.score (기본 가중치 = 타입 우선 → 마트 우선 시 매칭수 ↓ → 거리 ↑, 마트→전통시장 폴백)
+    """
+    if not len(arrays):
+        return []
+
+    min_m, max_m, min_strict = distance_range
+    dist = distances_m(arrays, user_lat, user_lng)
+    lower_ok = dist > min_m if min_strict else dist >= min_m
+    mask = lower_ok & (dist <= max_m) & open_mask(arrays, when)
+
+    pos = np.flatnonzero(mask)
+    if not len(pos):
+        return []
+    ids = arrays.ids[pos]
+
+    matches = np.zeros(len(pos), dtype=np.int64)
+    if match_counter is not None:
+        counts = match_counter(ids.tolist())
+        matches = np.fromiter((counts.get(i, 0) for i in ids.tolist()), dtype=np.int64, count=len(ids))
+
+    batch = ScoringBatch.single(
+        ids, dist[pos], arrays.type_code[pos], matches, minutes_to_close(arrays, when)[pos],
+        type_pref=type_pref, cart_size=1 if cart_size is None else cart_size,
+    )
+    scored = score(batch, weights or DEFAULT_WEIGHTS)
+    return [
+        RankedMarket(int(ids[i]), int(batch.distance_m[i]), int(matches[i]),
+                     int(scored.type_pri[i]), bool(scored.fallback[i]))
+        for i in top_k(scored.score, k)
+    ]
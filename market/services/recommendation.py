@@ -0,0 +1,147 @@
+"""
+사용자 기준 마켓 추천 목록(상위 K + 다음 후보 페이지).
+
+- rank_for_user(): nearest_market_view 와 같은 필터/정렬/폴백 규칙으로 랭킹
+- start_session()/load_page(): 랭킹 결과를 캐시에 토큰으로 보관하고 커서("토큰:오프셋")로 이어서 조회
+  → 프론트가 "다음 마켓"으로 넘길 때 서버에서 후보 스캔/경로 조회를 다시 하지 않음
+"""
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from market.models import Market, MarketFilterSetting
+from market.utils import count_matches_by_market, get_latest_shopping_items
+from .inventory_index import INVENTORY_INDEX_ENABLED, get_inventory_index
+from .isochrone import get_isochrone_index
+from .ranking import MarketArrays, RankedMarket, rank_markets
+from .scoring import ScoringWeights
+
+RANKING_SESSION_TTL_S = getattr(settings, "RANKING_SESSION_TTL_S", 60 * 5)
+# 한 세션에 보관할 최대 후보 수
+RANKING_SESSION_MAX = getattr(settings, "RANKING_SESSION_MAX", 50)
+
+
+class CursorError(ValueError):
+    """형식이 잘못된 커서."""
+
+
+class CursorExpired(CursorError):
+    """세션 만료(또는 다른 사용자의 토큰) → 처음부터 다시 조회."""
+
+
+def rank_for_user(user, *, filt=None, shopping_items=None, k: Optional[int] = None, when=None) -> List[RankedMarket]:
+    """사용자 위치/필터/최신 장바구니 기준 랭킹 상위 k개(None 이면 전체)."""
+    if filt is None:
+        filt, _ = MarketFilterSetting.objects.get_or_create(user=user)
+    if shopping_items is None:
+        shopping_items = get_latest_shopping_items(user)
+    return rank_at(user.latitude, user.longitude, filt=filt, shopping_items=shopping_items, k=k, when=when)
+
+
+def _match_counter(shopping_items: Dict[int, str]):
+    """재고 비트셋 인덱스(기본) 또는 DB 집계 한 번으로 후보 마켓별 매칭수."""
+    if INVENTORY_INDEX_ENABLED:
+        return lambda ids: get_inventory_index().count_matches(ids, shopping_items.keys())
+    return lambda ids: count_matches_by_market(ids, shopping_items.keys())
+
+
+def rank_at(lat: float, lng: float, *, filt, shopping_items: Dict[int, str], k: Optional[int] = None,
+            when=None, weights: Optional[ScoringWeights] = None) -> List[RankedMarket]:
+    """임의 출발 좌표/시각 기준 랭킹(rank_for_user, 기록 재생(replay) 공용)."""
+    min_m, max_m, min_strict = filt.distance_range_m
+
+    qs = Market.objects.near(lat, lng, max_m)
+    walk_min = filt.walk_minutes
+    if walk_min:
+        # 걸어서 N분: 사용자 셀이 등시선 안에 드는 마켓만(등시선이 아직 없는 마켓은 직선거리 범위로 판단)
+        iso = get_isochrone_index()
+        within = iso.markets_within(lat, lng, walk_min)
+        arrays = MarketArrays.from_rows(
+            r for r in qs.values_list(*MarketArrays.FIELDS) if r[0] in within or not iso.covers(r[0])
+        )
+    else:
+        arrays = MarketArrays.from_queryset(qs)
+    return rank_markets(
+        arrays, lat, lng,
+        distance_range=(min_m, max_m, min_strict),
+        type_pref=filt.type_preference,
+        match_counter=_match_counter(shopping_items),
+        cart_size=len(shopping_items),
+        weights=weights,
+        when=when,
+        k=k,
+    )
+
+
+# =============================================================================
+# 커서 페이지
+# =============================================================================
+def _session_key(user_id: int, token: str) -> str:
+    return f"ranking_session:{user_id}:{token}"
+
+
+def encode_cursor(token: str, offset: int) -> str:
+    return f"{token}:{offset}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    token, _, offset = (cursor or "").partition(":")
+    if not token or not offset.isdigit():
+        raise CursorError("invalid cursor")
+    return token, int(offset)
+
+
+def start_session(user, ranked: List[RankedMarket]) -> str:
+    """랭킹 결과(상위 RANKING_SESSION_MAX개)를 캐시에 보관하고 토큰 반환."""
+    token = uuid.uuid4().hex[:16]
+    rows = [tuple(r) for r in ranked[:RANKING_SESSION_MAX]]
+    cache.set(_session_key(user.id, token), rows, RANKING_SESSION_TTL_S)
+    return token
+
+
+def load_page(user, token: str, offset: int, limit: int) -> Tuple[List[RankedMarket], Optional[str], int]:
+    """
+    (이번 페이지 항목, 다음 커서 또는 None, 전체 후보 수).
+    세션이 만료됐거나 다른 사용자의 토큰이면 CursorExpired.
+    """
+    rows = cache.get(_session_key(user.id, token))
+    if rows is None:
+        raise CursorExpired("cursor expired")
+    page = [RankedMarket(*r) for r in rows[offset:offset + limit]]
+    end = offset + len(page)
+    next_cursor = encode_cursor(token, end) if end < len(rows) else None
+    return page, next_cursor, len(rows)
+
+
+def serialize_page(page: List[RankedMarket], offset: int, cart_size: int, when=None) -> List[Dict[str, Any]]:
+    """페이지 항목 → JSON 직렬화용 dict. 영업 여부/마감까지 남은 시간은 조회 시점 기준."""
+    markets = Market.objects.in_bulk([r.market_id for r in page])
+    items = []
+    for i, r in enumerate(page):
+        m = markets.get(r.market_id)
+        if m is None:  # 세션 보관 중 삭제된 마켓
+            continue
+        items.append({
+            "rank": offset + i + 1,
+            "id": m.id,
+            "name": m.name,
+            "market_type": m.market_type,
+            "address": m.address,
+            "latitude": m.latitude,
+            "longitude": m.longitude,
+            "image_url": (m.image.url if m.image else ""),
+            "distance_m": r.distance_m,
+            "is_open": m.is_open_now(when),
+            "closing_in_minutes": m.minutes_until_close(when),
+            "match_count": r.match_count,
+            "cart_size": cart_size,
+            "score": {
+                "type_priority": r.type_priority,
+                "match_count": r.match_count,
+                "distance_m": r.distance_m,
+                "fallback": r.fallback,
+            },
+        })
+    return items
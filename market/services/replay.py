@@ -0,0 +1,183 @@
+"""
+추천 기록 재생(replay) 벤치마크.
+
+- 기록 복원: ShoppingList(생성 시각, 실제 선택 마켓) + ShoppingListIngredient(장바구니)
+  + 당시 주소(목록 생성 시각 이전에 등록된 가장 최근 Address, 없으면 현재 사용자 좌표)
+  + ActivityLog(실제 방문 여부) + 사용자의 현재 MarketFilterSetting
+- 재생: 요청마다 랭킹(recommendation.rank_at, 당시 시각 기준 영업 여부) → 1순위 마켓 이동 정보(get_travel_info)
+  경로는 로컬 공급자만(오프라인 보행 그래프(설정 시) → Haversine), 외부 API 호출 없음
+- 측정: 요청별 지연(ms), DB 쿼리 수(connection.execute_wrapper), 두 엔진(가중치) 간 1순위 변경률, 실제 선택 마켓 일치율
+
+재고는 현재 재고(재고 비트셋 인덱스) 기준 — 당시 재고는 복원하지 않음.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from django.db import connection
+
+from accounts.models import Address
+from market.models import ActivityLog, Market, MarketFilterSetting, ShoppingList, ShoppingListIngredient
+from market.utils import get_travel_info
+from . import routing
+from .inventory_index import get_inventory_index
+from .isochrone import get_isochrone_index
+from .pedestrian_graph import PEDESTRIAN_GRAPH_PATH
+from .recommendation import rank_at
+from .scoring import ScoringWeights
+
+
+class ReplayRequest(NamedTuple):
+    shopping_list_id: int
+    user_id: int
+    lat: float
+    lng: float
+    when: object                     # 목록 생성 시각(datetime)
+    items: Dict[int, str]            # {재료 id: 이름}
+    filt: MarketFilterSetting
+    chosen_market_id: Optional[int]  # 실제로 고른 마켓
+    visited: bool                    # 장보기 완료(ActivityLog) 여부
+
+
+# =============================================================================
+# A. 기록 복원
+# =============================================================================
+def load_requests(since=None, until=None, limit: Optional[int] = None, only_visited: bool = False) -> List[ReplayRequest]:
+    """기간 내 장바구니들을 재생 요청으로. 쿼리 수는 요청 수와 무관(5회)."""
+    qs = ShoppingList.objects.select_related("user").order_by("created_at")
+    if since:
+        qs = qs.filter(created_at__gte=since)
+    if until:
+        qs = qs.filter(created_at__lt=until)
+    if only_visited:
+        qs = qs.filter(activitylog__isnull=False).distinct()
+    lists = list(qs[:limit] if limit else qs)
+    list_ids = [sl.id for sl in lists]
+    user_ids = {sl.user_id for sl in lists}
+
+    items: Dict[int, Dict[int, str]] = {}
+    for sl_id, iid, name in (
+        ShoppingListIngredient.objects.filter(shopping_list_id__in=list_ids)
+        .values_list("shopping_list_id", "ingredient_id", "ingredient__name")
+    ):
+        items.setdefault(sl_id, {})[iid] = name
+
+    # 사용자별 주소 이력(등록 순)
+    addresses: Dict[int, List[Address]] = {}
+    for a in Address.objects.filter(user_id__in=user_ids).order_by("created_at"):
+        addresses.setdefault(a.user_id, []).append(a)
+
+    filters = {f.user_id: f for f in MarketFilterSetting.objects.filter(user_id__in=user_ids)}
+    visited = set(ActivityLog.objects.filter(shopping_list_id__in=list_ids).values_list("shopping_list_id", flat=True))
+
+    out = []
+    for sl in lists:
+        lat, lng = sl.user.latitude, sl.user.longitude
+        history = addresses.get(sl.user_id, [])
+        pos = bisect.bisect_right([a.created_at for a in history], sl.created_at)
+        if pos:
+            lat, lng = history[pos - 1].latitude, history[pos - 1].longitude
+        if lat is None or lng is None or sl.id not in items:
+            continue
+        out.append(ReplayRequest(
+            sl.id, sl.user_id, lat, lng, sl.created_at, items[sl.id],
+            filters.get(sl.user_id) or MarketFilterSetting(user_id=sl.user_id),
+            sl.market_id, sl.id in visited,
+        ))
+    return out
+
+
+# =============================================================================
+# B. 재생
+# =============================================================================
+@contextmanager
+def local_routing() -> Iterator[None]:
+    """프로세스 공용 경로 체인을 로컬 공급자만으로 교체(외부 API 호출 없음)."""
+    providers = ([routing.OfflineGraphProvider()] if PEDESTRIAN_GRAPH_PATH else []) + [routing.HaversineProvider()]
+    saved = routing._default_chain
+    routing._default_chain = routing.RoutingChain(providers)
+    try:
+        yield
+    finally:
+        routing._default_chain = saved
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@dataclass
+class ReplayRun:
+    name: str
+    latency_ms: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+    chosen: List[Optional[int]] = field(default_factory=list)
+
+    def percentile(self, values, p: float) -> float:
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * p))]
+
+    def summary(self) -> Dict[str, float]:
+        n = len(self.latency_ms)
+        return {
+            "requests": n,
+            "p50_ms": round(self.percentile(self.latency_ms, .5), 2),
+            "p95_ms": round(self.percentile(self.latency_ms, .95), 2),
+            "p99_ms": round(self.percentile(self.latency_ms, .99), 2),
+            "max_ms": round(max(self.latency_ms, default=0.0), 2),
+            "queries_avg": round(sum(self.queries) / n, 2) if n else 0.0,
+            "queries_max": max(self.queries, default=0),
+            "no_candidate": sum(1 for c in self.chosen if c is None),
+        }
+
+
+def replay(requests: List[ReplayRequest], weights: Optional[ScoringWeights] = None, *,
+           name: str = "", with_travel: bool = True) -> ReplayRun:
+    """요청들을 순서대로 재생. 호출 전 local_routing() 안에서 실행."""
+    # 프로세스 인덱스 적재 비용이 첫 요청 지연에 섞이지 않도록 미리 적재
+    get_inventory_index().stock_mask(0)
+    get_isochrone_index().covers(0)
+
+    run = ReplayRun(name)
+    for req in requests:
+        counter = _QueryCounter()
+        t0 = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            ranked = rank_at(req.lat, req.lng, filt=req.filt, shopping_items=req.items, k=1,
+                             when=req.when, weights=weights)
+            chosen = ranked[0].market_id if ranked else None
+            if chosen is not None and with_travel:
+                m = Market.objects.only("latitude", "longitude").get(id=chosen)
+                get_travel_info(req.lat, req.lng, m.latitude, m.longitude)
+        run.latency_ms.append((time.perf_counter() - t0) * 1000)
+        run.queries.append(counter.count)
+        run.chosen.append(chosen)
+    return run
+
+
+def compare(requests: List[ReplayRequest], a: ReplayRun, b: ReplayRun) -> Dict[str, float]:
+    """두 재생 결과의 1순위 변경률 + 실제 선택 마켓 일치율."""
+    n = len(requests)
+    changed = sum(1 for x, y in zip(a.chosen, b.chosen) if x != y)
+    labelled = [(i, r.chosen_market_id) for i, r in enumerate(requests) if r.chosen_market_id]
+
+    def hit_rate(run: ReplayRun) -> float:
+        return round(sum(1 for i, mid in labelled if run.chosen[i] == mid) / len(labelled), 3) if labelled else 0.0
+
+    return {
+        "requests": n,
+        "changed": changed,
+        "change_rate": round(changed / n, 3) if n else 0.0,
+        "labelled": len(labelled),
+        f"hit_rate_{a.name}": hit_rate(a),
+        f"hit_rate_{b.name}": hit_rate(b),
+    }
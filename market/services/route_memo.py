@@ -0,0 +1,81 @@
+"""
+요청 단위(+ 유저별 단기) 경로 메모.
+
+한 페이지 렌더 안에서 route_user_to_market → get_travel_info 처럼 같은 유저↔마켓 경로를
+여러 번 물어도 실제 경로 조회(route_store → TMAP)는 한 번만 일어나도록 한다.
+
+- 요청 메모: RouteMemoMiddleware 가 요청마다 여는 dict (contextvar)
+- 유저 메모: Django cache 에 ROUTE_MEMO_USER_TTL_S 동안 (도착 → 완료 화면처럼 연달아 열리는 페이지용)
+  공급자 장애 때의 추정값(estimated)은 유저 메모에 넣지 않음 → 다음 요청에서 바로 실제 경로 재시도
+- route_memo_stats(): 메모 적중/실제 조회 횟수 (테스트 검증용)
+"""
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .route_store import get_route, snap_origin
+
+ROUTE_MEMO_USER_TTL_S = getattr(settings, "ROUTE_MEMO_USER_TTL_S", 120)
+
+_request_memo: ContextVar[Optional[Dict[str, Any]]] = ContextVar("route_request_memo", default=None)
+
+_stats = {"request_hit": 0, "user_hit": 0, "routed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(kind: str) -> None:
+    with _stats_lock:
+        _stats[kind] += 1
+
+
+def route_memo_stats() -> Dict[str, int]:
+    """request_hit / user_hit: 메모 적중, routed: 실제 경로 조회(route_store) 횟수."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_route_memo_stats() -> None:
+    with _stats_lock:
+        for k in _stats:
+            _stats[k] = 0
+
+
+def begin_request(request=None):
+    """요청 메모 시작. 반환 토큰은 end_request 에 넘김."""
+    return _request_memo.set({"request": request, "routes": {}})
+
+
+def end_request(token) -> None:
+    _request_memo.reset(token)
+
+
+def memoized_route(start_lat: float, start_lng: float, market, user_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    route_store.get_route 와 같은 결과를 요청/유저 메모를 거쳐 반환.
+    실패(예외)는 메모하지 않고 그대로 올림. 추정값은 이 요청 안에서만 재사용.
+    """
+    memo = _request_memo.get()
+    if user_id is None and memo is not None and memo["request"] is not None:
+        user_id = getattr(getattr(memo["request"], "user", None), "id", None)
+
+    key = f"{snap_origin(start_lat, start_lng)}:{market.id}"
+    if memo is not None and key in memo["routes"]:
+        _count("request_hit")
+        return memo["routes"][key]
+
+    user_key = f"route_memo:{user_id}:{key}" if user_id else None
+    route = cache.get(user_key) if user_key else None
+    if route is not None:
+        _count("user_hit")
+    else:
+        _count("routed")
+        route = get_route(start_lat, start_lng, market)
+        if user_key and not route.get("estimated"):
+            cache.set(user_key, route, ROUTE_MEMO_USER_TTL_S)
+
+    if memo is not None:
+        memo["routes"][key] = route
+    return route
@@ -1,6 +1,6 @@
-from market.integrations.tmap_client import get_pedestrian_route
+from market.services.route_memo import memoized_route
 
 def route_user_to_market(user, market):
-    return get_pedestrian_route(
-        user.latitude, user.longitude, market.latitude, market.longitude
+    return memoized_route(
+        user.latitude, user.longitude, market, user_id=user.id
     )
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+보행 경로 영구 저장소(RouteCache 테이블).
+
+- 키: 출발 좌표를 ROUTE_SNAP_DEG 격자로 스냅한 셀 + 마켓 id
+- 값: 거리(m), 시간(s), 압축한 경로 폴리라인
+- ROUTE_STORE_TTL_S 가 지나면 경로 공급자 체인(services.routing)으로 다시 조회해 갱신
+- 추정 결과(Kakao 자동차 경로, Haversine)는 저장하지 않음(다음 요청에서 실제 보행 경로 재시도)
+"""
+import json
+import threading
+import zlib
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.utils import timezone
+
+from market.models import RouteCache
+from .routing import route_walk
+from .spatial_index import grid_cell_of
+
+# 스냅 격자(도). 0.0005° ≈ 위도 55m / 경도 44m
+ROUTE_SNAP_DEG = getattr(settings, "ROUTE_SNAP_DEG", 0.0005)
+ROUTE_STORE_TTL_S = getattr(settings, "ROUTE_STORE_TTL_S", 60 * 60 * 24 * 7)
+
+_stats = {"hit": 0, "miss": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(kind: str) -> None:
+    with _stats_lock:
+        _stats[kind] += 1
+
+
+def route_store_stats() -> Dict[str, int]:
+    """프로세스 기준 저장소 hit/miss 누적 횟수."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_route_store_stats() -> None:
+    with _stats_lock:
+        for k in _stats:
+            _stats[k] = 0
+
+
+def snap_origin(lat: float, lng: float) -> str:
+    return grid_cell_of(lat, lng, ROUTE_SNAP_DEG)
+
+
+def pack_path(path: List[Dict[str, float]]) -> bytes:
+    """[{lat, lng}, ...] → zlib 압축 JSON (좌표 소수 6자리)."""
+    coords = [[round(p["lat"], 6), round(p["lng"], 6)] for p in path]
+    return zlib.compress(json.dumps(coords, separators=(",", ":")).encode())
+
+
+def unpack_path(blob: bytes) -> List[Dict[str, float]]:
+    if not blob:
+        return []
+    return [{"lat": lat, "lng": lng} for lat, lng in json.loads(zlib.decompress(bytes(blob)))]
+
+
+def get_route(start_lat: float, start_lng: float, market) -> Dict[str, Any]:
+    """
+    (출발 좌표 → 마켓) 보행 경로. 저장소에 유효한 값이 있으면 그대로, 없으면 공급자 체인 조회 후 저장.
+    반환 형식은 tmap_client.get_pedestrian_route 와 동일: {'path', 'distance_m', 'duration_s'}
+    모든 공급자 실패 시 RoutingError 를 그대로 올림(저장하지 않음).
+    """
+    cell = snap_origin(start_lat, start_lng)
+    fresh_after = timezone.now() - timedelta(seconds=ROUTE_STORE_TTL_S)
+
+    row = (
+        RouteCache.objects
+        .filter(origin_cell=cell, market=market, fetched_at__gte=fresh_after)
+        .first()
+    )
+    if row is not None:
+        _count("hit")
+        return {
+            "path": unpack_path(row.path_blob),
+            "distance_m": row.distance_m,
+            "duration_s": row.duration_s,
+        }
+
+    _count("miss")
+    route = route_walk(start_lat, start_lng, market.latitude, market.longitude)
+    distance_m = int(route.get("distance_m") or 0)
+    duration_s = int(route.get("duration_s") or 0)
+    if distance_m > 0 and duration_s > 0 and not route.get("estimated"):
+        RouteCache.objects.update_or_create(
+            origin_cell=cell, market=market,
+            defaults={
+                "distance_m": distance_m,
+                "duration_s": duration_s,
+                "path_blob": pack_path(route.get("path") or []),
+            },
+        )
+    return route
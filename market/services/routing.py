@@ -0,0 +1,279 @@
+"""
+보행 경로 공급자 체인.
+
+TMAP → Kakao → (오프라인 보행 그래프) → Haversine 추정 순으로 시도하되,
+- 요청당 지연 예산(ROUTING_BUDGET_S) 안에서 남은 시간만큼만 각 공급자에 timeout 으로 배분
+- 연속 실패/타임아웃이 쌓인 공급자는 서킷 브레이커로 일정 시간 건너뜀
+- 공급자별 호출/실패/건너뜀 횟수와 지연(ms) 통계 수집
+→ TMAP 장애가 있어도 페이지 렌더가 10초씩 묶이지 않음.
+
+결과 형식은 tmap_client.get_pedestrian_route 와 같고 'provider', 'estimated' 키가 추가됨.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+
+from django.conf import settings
+
+from market.integrations.tmap_client import get_pedestrian_route
+from market.utils import get_directions_api, get_distance_km
+from .pedestrian_graph import PEDESTRIAN_GRAPH_PATH, GraphError, get_pedestrian_graph
+
+# 보행 그래프 파일(PEDESTRIAN_GRAPH_PATH)이 있으면 Haversine 추정 전에 오프라인 경로 시도
+ROUTING_PROVIDERS = getattr(
+    settings, "ROUTING_PROVIDERS",
+    ["tmap", "kakao", "offline", "haversine"] if PEDESTRIAN_GRAPH_PATH else ["tmap", "kakao", "haversine"],
+)
+ROUTING_BUDGET_S = getattr(settings, "ROUTING_BUDGET_S", 3.0)
+ROUTING_BREAKER_FAILURES = getattr(settings, "ROUTING_BREAKER_FAILURES", 3)
+ROUTING_BREAKER_RESET_S = getattr(settings, "ROUTING_BREAKER_RESET_S", 60)
+
+# 남은 예산이 이보다 적으면 원격 공급자는 시도하지 않음
+_MIN_REMOTE_TIMEOUT_S = 0.2
+
+# 보행 속도 80m/분 가정 (utils.get_travel_info 폴백과 동일)
+WALK_M_PER_MIN = 80
+
+
+class RoutingError(Exception):
+    pass
+
+
+# =============================================================================
+# A. 공급자
+# =============================================================================
+class RoutingProvider(ABC):
+    name = ""
+    remote = True        # 외부 API 호출 여부(예산 부족 시 건너뜀)
+    estimated = False    # 추정값(경로 저장소/보행 행렬에 저장하지 않음)
+    max_timeout_s = 10.0
+
+    @abstractmethod
+    def route(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float, timeout: float) -> Dict[str, Any]:
+        """tmap_client.get_pedestrian_route 형식. 실패 시 예외(RoutingError 등) → 체인이 다음 공급자로."""
+
+
+class TmapProvider(RoutingProvider):
+    name = "tmap"
+    max_timeout_s = 10.0
+
+    def route(self, start_lat, start_lng, end_lat, end_lng, timeout):
+        r = get_pedestrian_route(start_lat, start_lng, end_lat, end_lng, timeout=timeout)
+        if int(r.get("distance_m") or 0) <= 0:
+            raise RoutingError("tmap: empty route")
+        return r
+
+
+class KakaoProvider(RoutingProvider):
+    """
+    Kakao Mobility Directions(자동차 경로). 거리/폴리라인만 쓰고 시간은 보행 속도로 환산.
+    보행 경로가 아니라 추정값: 경로 저장소/보행 행렬에 저장하지 않음(포인트 산정에도 안 씀).
+    """
+    name = "kakao"
+    max_timeout_s = 3.0
+    estimated = True
+
+    def route(self, start_lat, start_lng, end_lat, end_lng, timeout):
+        data = get_directions_api(start_lng, start_lat, end_lng, end_lat, timeout=timeout)
+        try:
+            r0 = data["routes"][0]
+            if r0.get("result_code", 0) != 0:
+                raise RoutingError(f"kakao: {r0.get('result_msg')}")
+            distance_m = int(r0["summary"]["distance"])
+            path = []
+            for section in r0.get("sections", []):
+                for road in section.get("roads", []):
+                    v = road.get("vertexes") or []
+                    for i in range(0, len(v) - 1, 2):
+                        path.append({"lat": float(v[i + 1]), "lng": float(v[i])})
+        except (TypeError, KeyError, IndexError, ValueError) as e:
+            raise RoutingError(f"kakao: bad response ({e})")
+        if distance_m <= 0:
+            raise RoutingError("kakao: empty route")
+        return {
+            "path": path,
+            "distance_m": distance_m,
+            "duration_s": max(60, int(distance_m / WALK_M_PER_MIN * 60)),
+        }
+
+
+class OfflineGraphProvider(RoutingProvider):
+    """
+    로컬 보행 그래프(pedestrian_graph) A*. 외부 호출 없음, 실제 보행망 거리라 경로 저장소에도 저장.
+    원격이 아니라 브레이커는 없지만 남은 예산(timeout)을 넘기면 탐색을 멈추고 다음 공급자로.
+    """
+    name = "offline"
+    remote = False
+
+    def route(self, start_lat, start_lng, end_lat, end_lng, timeout):
+        try:
+            graph = get_pedestrian_graph()
+            if graph is None:
+                raise RoutingError("offline: PEDESTRIAN_GRAPH_PATH not set")
+            return graph.route(start_lat, start_lng, end_lat, end_lng, timeout=timeout)
+        except GraphError as e:
+            raise RoutingError(f"offline: {e}")
+
+
+class HaversineProvider(RoutingProvider):
+    """직선거리 + 80m/분 추정. 외부 호출 없음."""
+    name = "haversine"
+    remote = False
+    estimated = True
+
+    def route(self, start_lat, start_lng, end_lat, end_lng, timeout):
+        distance_m = int(round(get_distance_km(start_lat, start_lng, end_lat, end_lng) * 1000))
+        return {
+            "path": [{"lat": start_lat, "lng": start_lng}, {"lat": end_lat, "lng": end_lng}],
+            "distance_m": distance_m,
+            "duration_s": max(60, int(distance_m / WALK_M_PER_MIN * 60)),
+        }
+
+
+PROVIDER_CLASSES = {
+    cls.name: cls for cls in (TmapProvider, KakaoProvider, OfflineGraphProvider, HaversineProvider)
+}
+
+
+# =============================================================================
+# B. 서킷 브레이커 / 통계
+# =============================================================================
+class CircuitBreaker:
+    """
+    연속 실패 failure_threshold 회 → open(reset_after_s 동안 차단)
+    → 이후 한 번 시험 호출(half-open), 성공하면 close / 실패하면 다시 open.
+    """
+
+    def __init__(self, failure_threshold: int, reset_after_s: float):
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after_s:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "half-open":
+                # 시험 호출 1건만 통과시키고 결과가 나올 때까지 다시 잠금
+                self.opened_at = time.monotonic()
+                return True
+            return state == "closed"
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ProviderStats:
+    __slots__ = ("calls", "failures", "skipped", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.calls = self.failures = self.skipped = 0
+        self.total_ms = self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float, ok: bool) -> None:
+        self.calls += 1
+        self.failures += 0 if ok else 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "error_rate": round(self.failures / self.calls, 3) if self.calls else 0.0,
+        }
+
+
+# =============================================================================
+# C. 체인
+# =============================================================================
+class RoutingChain:
+    def __init__(self, providers: Sequence[RoutingProvider], budget_s: float = ROUTING_BUDGET_S):
+        self.providers = list(providers)
+        self.budget_s = budget_s
+        self.breakers = {
+            p.name: CircuitBreaker(ROUTING_BREAKER_FAILURES, ROUTING_BREAKER_RESET_S) for p in self.providers
+        }
+        self._stats = {p.name: ProviderStats() for p in self.providers}
+        self._lock = threading.Lock()
+
+    def route(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float,
+              budget_s: Optional[float] = None) -> Dict[str, Any]:
+        """앞 공급자부터 시도해 처음 성공한 결과 반환. 모두 실패하면 RoutingError."""
+        deadline = time.monotonic() + (self.budget_s if budget_s is None else budget_s)
+        errors: List[str] = []
+
+        for p in self.providers:
+            remaining = deadline - time.monotonic()
+            if p.remote and (remaining < _MIN_REMOTE_TIMEOUT_S or not self.breakers[p.name].allow()):
+                with self._lock:
+                    self._stats[p.name].skipped += 1
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                result = p.route(start_lat, start_lng, end_lat, end_lng,
+                                 timeout=min(p.max_timeout_s, max(remaining, _MIN_REMOTE_TIMEOUT_S)))
+            except Exception as e:
+                self._finish(p, t0, ok=False)
+                errors.append(f"{p.name}: {e}")
+                continue
+            self._finish(p, t0, ok=True)
+            return {**result, "provider": p.name, "estimated": p.estimated}
+
+        raise RoutingError("; ".join(errors) or "no routing provider available")
+
+    def _finish(self, p: RoutingProvider, t0: float, ok: bool) -> None:
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self._stats[p.name].record(elapsed_ms, ok)
+        if p.remote:
+            breaker = self.breakers[p.name]
+            breaker.record_success() if ok else breaker.record_failure()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """공급자별 호출/실패/건너뜀/지연 통계 + 브레이커 상태."""
+        with self._lock:
+            return {
+                name: {**s.as_dict(), "breaker": self.breakers[name].state}
+                for name, s in self._stats.items()
+            }
+
+
+_default_chain: Optional[RoutingChain] = None
+_default_lock = threading.Lock()
+
+
+def get_routing_chain() -> RoutingChain:
+    """설정(ROUTING_PROVIDERS) 순서의 프로세스 공용 체인."""
+    global _default_chain
+    if _default_chain is None:
+        with _default_lock:
+            if _default_chain is None:
+                _default_chain = RoutingChain([PROVIDER_CLASSES[name]() for name in ROUTING_PROVIDERS])
+    return _default_chain
+
+
+def route_walk(start_lat: float, start_lng: float, end_lat: float, end_lng: float) -> Dict[str, Any]:
+    return get_routing_chain().route(start_lat, start_lng, end_lat, end_lng)
@@ -0,0 +1,144 @@
+"""
+주간 영업시간 컴파일.
+
+open_days('월,화,수') + open_time/close_time 을 1주일 = 7×1440 분 단위 비트맵으로 한 번 변환해두고,
+'지금 영업 중?', '마감까지 남은 분', '다음 영업 시작'을 분 인덱스 조회 한 번(O(1))으로 답한다.
+
+규칙은 utils.is_open_now 와 동일:
+- 요일 판정은 '현재 시각의 요일' 기준
+- open == close → 그 요일 24시간 영업
+- open > close → 자정 넘김(그 요일의 0시~close, open~24시)
+분 단위라 close 시각의 그 1분은 영업 종료로 본다.
+"""
+import datetime
+from array import array
+from functools import lru_cache
+from typing import FrozenSet, Optional
+
+from django.utils import timezone
+
+# 한국 요일 약어
+WEEKDAYS_KO = ['월', '화', '수', '목', '금', '토', '일']
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+@lru_cache(maxsize=256)
+def parse_open_days(open_days: str) -> FrozenSet[int]:
+    """'월,화,수' → {0, 1, 2} (월=0 … 일=6)."""
+    return frozenset(
+        WEEKDAYS_KO.index(s.strip())
+        for s in (open_days or '').split(',')
+        if s.strip() in WEEKDAYS_KO
+    )
+
+
+def _minute_of_week(now: datetime.datetime) -> int:
+    return now.weekday() * MINUTES_PER_DAY + now.hour * 60 + now.minute
+
+
+class WeeklySchedule:
+    """
+    컴파일된 주간 영업표.
+    - bits[m]: 주 시작(월 0시)부터 m분째 영업 여부
+    - until_close[m]: 영업 중이면 그 분부터 이어지는 영업 분 수(마감까지), 아니면 0
+    - until_open[m]: 영업 중이 아니면 다음 영업 시작까지 분 수, 영업 중이면 0
+    한 주 내내 영업이면 until_close 는 MINUTES_PER_WEEK 로, 영업일이 없으면 until_open 은 -1.
+    """
+    __slots__ = ('bits', 'until_close', 'until_open', 'always_open', 'never_open')
+
+    def __init__(self, bits: bytearray):
+        self.bits = bits
+        self.always_open = all(bits)
+        self.never_open = not any(bits)
+        self.until_close = array('H', bytes(2 * MINUTES_PER_WEEK))
+        self.until_open = array('h', bytes(2 * MINUTES_PER_WEEK))
+
+        if self.always_open:
+            for m in range(MINUTES_PER_WEEK):
+                self.until_close[m] = MINUTES_PER_WEEK
+            return
+        if self.never_open:
+            for m in range(MINUTES_PER_WEEK):
+                self.until_open[m] = -1
+            return
+
+        # 주를 두 바퀴 역순으로 훑으면 주 경계를 넘는 구간까지 이어서 계산됨
+        run_open = run_closed = 0
+        for i in range(2 * MINUTES_PER_WEEK - 1, -1, -1):
+            m = i % MINUTES_PER_WEEK
+            if bits[m]:
+                run_open += 1
+                run_closed = 0
+            else:
+                run_closed += 1
+                run_open = 0
+            if i < MINUTES_PER_WEEK:
+                self.until_close[m] = run_open
+                self.until_open[m] = run_closed
+
+    # ------------------------------------------------------------------
+    def is_open(self, when=None) -> bool:
+        now = timezone.localtime(when or timezone.now())
+        return bool(self.bits[_minute_of_week(now)])
+
+    def minutes_until_close(self, when=None) -> int:
+        """마감까지 남은 분(영업 중이 아닐 땐 0). 자정/요일 넘김 포함."""
+        now = timezone.localtime(when or timezone.now())
+        run = self.until_close[_minute_of_week(now)]
+        if not run:
+            return 0
+        return (run * 60 - now.second) // 60
+
+    def minutes_until_open(self, when=None) -> Optional[int]:
+        """다음 영업 시작까지 남은 분(영업 중이면 0, 영업일이 없으면 None)."""
+        now = timezone.localtime(when or timezone.now())
+        run = self.until_open[_minute_of_week(now)]
+        if run < 0:
+            return None
+        return run
+
+    def next_opening(self, when=None) -> Optional[datetime.datetime]:
+        """다음 영업 시작 시각(영업 중이면 None, 영업일이 없어도 None)."""
+        now = timezone.localtime(when or timezone.now())
+        run = self.until_open[_minute_of_week(now)]
+        if run <= 0:
+            return None
+        return now.replace(second=0, microsecond=0) + datetime.timedelta(minutes=run)
+
+    def seconds_until_change(self, when=None) -> Optional[int]:
+        """영업 ↔ 종료 상태가 바뀔 때까지 남은 초(상태가 바뀌지 않으면 None)."""
+        if self.always_open or self.never_open:
+            return None
+        now = timezone.localtime(when or timezone.now())
+        m = _minute_of_week(now)
+        run = self.until_close[m] if self.bits[m] else self.until_open[m]
+        return run * 60 - now.second
+
+
+@lru_cache(maxsize=512)
+def compile_schedule(open_days: str, open_time, close_time) -> WeeklySchedule:
+    """
+    (open_days, open_time, close_time) → WeeklySchedule.
+    같은 영업시간을 쓰는 마켓/장소끼리는 컴파일 결과를 공유.
+    """
+    bits = bytearray(MINUTES_PER_WEEK)
+    if not (open_days and open_time and close_time):
+        return WeeklySchedule(bits)
+
+    ot = open_time.hour * 60 + open_time.minute
+    ct = close_time.hour * 60 + close_time.minute
+
+    if ot == ct:
+        spans = [(0, MINUTES_PER_DAY)]
+    elif ot < ct:
+        spans = [(ot, ct)]
+    else:
+        spans = [(0, ct), (ot, MINUTES_PER_DAY)]
+
+    for wd in parse_open_days(open_days):
+        base = wd * MINUTES_PER_DAY
+        for start, end in spans:
+            bits[base + start:base + end] = b'\x01' * (end - start)
+    return WeeklySchedule(bits)
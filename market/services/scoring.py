@@ -0,0 +1,151 @@
+"""
+마켓 점수 엔진(가중치 설정 + 일괄 평가).
+
+- 입력: 여러 요청(사용자, 장바구니, 후보 마켓)의 후보 행을 이어 붙인 ScoringBatch (group = 요청 번호)
+- 점수(클수록 좋음) = - 타입 불일치 × w.type_pref
+                   + 재료 커버리지(일치수/장바구니 수) × w.coverage        (coverage_prefs 의 타입 선호에서만)
+                   - 거리(m) × w.distance
+                   - max(0, closing_window_min - 마감까지 분) × w.closing_soon
+  + 폴백: 'mart' 선호인데 요청의 마트 후보가 모두 일치 0이면 전통시장을 거리순으로 맨 앞(FALLBACK_BONUS)
+- 배치 전체를 배열 연산 한 번으로 계산 → 단건 요청(ranking.rank_markets)과 오프라인 일괄 평가가 같은 엔진 사용
+
+기본 가중치(DEFAULT_WEIGHTS)는 기존 규칙(타입 우선 → 마트 우선 시 일치수 ↓ → 거리 ↑, 동점은 입력 순서)과 같은 순서를 냄:
+각 항의 크기를 자릿수로 분리(타입 1e13 ≫ 커버리지 1e9 ≫ 거리 m).
+"""
+from dataclasses import dataclass, replace
+from typing import List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+
+# ranking.TYPE_CODES 와 동일(순환 import 방지)
+_MART, _TRAD = 0, 1
+TYPE_PREF_CODES = {'none': 0, 'mart': 1, 'trad': 2}
+
+# 폴백 그룹이 다른 모든 점수보다 앞서도록 더하는 값
+FALLBACK_BONUS = 1e15
+
+
+@dataclass(frozen=True)
+class ScoringWeights:
+    distance: float = 1.0                 # m 당 감점
+    coverage: float = 1e9                 # 커버리지(0~1) 1.0 당 가점
+    type_pref: float = 1e13               # 선호 타입이 아닐 때 감점
+    closing_soon: float = 0.0             # 마감 임박 1분 당 감점
+    closing_window_min: int = 30          # 마감까지 이 시간(분) 미만부터 감점
+    coverage_prefs: tuple = ('mart',)     # 커버리지를 반영할 타입 선호('none'/'mart'/'trad')
+    trad_fallback: bool = True            # 마트 선호 + 마트 일치 0 → 전통시장 우선
+
+    def with_(self, **changes) -> "ScoringWeights":
+        return replace(self, **changes)
+
+
+DEFAULT_WEIGHTS = ScoringWeights(**getattr(settings, "SCORING_WEIGHTS", {}))
+
+
+@dataclass
+class ScoringBatch:
+    """후보 행 단위 배열. 한 요청의 후보들은 같은 group 값을 가짐."""
+    group: np.ndarray             # int64, 요청 번호(0..n_groups-1)
+    market_ids: np.ndarray        # int64
+    distance_m: np.ndarray        # int64
+    type_code: np.ndarray         # int8 (ranking.TYPE_CODES)
+    match_count: np.ndarray       # int64
+    cart_size: np.ndarray         # int64, 요청의 장바구니 재료 수
+    type_pref: np.ndarray         # int8 (TYPE_PREF_CODES), 요청의 타입 선호
+    minutes_to_close: np.ndarray  # float64 (ranking.minutes_to_close, 매일 24시간 영업은 10080)
+
+    def __len__(self) -> int:
+        return len(self.group)
+
+    @property
+    def n_groups(self) -> int:
+        return int(self.group.max()) + 1 if len(self.group) else 0
+
+    @classmethod
+    def single(cls, market_ids, distance_m, type_code, match_count, minutes_to_close, *,
+               type_pref: str = 'none', cart_size: int = 0) -> "ScoringBatch":
+        """요청 1건."""
+        n = len(market_ids)
+        return cls(
+            group=np.zeros(n, dtype=np.int64),
+            market_ids=np.asarray(market_ids, dtype=np.int64),
+            distance_m=np.asarray(distance_m, dtype=np.int64),
+            type_code=np.asarray(type_code, dtype=np.int8),
+            match_count=np.asarray(match_count, dtype=np.int64),
+            cart_size=np.full(n, cart_size, dtype=np.int64),
+            type_pref=np.full(n, TYPE_PREF_CODES.get((type_pref or 'none').lower(), 0), dtype=np.int8),
+            minutes_to_close=np.asarray(minutes_to_close, dtype=np.float64),
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["ScoringBatch"]) -> "ScoringBatch":
+        """요청별 배치를 이어 붙임(group 을 0..n-1 로 다시 번호)."""
+        fields = ('market_ids', 'distance_m', 'type_code', 'match_count', 'cart_size', 'type_pref', 'minutes_to_close')
+        groups = [np.full(len(b), g, dtype=np.int64) for g, b in enumerate(batches)]
+        return cls(
+            group=np.concatenate(groups) if groups else np.empty(0, dtype=np.int64),
+            **{f: np.concatenate([getattr(b, f) for b in batches]) if batches else np.empty(0) for f in fields},
+        )
+
+
+@dataclass
+class Scores:
+    score: np.ndarray       # float64, 클수록 좋음
+    type_pri: np.ndarray    # int64, 선호 타입 불일치(1) 여부
+    fallback: np.ndarray    # bool, 폴백으로 앞에 온 행
+
+
+def score(batch: ScoringBatch, weights: ScoringWeights = DEFAULT_WEIGHTS) -> Scores:
+    """배치 전체 점수를 한 번에 계산."""
+    pref = batch.type_pref
+    is_mart = batch.type_code == _MART
+    is_trad = batch.type_code == _TRAD
+
+    type_pri = (((pref == TYPE_PREF_CODES['mart']) & ~is_mart)
+                | ((pref == TYPE_PREF_CODES['trad']) & ~is_trad)).astype(np.int64)
+
+    cov_on = np.isin(pref, [TYPE_PREF_CODES[p] for p in weights.coverage_prefs])
+    coverage = np.divide(batch.match_count, batch.cart_size,
+                         out=np.zeros(len(batch), dtype=np.float64), where=batch.cart_size > 0)
+
+    s = -weights.type_pref * type_pri + np.where(cov_on, weights.coverage * coverage, 0.0)
+    s -= weights.distance * batch.distance_m
+    if weights.closing_soon:
+        s -= weights.closing_soon * np.maximum(0.0, weights.closing_window_min - batch.minutes_to_close)
+
+    fallback = np.zeros(len(batch), dtype=bool)
+    if weights.trad_fallback and len(batch):
+        # 요청별: 마트 후보 수 / 일치 있는 마트 수 / 전통시장 후보 수
+        n = batch.n_groups
+        marts = np.bincount(batch.group, weights=is_mart, minlength=n)
+        matched_marts = np.bincount(batch.group, weights=is_mart & (batch.match_count > 0), minlength=n)
+        trads = np.bincount(batch.group, weights=is_trad, minlength=n)
+        group_fb = (marts > 0) & (matched_marts == 0) & (trads > 0)
+        fallback = is_trad & (pref == TYPE_PREF_CODES['mart']) & group_fb[batch.group]
+        s = np.where(fallback, FALLBACK_BONUS - weights.distance * batch.distance_m, s)
+
+    return Scores(s, type_pri, fallback)
+
+
+def top_k(scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """점수 내림차순 상위 k개 위치(요청 1건). 동점은 입력 순서 유지."""
+    keys = -scores
+    n = len(keys)
+    if k is None or k >= n:
+        return np.argsort(keys, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    kth = np.partition(keys, k - 1)[k - 1]
+    head = np.flatnonzero(keys < kth)
+    ties = np.flatnonzero(keys == kth)[: k - len(head)]
+    idx = np.concatenate([head, ties])
+    return idx[np.argsort(keys[idx], kind='stable')]
+
+
+def top_k_per_group(batch: ScoringBatch, scores: np.ndarray, k: Optional[int] = None) -> List[np.ndarray]:
+    """요청별 상위 k개 행 위치 목록(배치 전체 정렬 한 번)."""
+    order = np.lexsort((np.arange(len(batch)), -scores, batch.group))
+    bounds = np.searchsorted(batch.group[order], np.arange(batch.n_groups + 1))
+    return [order[bounds[g]:bounds[g + 1]][:k] for g in range(batch.n_groups)]
@@ -0,0 +1,55 @@
+"""
+위경도 고정 격자(grid) 인덱스.
+
+- 마켓 좌표를 CELL_DEG 간격의 격자 셀 키('위도idx:경도idx')로 변환해 Market.grid_cell 에 저장
+- 사용자 위치 + 반경(m)이 걸치는 셀 목록을 계산해 후보 마켓을 DB 단계에서 먼저 좁힘
+"""
+import math
+from typing import List
+
+# 격자 한 칸 크기(도). 위도 0.01° ≈ 1.1km, 서울 위도에서 경도 0.01° ≈ 0.88km
+CELL_DEG = 0.01
+
+# 위도 1° 당 거리(m)
+M_PER_DEG_LAT = 111_320.0
+
+
+def cell_index(lat: float, lng: float, cell_deg: float = CELL_DEG) -> tuple[int, int]:
+    """좌표가 속한 격자 셀의 (위도 idx, 경도 idx)."""
+    return math.floor(lat / cell_deg), math.floor(lng / cell_deg)
+
+
+def cell_key(lat_idx: int, lng_idx: int) -> str:
+    return f"{lat_idx}:{lng_idx}"
+
+
+def grid_cell_of(lat, lng, cell_deg: float = CELL_DEG) -> str:
+    """좌표 → 셀 키. 좌표가 없으면 빈 문자열."""
+    if lat is None or lng is None:
+        return ""
+    return cell_key(*cell_index(float(lat), float(lng), cell_deg))
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """두 좌표 간 직선거리(m). utils.get_distance_km 과 같은 식(서비스 계층에서 utils 의존 없이 사용)."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 6371000.0 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def cells_within(lat: float, lng: float, radius_m: float) -> List[str]:
+    """
+    (lat, lng) 중심 반경 radius_m 원에 걸치는 모든 셀 키.
+    원을 감싸는 경계 상자 기준이라 실제 원보다 약간 넓게 잡힘(후보 누락 없음).
+    """
+    d_lat = radius_m / M_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    d_lng = radius_m / (M_PER_DEG_LAT * cos_lat)
+
+    lat_lo, lng_lo = cell_index(lat - d_lat, lng - d_lng)
+    lat_hi, lng_hi = cell_index(lat + d_lat, lng + d_lng)
+    return [
+        cell_key(i, j)
+        for i in range(lat_lo, lat_hi + 1)
+        for j in range(lng_lo, lng_hi + 1)
+    ]
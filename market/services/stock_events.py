@@ -0,0 +1,110 @@
+"""
+재고 변경 허브 + 재고/장바구니 버전.
+
+- stock_changed(): 마켓 재고가 바뀐 모든 경로(시그널, 일괄 처리)가 호출 → 재고 변경 로그(StockChange)를 같은 트랜잭션에서 기록(stock_log),
+  커밋 후 재고 비트셋 인덱스 갱신 + 실시간 구독자에게 발행(stock_stream)
+- 버전은 DB 에서 읽음(재고: 변경 로그 seq, 장바구니: 재료 행) → 프로세스/캐시 백엔드와 무관하게 모든 워커가 같은 값
+  매칭 결과 캐시 키(utils.match_ingredients_cached), 랭킹 선계산 지문(precompute)에 포함
+- bulk_create/update 처럼 시그널이 없는 재고 경로는 stock_changed 를 직접 호출해야 함
+- bulk_stock_update(): 일괄 처리 구간에서는 MarketStock 행 단위 시그널을 무시(호출자가 마켓당 한 번 stock_changed)
+- raw_delete_stock(): 일괄 삭제를 DELETE 한 문장으로(시그널 수신자가 있어도 빠른 삭제)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, Max
+
+from market.models import Market, MarketStock, ShoppingListIngredient, StockChange
+from . import stock_log
+from .inventory_index import get_inventory_index
+from .stock_stream import get_stock_broker
+
+
+_signals_muted: ContextVar[bool] = ContextVar("stock_signals_muted", default=False)
+
+
+@contextmanager
+def bulk_stock_update():
+    token = _signals_muted.set(True)
+    try:
+        yield
+    finally:
+        _signals_muted.reset(token)
+
+
+def stock_signals_muted() -> bool:
+    return _signals_muted.get()
+
+
+def raw_delete_stock(qs) -> int:
+    """
+    MarketStock 행을 DELETE 한 문장으로 삭제(행 조회/행 단위 시그널 없음). 반환: 삭제 행 수.
+    post_delete 수신자가 있으면 qs.delete() 는 전체 행 SELECT + id IN (...) 삭제 + 행마다 시그널이 됨
+    → 일괄 처리 경로는 이것으로 지우고 마켓당 한 번 stock_changed 를 직접 호출.
+    """
+    return qs._raw_delete(qs.db)
+
+
+def stock_version(market_id: int) -> int:
+    """
+    마켓 재고 버전 = 재고 변경 로그에서 그 마켓의 마지막 seq((market, seq) 인덱스 조회 1회).
+    같은 마켓을 동시에 바꾸는 두 트랜잭션이 seq 순서와 다르게 커밋하면 늦은 쪽이 버전을 못 올릴 수 있음
+    → 그 경우만 캐시 TTL(MATCH_CACHE_TTL_S) 동안 이전 결과.
+    """
+    return (
+        StockChange.objects.filter(market_id=market_id)
+        .aggregate(m=Max("seq"))["m"] or 0
+    )
+
+
+def stock_version_near(lat: float, lng: float, radius_m: float, ingredient_ids: Iterable[int]) -> int:
+    """
+    반경 radius_m 에 걸치는 격자 셀의 마켓(Market.objects.near) × 주어진 재료의 재고 버전(랭킹 선계산 유효성 확인용).
+    다른 지역 마켓이나 장바구니에 없는 재료의 변경으로는 바뀌지 않음.
+    """
+    ingredient_ids = list(ingredient_ids)
+    if not ingredient_ids:
+        return 0
+    return (
+        StockChange.objects
+        .filter(market_id__in=Market.objects.near(lat, lng, radius_m).values("id"), ingredient_id__in=ingredient_ids)
+        .aggregate(m=Max("seq"))["m"] or 0
+    )
+
+
+def cart_version(shopping_list_id: int) -> str:
+    """장바구니 버전 = (재료 행 수, 마지막 행 id). 추가는 id 가, 삭제는 행 수가 바꿈(id 는 재사용되지 않음)."""
+    row = (
+        ShoppingListIngredient.objects.filter(shopping_list_id=shopping_list_id)
+        .aggregate(n=Count("id"), m=Max("id"))
+    )
+    return f"{row['n']}-{row['m'] or 0}"
+
+
+def stock_changed(market_id: int, added: Iterable[int] = (), removed: Iterable[int] = ()) -> None:
+    """마켓 재고 변경 알림. added/removed: 재료 id. 트랜잭션 안에서 호출."""
+    added, removed = list(added), list(removed)
+    if removed:
+        # 같은 (마켓, 재료) 행이 더 남아 있으면 실제로는 재고 유지
+        remaining = set(
+            MarketStock.objects
+            .filter(market_id=market_id, ingredient_id__in=removed)
+            .values_list("ingredient_id", flat=True)
+        )
+        removed = [iid for iid in removed if iid not in remaining]
+    if not (added or removed):
+        return
+    records = stock_log.record(market_id, added, removed)
+
+    def apply():
+        index = get_inventory_index()
+        for iid in added:
+            index.add(market_id, iid)
+        for iid in removed:
+            index.discard(market_id, iid)
+        get_stock_broker().publish(records)
+
+    transaction.on_commit(apply)
+
@@ -0,0 +1,155 @@
+"""
+제휴 마트 재고 피드(전체 재고 목록) 일괄 반영.
+
+- 입력: CSV(헤더 market_id,ingredient) 또는 JSONL({"market_id": .., "ingredient": ".."}), 마켓별로 묶여 있어야 함
+- 스트리밍: 한 줄씩 읽고 메모리에는 "지금 마켓"의 재료 id 집합만 보관 → 피드 크기와 무관한 메모리
+- 재료명 → id 는 시작 시 카탈로그 1회 조회
+- 마켓마다 현재 재고와 비교해 추가분 bulk_create + 삭제분 묶음 DELETE(raw_delete_stock), 마켓 단위 트랜잭션
+- 전통시장은 재고를 두지 않음(MarketStock.clean) → 피드에 있어도 건너뛰고 보고서에 집계
+- 반영 후 마켓당 한 번 stock_changed(재고 인덱스/매칭 캐시 버전)
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass
+from typing import IO, Dict, Iterator, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from food.models import Ingredient
+from market.models import Market, MarketStock, MarketType
+from .stock_events import bulk_stock_update, raw_delete_stock, stock_changed
+
+STOCK_IMPORT_BATCH = getattr(settings, "STOCK_IMPORT_BATCH", 1000)
+
+
+class StockFeedError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    markets: int = 0
+    inserted: int = 0
+    deleted: int = 0
+    unknown_ingredients: int = 0
+    unknown_markets: int = 0
+    skipped_markets: int = 0     # 재료명이 하나도 카탈로그에 없어 건너뜀(재고 전체 삭제 방지)
+    trad_markets: int = 0        # 전통시장(재고 없음)이라 건너뜀
+    elapsed_s: float = 0.0
+    dry_run: bool = False
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.elapsed_s if self.elapsed_s else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.rows:,} rows, {self.markets:,} markets, +{self.inserted:,} / -{self.deleted:,}, "
+            f"unknown ingredients {self.unknown_ingredients:,}, unknown markets {self.unknown_markets:,}, "
+            f"skipped markets {self.skipped_markets:,}, trad markets skipped {self.trad_markets:,}, "
+            f"{self.elapsed_s:.1f}s ({self.rows_per_s:,.0f} rows/s)"
+            + (" [dry-run]" if self.dry_run else "")
+        )
+
+
+def iter_feed(stream: IO[str], fmt: str) -> Iterator[Tuple[int, str]]:
+    """(market_id, 재료명) 한 줄씩. fmt: 'csv' | 'jsonl'."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for lineno, row in enumerate(reader, start=2):
+            try:
+                yield int(row["market_id"]), (row["ingredient"] or "").strip()
+            except (KeyError, TypeError, ValueError):
+                raise StockFeedError(f"line {lineno}: market_id,ingredient 형식이 아님")
+    elif fmt == "jsonl":
+        for lineno, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+                yield int(obj["market_id"]), str(obj["ingredient"]).strip()
+            except (KeyError, TypeError, ValueError):
+                raise StockFeedError(f"line {lineno}: JSON 형식이 아님")
+    else:
+        raise StockFeedError(f"지원하지 않는 형식: {fmt}")
+
+
+def format_of(filename: str) -> str:
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def _apply_market(market_id: int, feed_ids: Set[int], report: ImportReport, dry_run: bool) -> None:
+    current = set(MarketStock.objects.filter(market_id=market_id).values_list("ingredient_id", flat=True))
+    to_add = sorted(feed_ids - current)
+    to_remove = sorted(current - feed_ids)
+    report.inserted += len(to_add)
+    report.deleted += len(to_remove)
+    if dry_run or not (to_add or to_remove):
+        return
+
+    with transaction.atomic(), bulk_stock_update():
+        MarketStock.objects.bulk_create(
+            [MarketStock(market_id=market_id, ingredient_id=iid) for iid in to_add],
+            batch_size=STOCK_IMPORT_BATCH,
+        )
+        for i in range(0, len(to_remove), STOCK_IMPORT_BATCH):
+            raw_delete_stock(MarketStock.objects.filter(
+                market_id=market_id, ingredient_id__in=to_remove[i:i + STOCK_IMPORT_BATCH]
+            ))
+        stock_changed(market_id, added=to_add, removed=to_remove)
+
+
+def import_stock_feed(stream: IO[str], fmt: str = "csv", *, dry_run: bool = False,
+                      progress=None, progress_every: int = 100_000) -> ImportReport:
+    """
+    피드 전체 반영. 피드에 나온 마켓만 대상(피드에 없는 마켓 재고는 그대로).
+    progress(report): progress_every 줄마다 호출.
+    """
+    t0 = time.perf_counter()
+    report = ImportReport(dry_run=dry_run)
+    catalog: Dict[str, int] = dict(Ingredient.objects.values_list("name", "id"))
+    known_markets: Set[int] = set(Market.objects.values_list("id", flat=True))
+    trad_markets: Set[int] = set(Market.objects.filter(market_type=MarketType.TRAD).values_list("id", flat=True))
+
+    seen: Set[int] = set()
+    current_id: Optional[int] = None
+    current_ids: Set[int] = set()
+
+    def flush():
+        if current_id is None:
+            return
+        if current_id not in known_markets:
+            report.unknown_markets += 1
+        elif current_id in trad_markets:
+            report.trad_markets += 1
+        elif not current_ids:
+            report.skipped_markets += 1
+        else:
+            _apply_market(current_id, current_ids, report, dry_run)
+            report.markets += 1
+
+    for market_id, name in iter_feed(stream, fmt):
+        report.rows += 1
+        if market_id != current_id:
+            flush()
+            if market_id in seen:
+                raise StockFeedError(f"market_id={market_id} 가 피드에 두 번 나뉘어 있음(마켓별로 묶어야 함)")
+            seen.add(market_id)
+            current_id, current_ids = market_id, set()
+
+        iid = catalog.get(name)
+        if iid is None:
+            report.unknown_ingredients += 1
+        else:
+            current_ids.add(iid)
+
+        if progress and report.rows % progress_every == 0:
+            report.elapsed_s = time.perf_counter() - t0
+            progress(report)
+    flush()
+
+    report.elapsed_s = time.perf_counter() - t0
+    return report
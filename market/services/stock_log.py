@@ -0,0 +1,53 @@
+"""
+재고 변경 로그(StockChange) 기록/조회.
+
+- 기록: 변경 허브(stock_events.stock_changed)가 재고 변경과 같은 트랜잭션에서 bulk_create → 롤백되면 로그도 없음
+- 조회: changes_since(seq) 로 seq 이후 변경만(증분 동기화), 소비자는 마지막으로 받은 seq 를 보관
+- 주의: 동시 트랜잭션은 seq 순서와 커밋 순서가 다를 수 있음 → 주기적 전체 재동기화와 함께 사용
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Max
+
+from market.models import StockChange
+
+STOCK_LOG_BATCH = getattr(settings, "STOCK_LOG_BATCH", 1000)
+STOCK_LOG_PAGE_MAX = getattr(settings, "STOCK_LOG_PAGE_MAX", 5000)
+
+Change = Tuple[int, int, int, str]  # (seq, market_id, ingredient_id, action)
+
+
+def record(market_id: int, added: Iterable[int] = (), removed: Iterable[int] = ()) -> List[Change]:
+    """변경 기록 후 [(seq, market_id, ingredient_id, action)]. seq 를 돌려주지 않는 DB 백엔드면 seq=None."""
+    rows = [StockChange(market_id=market_id, ingredient_id=iid, action=StockChange.Action.ADD) for iid in added]
+    rows += [StockChange(market_id=market_id, ingredient_id=iid, action=StockChange.Action.REMOVE) for iid in removed]
+    if rows:
+        StockChange.objects.bulk_create(rows, batch_size=STOCK_LOG_BATCH)
+    return [(r.seq, r.market_id, r.ingredient_id, r.action) for r in rows]
+
+
+def head_seq() -> int:
+    """현재 마지막 seq(로그가 비어 있으면 0)."""
+    return StockChange.objects.aggregate(m=Max("seq"))["m"] or 0
+
+
+def changes_since(since: int, limit: int = STOCK_LOG_PAGE_MAX, market_id: Optional[int] = None,
+                  ingredient_ids: Optional[Iterable[int]] = None) -> Tuple[List[Change], bool]:
+    """seq > since 인 변경(seq 순) 최대 limit 건, (목록, 더 있는지)."""
+    qs = StockChange.objects.filter(seq__gt=since)
+    if market_id is not None:
+        qs = qs.filter(market_id=market_id)
+    if ingredient_ids is not None:
+        qs = qs.filter(ingredient_id__in=list(ingredient_ids))
+    rows = list(
+        qs.order_by("seq").values_list("seq", "market_id", "ingredient_id", "action")[:limit + 1]
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def serialize_changes(rows: List[Change]) -> List[Dict]:
+    return [
+        {"seq": seq, "market_id": mid, "ingredient_id": iid, "action": action}
+        for seq, mid, iid, action in rows
+    ]
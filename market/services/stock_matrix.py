@@ -0,0 +1,122 @@
+"""
+관리자 재고 매트릭스(마켓 × 재료 체크박스) 편집.
+
+- 화면: 재료(검색/페이지) × 마트(검색/페이지), 현재 재고는 보이는 칸만 1회 조회
+- 전통시장은 재고를 두지 않음(MarketStock.clean) → 화면에서 빼고 저장 시에도 버림
+- 저장: 브라우저가 바뀐 칸만 "마켓id:재료id" 로 보냄(add/remove) → 한 트랜잭션에서
+  추가분 bulk_create + 삭제분 Q-OR 묶음 DELETE 1문장(raw_delete_stock), 이후 마켓마다 stock_changed 1회
+- 현재 재고와 다시 비교해 이미 있는 추가/이미 없는 삭제는 건너뜀(다른 관리자와 동시 편집해도 안전)
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set, Tuple
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
+
+from food.models import Ingredient
+from market.models import Market, MarketStock, MarketType
+from .stock_events import bulk_stock_update, raw_delete_stock, stock_changed
+
+STOCK_MATRIX_INGREDIENTS_PER_PAGE = getattr(settings, "STOCK_MATRIX_INGREDIENTS_PER_PAGE", 50)
+STOCK_MATRIX_MARKETS_PER_PAGE = getattr(settings, "STOCK_MATRIX_MARKETS_PER_PAGE", 10)
+STOCK_MATRIX_BATCH = getattr(settings, "STOCK_MATRIX_BATCH", 1000)
+
+Cell = Tuple[int, int]  # (market_id, ingredient_id)
+
+
+# =============================================================================
+# A. 화면
+# =============================================================================
+@dataclass
+class StockMatrix:
+    markets: object          # 마켓 Page
+    ingredients: object      # 재료 Page
+    rows: List[Tuple[Ingredient, List[Tuple[Market, bool]]]] = field(default_factory=list)
+
+
+def _stock_markets():
+    """재고를 둘 수 있는 마켓(전통시장 제외)."""
+    return Market.objects.exclude(market_type=MarketType.TRAD)
+
+
+def build_matrix(q: str = "", market_q: str = "", page=1, market_page=1) -> StockMatrix:
+    """보이는 마트/재료 페이지와 칸별 재고 여부. 쿼리: 마트/재료 페이지 각 2회 + 재고 1회."""
+    markets = _stock_markets().only("id", "name", "market_type").order_by("name", "id")
+    if market_q:
+        markets = markets.filter(name__icontains=market_q)
+    ingredients = Ingredient.objects.only("id", "name").order_by("name")
+    if q:
+        ingredients = ingredients.filter(name__icontains=q)
+
+    m_page = Paginator(markets, STOCK_MATRIX_MARKETS_PER_PAGE).get_page(market_page)
+    i_page = Paginator(ingredients, STOCK_MATRIX_INGREDIENTS_PER_PAGE).get_page(page)
+    m_list, i_list = list(m_page), list(i_page)
+
+    stocked: Set[Cell] = set(
+        MarketStock.objects
+        .filter(market_id__in=[m.id for m in m_list], ingredient_id__in=[i.id for i in i_list])
+        .values_list("market_id", "ingredient_id")
+    ) if m_list and i_list else set()
+
+    rows = [(ing, [(m, (m.id, ing.id) in stocked) for m in m_list]) for ing in i_list]
+    return StockMatrix(m_page, i_page, rows)
+
+
+# =============================================================================
+# B. 저장
+# =============================================================================
+def parse_cells(values: Iterable[str]) -> Set[Cell]:
+    """["마켓id:재료id", ...] → {(market_id, ingredient_id)}. 형식이 틀리면 ValueError."""
+    cells = set()
+    for v in values:
+        mid, _, iid = v.partition(":")
+        cells.add((int(mid), int(iid)))
+    return cells
+
+
+def _group(cells: Iterable[Cell]) -> Dict[int, Set[int]]:
+    out: Dict[int, Set[int]] = {}
+    for mid, iid in cells:
+        out.setdefault(mid, set()).add(iid)
+    return out
+
+
+def apply_diff(add: Iterable[Cell], remove: Iterable[Cell]) -> Tuple[int, int]:
+    """바뀐 칸만 반영. 없는 마켓/재료, 전통시장 칸은 무시. 반환: (추가 수, 삭제 수)."""
+    add, remove = set(add), set(remove) - set(add)
+    cells = add | remove
+    if not cells:
+        return 0, 0
+    market_ids = set(_stock_markets().filter(id__in={m for m, _ in cells}).values_list("id", flat=True))
+    ingredient_ids = set(Ingredient.objects.filter(id__in={i for _, i in cells}).values_list("id", flat=True))
+    add = {c for c in add if c[0] in market_ids and c[1] in ingredient_ids}
+    remove = {c for c in remove if c[0] in market_ids and c[1] in ingredient_ids}
+    if not (add or remove):
+        return 0, 0
+
+    with transaction.atomic(), bulk_stock_update():
+        cells = add | remove
+        current = set(
+            MarketStock.objects
+            .filter(market_id__in={m for m, _ in cells}, ingredient_id__in={i for _, i in cells})
+            .values_list("market_id", "ingredient_id")
+        )
+        to_add = _group(add - current)
+        to_remove = _group(remove & current)
+
+        MarketStock.objects.bulk_create(
+            [MarketStock(market_id=mid, ingredient_id=iid) for mid, ids in to_add.items() for iid in sorted(ids)],
+            batch_size=STOCK_MATRIX_BATCH,
+        )
+        if to_remove:
+            q = Q()
+            for mid, ids in to_remove.items():
+                q |= Q(market_id=mid, ingredient_id__in=sorted(ids))
+            raw_delete_stock(MarketStock.objects.filter(q))
+
+        for mid in sorted(set(to_add) | set(to_remove)):
+            stock_changed(mid, added=sorted(to_add.get(mid, ())), removed=sorted(to_remove.get(mid, ())))
+
+    return sum(map(len, to_add.values())), sum(map(len, to_remove.values()))
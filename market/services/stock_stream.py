@@ -0,0 +1,311 @@
+"""
+마켓 재고 실시간 푸시(SSE)용 프로세스 내 팬아웃.
+
+- 구독: 연결(사용자 1명 × 마켓 1곳)마다 Subscriber 1개, 사용자 장바구니 재료의 변경만 받음
+- 발행: 변경 허브(stock_events.stock_changed) 커밋 후 publish() → 해당 마켓 구독자 큐에 넣고 깨움
+- 다른 프로세스의 변경: 구독자가 있는 동안 폴링 스레드 1개가 STOCK_STREAM_POLL_S 마다 재고 변경 로그를 한 번 조회해 같은 경로로 전달
+  (구독자 수와 무관하게 프로세스당 쿼리 1회, 이미 발행한 seq 는 건너뜀)
+- 스트림: 연결 시 스냅샷(또는 Last-Event-ID 이후 로그 재생) → 변경 이벤트 / 하트비트 → STOCK_STREAM_MAX_S 후 종료(브라우저가 재연결)
+
+배포: 많은 동시 연결(걷는 중인 사용자 수만큼)은 ASGI(jangbom.asgi, 예: uvicorn) 전제.
+  ASGI 는 비동기 제너레이터라 대기 중인 연결이 스레드를 점유하지 않음.
+  WSGI 는 연결마다 워커 스레드를 STOCK_STREAM_MAX_S 동안 점유 → 프로세스당 STOCK_STREAM_MAX_SYNC 개까지만 유지하고
+  넘는 연결은 폴링으로 전환: 스냅샷(또는 Last-Event-ID 이후 재생)만 보내고 바로 닫으며 retry 를
+  STOCK_STREAM_FALLBACK_POLL_MS 로 지정 → 브라우저 EventSource 가 그 간격으로 재연결(스레드 점유 없이 같은 이벤트)
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from market.models import StockChange
+from .inventory_index import get_inventory_index
+from .stock_log import STOCK_LOG_PAGE_MAX, Change, changes_since, head_seq
+
+log = logging.getLogger(__name__)
+
+STOCK_STREAM_HEARTBEAT_S = getattr(settings, "STOCK_STREAM_HEARTBEAT_S", 15)
+STOCK_STREAM_MAX_S = getattr(settings, "STOCK_STREAM_MAX_S", 60 * 5)
+STOCK_STREAM_POLL_S = getattr(settings, "STOCK_STREAM_POLL_S", 2)
+STOCK_STREAM_QUEUE_MAX = getattr(settings, "STOCK_STREAM_QUEUE_MAX", 100)
+STOCK_STREAM_RETRY_MS = getattr(settings, "STOCK_STREAM_RETRY_MS", 3000)
+# WSGI(동기) 스트림 프로세스당 최대 연결 수(연결마다 워커 스레드 점유)
+STOCK_STREAM_MAX_SYNC = getattr(settings, "STOCK_STREAM_MAX_SYNC", 8)
+# 상한을 넘은 WSGI 연결의 폴링(재연결) 간격
+STOCK_STREAM_FALLBACK_POLL_MS = getattr(settings, "STOCK_STREAM_FALLBACK_POLL_MS", 5000)
+
+
+class StreamBusy(Exception):
+    """동기 스트림 연결 수 상한 초과."""
+
+
+# =============================================================================
+# A. 구독자 / 브로커
+# =============================================================================
+class Subscriber:
+    def __init__(self, market_id: int, names: Dict[int, str], loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.market_id = market_id
+        self.names = names                  # 장바구니 {재료 id: 이름}
+        self.overflow = False               # 큐가 넘쳐 버린 변경이 있음 → 스냅샷으로 보정
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._event = asyncio.Event() if loop is not None else threading.Event()
+
+    def push(self, change: Change) -> None:
+        """아무 스레드에서나 호출."""
+        if change[2] not in self.names:
+            return
+        with self._lock:
+            if len(self._items) >= STOCK_STREAM_QUEUE_MAX:
+                self.overflow = True
+            else:
+                self._items.append(change)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._event.set)
+        else:
+            self._event.set()
+
+    @property
+    def is_async(self) -> bool:
+        return self._loop is not None
+
+    def drain(self):
+        """(쌓인 변경, 넘침 여부). 구독 스레드/이벤트 루프에서만 호출(asyncio.Event 는 루프 밖에서 건드리지 않음)."""
+        self._event.clear()
+        with self._lock:
+            items, self._items = list(self._items), deque()
+            overflow, self.overflow = self.overflow, False
+        return items, overflow
+
+    def wait(self, timeout: float) -> bool:
+        return self._event.wait(timeout)
+
+    async def wait_async(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class StockBroker:
+    def __init__(self, poll_s: float = STOCK_STREAM_POLL_S):
+        self.poll_s = poll_s
+        self._subs: Dict[int, Set[Subscriber]] = {}
+        self._sync_count = 0
+        self._lock = threading.Lock()
+        self._published: deque = deque(maxlen=10_000)   # 최근 발행 seq(폴링 중복 방지)
+        self._published_set: Set[int] = set()
+        self._poller: Optional[threading.Thread] = None
+        self._cursor: Optional[int] = None
+
+    def subscribe(self, sub: Subscriber) -> Subscriber:
+        """구독 등록(DB 조회가 있을 수 있음 → 이벤트 루프에서는 sync_to_async 로 호출). 동기 연결 상한이면 StreamBusy."""
+        with self._lock:
+            if not sub.is_async:
+                if self._sync_count >= STOCK_STREAM_MAX_SYNC:
+                    raise StreamBusy()
+                self._sync_count += 1
+            self._subs.setdefault(sub.market_id, set()).add(sub)
+            if self.poll_s and (self._poller is None or not self._poller.is_alive()):
+                # 폴링 기준점은 지금(스냅샷보다 먼저) → 그 사이 다른 프로세스 변경도 전달, 이전 구간은 재생하지 않음
+                self._cursor = head_seq()
+                self._poller = threading.Thread(target=self._poll_loop, name="stock-stream-poller", daemon=True)
+                self._poller.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.market_id)
+            if subs is not None and sub in subs:
+                subs.discard(sub)
+                if not sub.is_async:
+                    self._sync_count -= 1
+                if not subs:
+                    del self._subs[sub.market_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+    def publish(self, changes: Iterable[Change]) -> None:
+        """커밋된 변경을 해당 마켓 구독자들에게 전달. 이미 전달한 seq 는 건너뜀(로컬 발행 + 로그 폴링 중복)."""
+        by_market: Dict[int, List[Change]] = {}
+        with self._lock:
+            for c in changes:
+                seq = c[0]
+                if seq is not None:
+                    if seq in self._published_set:
+                        continue
+                    if len(self._published) == self._published.maxlen:
+                        self._published_set.discard(self._published[0])
+                    self._published.append(seq)
+                    self._published_set.add(seq)
+                if c[1] in self._subs:
+                    by_market.setdefault(c[1], []).append(c)
+            targets = {mid: list(self._subs[mid]) for mid in by_market}
+        for mid, subs in targets.items():
+            for sub in subs:
+                for c in by_market[mid]:
+                    sub.push(c)
+
+    def _poll_loop(self) -> None:
+        """다른 프로세스에서 커밋된 변경을 재고 변경 로그에서 읽어 전달. 구독자가 없어지면 종료."""
+        try:
+            while True:
+                time.sleep(self.poll_s)
+                with self._lock:
+                    markets = list(self._subs)
+                    if not markets:
+                        self._poller, self._cursor = None, None
+                        return
+                close_old_connections()
+                rows, _ = changes_since(self._cursor, market_id=None)
+                if rows:
+                    self._cursor = rows[-1][0]
+                    self.publish([r for r in rows if r[1] in markets])
+        except Exception:
+            log.exception("[stock_stream] poller stopped")
+            with self._lock:
+                self._poller, self._cursor = None, None
+        finally:
+            close_old_connections()
+
+
+_broker = StockBroker()
+
+
+def get_stock_broker() -> StockBroker:
+    return _broker
+
+
+# =============================================================================
+# B. SSE 스트림
+# =============================================================================
+def _event(event: str, data, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _change_event(sub: Subscriber, change: Change) -> str:
+    seq, _, iid, action = change
+    return _event("stock", {
+        "seq": seq,
+        "ingredient_id": iid,
+        "name": sub.names.get(iid, ""),
+        "in_stock": action == StockChange.Action.ADD,
+    }, seq)
+
+
+def _snapshot_event(sub: Subscriber) -> str:
+    """현재 재고 기준 장바구니 (있음, 없음). id 는 로그 마지막 seq → 재연결 시 그 이후만 재생."""
+    seq = head_seq()
+    matched, _ = get_inventory_index().split(sub.market_id, list(sub.names))
+    in_stock = {sub.names[i] for i in matched}   # 같은 이름 재료가 여럿이면 하나라도 있으면 있음(match_ingredients 와 동일)
+    return _event("snapshot", {
+        "in_stock": sorted(in_stock),
+        "out_of_stock": sorted(set(sub.names.values()) - in_stock),
+    }, seq)
+
+
+def _opening(sub: Subscriber, last_event_id: Optional[str], retry_ms: int = STOCK_STREAM_RETRY_MS) -> List[str]:
+    """연결 직후 보낼 이벤트: Last-Event-ID 이후 로그 재생, 없거나 너무 밀렸으면 스냅샷."""
+    out = [f"retry: {retry_ms}\n\n"]
+    if last_event_id and last_event_id.isdigit():
+        rows, more = changes_since(int(last_event_id), limit=STOCK_LOG_PAGE_MAX,
+                                   market_id=sub.market_id, ingredient_ids=sub.names)
+        if not more:
+            return out + [_change_event(sub, c) for c in rows]
+    return out + [_snapshot_event(sub)]
+
+
+def _pending(sub: Subscriber, items: List[Change], overflow: bool) -> List[str]:
+    """drain() 결과 → 보낼 이벤트. 넘쳤으면 스냅샷(DB 조회)."""
+    if overflow:
+        return [_snapshot_event(sub)]
+    return [_change_event(sub, c) for c in items]
+
+
+def _sync_stream(sub: Subscriber, last_event_id: Optional[str], max_s: float) -> Iterator[str]:
+    broker = get_stock_broker()
+    try:
+        yield from _opening(sub, last_event_id)
+        deadline = time.monotonic() + max_s
+        while (left := deadline - time.monotonic()) > 0:
+            if sub.wait(min(STOCK_STREAM_HEARTBEAT_S, left)):
+                yield from _pending(sub, *sub.drain())
+            else:
+                yield ": ping\n\n"
+    finally:
+        broker.unsubscribe(sub)
+
+
+class _SyncStream:
+    """
+    동기 스트림 래퍼. 시작 전에 닫힌 제너레이터는 finally 가 돌지 않으므로
+    close()(StreamingHttpResponse 가 응답 종료 시 호출)에서 직접 구독 해제.
+    """
+
+    def __init__(self, sub: Subscriber, chunks: Iterator[str]):
+        self.sub = sub
+        self._chunks = chunks
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._chunks)
+
+    def close(self) -> None:
+        self._chunks.close()
+        get_stock_broker().unsubscribe(self.sub)
+
+
+async def _async_stream(sub: Subscriber, last_event_id: Optional[str], max_s: float):
+    broker = get_stock_broker()
+    try:
+        for chunk in await sync_to_async(_opening)(sub, last_event_id):
+            yield chunk
+        deadline = time.monotonic() + max_s
+        while (left := deadline - time.monotonic()) > 0:
+            if await sub.wait_async(min(STOCK_STREAM_HEARTBEAT_S, left)):
+                items, overflow = sub.drain()  # 루프에서(asyncio.Event 는 스레드 안전하지 않음)
+                if overflow:
+                    chunks = await sync_to_async(_pending)(sub, items, overflow)
+                else:
+                    chunks = _pending(sub, items, overflow)
+                for chunk in chunks:
+                    yield chunk
+            else:
+                yield ": ping\n\n"
+    finally:
+        broker.unsubscribe(sub)
+
+
+def open_stock_stream(market_id: int, names: Dict[int, str], last_event_id: Optional[str] = None, *,
+                      asynchronous: bool = False, max_s: float = STOCK_STREAM_MAX_S):
+    """
+    SSE 본문 이터레이터. 구독은 여기서 바로 등록(스냅샷/재생 전) → 그 사이 변경도 놓치지 않음(중복은 무해).
+    asynchronous=True 면 ASGI 이벤트 루프용 비동기 제너레이터(첫 반복 시 구독).
+    동기 스트림이 프로세스 상한(STOCK_STREAM_MAX_SYNC)이면 구독 없이 첫 이벤트만 보내고 끝나는 폴링 응답.
+    """
+    broker = get_stock_broker()
+    if asynchronous:
+        async def stream():
+            sub = await sync_to_async(broker.subscribe)(Subscriber(market_id, names, loop=asyncio.get_running_loop()))
+            async for chunk in _async_stream(sub, last_event_id, max_s):
+                yield chunk
+        return stream()
+    try:
+        sub = broker.subscribe(Subscriber(market_id, names))
+    except StreamBusy:
+        return iter(_opening(Subscriber(market_id, names), last_event_id, retry_ms=STOCK_STREAM_FALLBACK_POLL_MS))
+    return _SyncStream(sub, _sync_stream(sub, last_event_id, max_s))
@@ -0,0 +1,120 @@
+"""
+주소 × 마켓 보행 행렬(AddressWalk).
+
+- build_all(): 저장된 모든 주소 × 반경 MATRIX_RADIUS_M 이내 마켓 계산 (manage.py build_walking_matrix)
+- refresh_address()/refresh_market(): 주소/마켓이 추가되거나 좌표가 바뀌었을 때 해당 행만 재계산
+- travel_info_for(): 화면에서 (예상시간, 거리, 포인트)를 행렬에서 바로 읽고, 없으면 기존 계산으로 폴백
+"""
+import math
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+
+from accounts.models import Address
+from market.models import AddressWalk, Market
+from market.utils import get_travel_info
+from .route_store import get_route
+from .spatial_index import M_PER_DEG_LAT, haversine_m
+
+MATRIX_RADIUS_M = getattr(settings, "WALKING_MATRIX_RADIUS_M", 2000)
+
+
+def _travel_from_route(route) -> Optional[Tuple[int, int, int]]:
+    """경로 → (예상시간(분), 거리(m), 포인트). 규칙은 utils.get_travel_info 와 동일."""
+    distance_m = int(route.get("distance_m") or 0)
+    duration_s = int(route.get("duration_s") or 0)
+    if distance_m <= 0 or duration_s <= 0 or route.get("estimated"):
+        return None
+    expected_min = math.ceil(duration_s / 60)
+    return expected_min, distance_m, round(expected_min)
+
+
+def compute_walk(address: Address, market: Market) -> Optional[AddressWalk]:
+    """한 쌍 계산 후 저장. 실제 경로를 못 얻으면(추정값/실패) 저장하지 않고 None."""
+    try:
+        route = get_route(address.latitude, address.longitude, market)
+    except Exception:
+        return None
+    info = _travel_from_route(route)
+    if info is None:
+        return None
+    expected_min, distance_m, point_earned = info
+    walk, _ = AddressWalk.objects.update_or_create(
+        address=address, market=market,
+        defaults={"distance_m": distance_m, "expected_min": expected_min, "point_earned": point_earned},
+    )
+    return walk
+
+
+def _markets_near(address: Address) -> Iterable[Market]:
+    for m in Market.objects.near(address.latitude, address.longitude, MATRIX_RADIUS_M):
+        if haversine_m(address.latitude, address.longitude, m.latitude, m.longitude) <= MATRIX_RADIUS_M:
+            yield m
+
+
+def _addresses_near(market: Market) -> Iterable[Address]:
+    d_lat = MATRIX_RADIUS_M / M_PER_DEG_LAT
+    d_lng = d_lat / max(math.cos(math.radians(market.latitude)), 1e-6)
+    qs = Address.objects.filter(
+        latitude__range=(market.latitude - d_lat, market.latitude + d_lat),
+        longitude__range=(market.longitude - d_lng, market.longitude + d_lng),
+    )
+    for a in qs:
+        if haversine_m(a.latitude, a.longitude, market.latitude, market.longitude) <= MATRIX_RADIUS_M:
+            yield a
+
+
+def refresh_address(address_id: int) -> int:
+    """주소 한 곳의 행 전체 재계산. 반환: 저장된 행 수."""
+    address = Address.objects.filter(id=address_id).first()
+    if address is None:
+        return 0
+    AddressWalk.objects.filter(address=address).delete()
+    return sum(1 for m in _markets_near(address) if compute_walk(address, m))
+
+
+def refresh_market(market_id: int) -> int:
+    """마켓 한 곳의 행 전체 재계산. 반환: 저장된 행 수."""
+    market = Market.objects.filter(id=market_id).first()
+    if market is None:
+        return 0
+    AddressWalk.objects.filter(market=market).delete()
+    return sum(1 for a in _addresses_near(market) if compute_walk(a, market))
+
+
+def build_all(only_missing: bool = False, progress=None) -> int:
+    """모든 주소 × 반경 내 마켓. only_missing=True 면 이미 있는 행은 건너뜀."""
+    saved = 0
+    for address in Address.objects.all().iterator():
+        existing = set()
+        if only_missing:
+            existing = set(AddressWalk.objects.filter(address=address).values_list("market_id", flat=True))
+        for m in _markets_near(address):
+            if m.id in existing:
+                continue
+            if compute_walk(address, m):
+                saved += 1
+        if progress:
+            progress(address, saved)
+    return saved
+
+
+def travel_info_for(user, market: Market) -> Tuple[int, int, int]:
+    """
+    (예상시간(분), 거리(m), 적립포인트).
+    대표 주소 × 마켓 행이 있으면 그대로, 없으면 get_travel_info 로 계산(경로 메모/저장소 경유).
+    """
+    address_id = getattr(user, "selected_address_id", None)
+    if address_id:
+        walk = (
+            AddressWalk.objects
+            .filter(address_id=address_id, market=market)
+            .values_list("expected_min", "distance_m", "point_earned")
+            .first()
+        )
+        if walk is not None:
+            return walk
+
+    return get_travel_info(
+        user.latitude, user.longitude, market.latitude, market.longitude, market=market
+    )
@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import Address
+from .models import Market, MarketStock, NearbyPlace
+from .services.background import run_serialized
+from .services.stock_events import stock_changed, stock_signals_muted
+from .services.nearby_pool import invalidate_pool
+from .services.geofence import get_geofence_index
+from .services.isochrone import get_isochrone_index
+from .services import isochrone, walking_matrix
+
+
+# =============================================================================
+# A. 주소/마켓 좌표 변경 → 보행 행렬 재계산 (+ 마켓 지오펜스 무효화, 도보 등시선 재계산)
+#    재계산은 행을 지우고 다시 쓰므로 쓰기 전용 백그라운드 스레드에서 차례로(sqlite 동시 쓰기 잠금 방지)
+# =============================================================================
+_COORD_FIELDS = frozenset({"latitude", "longitude"})
+
+
+def _remember_coords(sender, instance, update_fields=None):
+    """저장 전 DB 좌표를 기억해 post_save 에서 이동 여부 판단. 좌표를 안 고치는 save(update_fields=...)는 조회 생략."""
+    if update_fields is not None and not _COORD_FIELDS & set(update_fields):
+        instance._old_coords = (instance.latitude, instance.longitude)
+        return
+    old = None
+    if instance.pk:
+        old = sender.objects.filter(pk=instance.pk).values_list("latitude", "longitude").first()
+    instance._old_coords = old
+
+
+def _moved(instance, created: bool) -> bool:
+    return created or getattr(instance, "_old_coords", None) != (instance.latitude, instance.longitude)
+
+
+@receiver(pre_save, sender=Address)
+def address_pre_save(sender, instance, update_fields=None, **kwargs):
+    _remember_coords(sender, instance, update_fields)
+
+
+@receiver(pre_save, sender=Market)
+def market_pre_save(sender, instance, update_fields=None, **kwargs):
+    _remember_coords(sender, instance, update_fields)
+
+
+@receiver(post_save, sender=Address)
+def address_post_save(sender, instance, created, **kwargs):
+    if _moved(instance, created):
+        transaction.on_commit(lambda: run_serialized(walking_matrix.refresh_address, instance.pk))
+
+
+@receiver(post_save, sender=Market)
+def market_post_save(sender, instance, created, **kwargs):
+    if _moved(instance, created):
+        transaction.on_commit(get_geofence_index().invalidate)
+        transaction.on_commit(lambda: run_serialized(walking_matrix.refresh_market, instance.pk))
+        transaction.on_commit(lambda: run_serialized(isochrone.refresh_market, instance.pk))
+
+
+@receiver(post_delete, sender=Market)
+def market_post_delete(sender, instance, **kwargs):
+    transaction.on_commit(get_geofence_index().invalidate)
+    transaction.on_commit(get_isochrone_index().invalidate)
+
+
+# =============================================================================
+# B. 재고 변경 → 변경 허브(재고 변경 로그, 재고 인덱스)
+# =============================================================================
+@receiver(pre_save, sender=MarketStock)
+def stock_pre_save(sender, instance, **kwargs):
+    if stock_signals_muted():
+        return
+    old = None
+    if instance.pk:
+        old = sender.objects.filter(pk=instance.pk).values_list("market_id", "ingredient_id").first()
+    instance._old_pair = old
+
+
+@receiver(post_save, sender=MarketStock)
+def stock_post_save(sender, instance, created, **kwargs):
+    if stock_signals_muted():
+        return
+    old = getattr(instance, "_old_pair", None)
+    if not created and old == (instance.market_id, instance.ingredient_id):
+        return  # last_updated 만 갱신(재고 변화 없음)
+    if old:
+        stock_changed(old[0], removed=[old[1]])
+    stock_changed(instance.market_id, added=[instance.ingredient_id])
+
+
+@receiver(post_delete, sender=MarketStock)
+def stock_post_delete(sender, instance, **kwargs):
+    if stock_signals_muted():
+        return
+    stock_changed(instance.market_id, removed=[instance.ingredient_id])
+
+
+# =============================================================================
+# C. 주변 장소 변경 → 마켓별 영업 중 풀 삭제
+# =============================================================================
+@receiver(post_save, sender=NearbyPlace)
+@receiver(post_delete, sender=NearbyPlace)
+def nearby_place_changed(sender, instance, **kwargs):
+    market_id = instance.market_id
+    transaction.on_commit(lambda: invalidate_pool(market_id))
@@ -1,3 +1,1398 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import math
+import random
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from food.models import Ingredient
+from .models import (
+    Market, MarketFilterSetting, MarketStock, MarketType, NearbyPlace, ShoppingList, ShoppingListIngredient,
+    StockChange,
+)
+from .services.inventory_index import get_inventory_index
+from .services.scoring import DEFAULT_WEIGHTS, ScoringBatch, score, top_k, top_k_per_group
+
+
+def make_market(name, lat=37.65, lng=127.02, market_type=MarketType.MART, **kwargs):
+    fields = dict(
+        name=name, market_type=market_type, info="", address="", latitude=lat, longitude=lng, secret_code="1",
+        open_days="월,화,수,목,금,토,일", open_time=datetime.time(0, 0), close_time=datetime.time(0, 0),
+    )
+    fields.update(kwargs)
+    return Market.objects.create(**fields)
+
+
+class MarketTestCase(TestCase):
+    """마트 2곳 + 전통시장 1곳, 재료 6개, 사용자 장바구니(재료 1~3)."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            "walker", password="pw", nickname="walker", latitude=37.65, longitude=127.02,
+        )
+        self.client.force_login(self.user)
+        self.mart = make_market("mart-a", 37.651, 127.021)
+        self.mart2 = make_market("mart-b", 37.653, 127.024)
+        self.trad = make_market("trad-c", 37.655, 127.025, market_type=MarketType.TRAD)
+        self.ings = [Ingredient.objects.create(name=f"ing{i}") for i in range(6)]
+        for ing in self.ings[:3]:
+            MarketStock.objects.create(market=self.mart, ingredient=ing)
+        self.shopping_list = ShoppingList.objects.create(user=self.user)
+        for ing in self.ings[1:4]:
+            ShoppingListIngredient.objects.create(shopping_list=self.shopping_list, ingredient=ing)
+        get_inventory_index().invalidate()
+
+    def stock_of(self, market):
+        return set(MarketStock.objects.filter(market=market).values_list("ingredient_id", flat=True))
+
+
+# =============================================================================
+# 재고 매트릭스(관리자) — user-025
+# =============================================================================
+class StockMatrixTests(MarketTestCase):
+    def _delete_sql(self, queries):
+        return [q["sql"] for q in queries if q["sql"].startswith('DELETE FROM "market_marketstock"')]
+
+    def test_apply_diff_deletes_in_one_statement(self):
+        from .services.stock_matrix import apply_diff
+
+        for ing in self.ings:
+            MarketStock.objects.get_or_create(market=self.mart2, ingredient=ing)
+        remove = {(self.mart.id, i.id) for i in self.ings[:3]} | {(self.mart2.id, i.id) for i in self.ings}
+        with CaptureQueriesContext(connection) as ctx:
+            added, removed = apply_diff(set(), remove)
+
+        self.assertEqual((added, removed), (0, 9))
+        self.assertEqual(len(self._delete_sql(ctx.captured_queries)), 1)
+        # 행 조회(id IN 삭제 준비) 없음
+        self.assertFalse([q for q in ctx.captured_queries if 'SELECT "market_marketstock"."id"' in q["sql"]])
+        self.assertEqual(self.stock_of(self.mart), set())
+        self.assertEqual(self.stock_of(self.mart2), set())
+        # 행 단위 시그널 대신 마켓당 한 번 로그 기록
+        self.assertEqual(StockChange.objects.filter(action=StockChange.Action.REMOVE).count(), 9)
+
+    def test_apply_diff_query_count_independent_of_rows(self):
+        from .services.stock_matrix import apply_diff
+
+        def run(n):
+            add = {(self.mart2.id, i.id) for i in self.ings[:n]}
+            with CaptureQueriesContext(connection) as ctx:
+                apply_diff(add, set())
+            with CaptureQueriesContext(connection) as ctx2:
+                apply_diff(set(), add)
+            return len(ctx), len(ctx2)
+
+        self.assertEqual(run(1), run(6))
+
+    def test_trad_market_excluded(self):
+        from .services.stock_matrix import apply_diff, build_matrix
+
+        matrix = build_matrix()
+        self.assertNotIn(self.trad.id, [m.id for m in matrix.markets])
+        self.assertEqual(apply_diff({(self.trad.id, self.ings[0].id)}, set()), (0, 0))
+        self.assertFalse(MarketStock.objects.filter(market=self.trad).exists())
+
+    def test_admin_matrix_post(self):
+        admin = CustomUser.objects.create_superuser("admin", password="pw", nickname="admin")
+        self.client.force_login(admin)
+        url = "/admin/market/marketstock/matrix/?q=ing"
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(url, {
+                "add": [f"{self.mart2.id}:{self.ings[0].id}"],
+                "remove": [f"{self.mart.id}:{self.ings[1].id}"],
+            })
+        self.assertRedirects(resp, url, fetch_redirect_response=False)
+        self.assertEqual(self.stock_of(self.mart), {self.ings[0].id, self.ings[2].id})
+        self.assertEqual(self.stock_of(self.mart2), {self.ings[0].id})
+        matched, _ = get_inventory_index().split(self.mart.id, [self.ings[1].id])
+        self.assertEqual(matched, [])
+
+
+# =============================================================================
+# 재고 피드 일괄 반영 — user-018
+# =============================================================================
+class StockImportTests(MarketTestCase):
+    def _import(self, text, **kwargs):
+        from .services.stock_import import import_stock_feed
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return import_stock_feed(io.StringIO(text), "csv", **kwargs)
+
+    def _feed(self, rows):
+        return "market_id,ingredient\n" + "".join(f"{mid},{name}\n" for mid, name in rows)
+
+    def test_diff_matches_feed(self):
+        for ing in self.ings[3:]:
+            MarketStock.objects.create(market=self.mart2, ingredient=ing)
+        before_mart2 = self.stock_of(self.mart2)
+        feed = [(self.mart.id, n) for n in ("ing2", "ing3", "ing4", "unknown")]
+        report = self._import(self._feed(feed))
+
+        # 피드에 나온 마켓은 피드와 같아지고, 나오지 않은 마켓은 그대로
+        self.assertEqual(self.stock_of(self.mart), {self.ings[2].id, self.ings[3].id, self.ings[4].id})
+        self.assertEqual(self.stock_of(self.mart2), before_mart2)
+        self.assertEqual((report.markets, report.inserted, report.deleted, report.unknown_ingredients), (1, 2, 2, 1))
+        # 로그/인덱스도 같은 diff
+        logged = set(StockChange.objects.filter(market=self.mart).values_list("ingredient_id", "action"))
+        self.assertTrue({(self.ings[3].id, "add"), (self.ings[4].id, "add"),
+                         (self.ings[0].id, "remove"), (self.ings[1].id, "remove")} <= logged)
+        matched, _ = get_inventory_index().split(self.mart.id, [i.id for i in self.ings])
+        self.assertEqual(set(matched), self.stock_of(self.mart))
+
+    def test_dry_run_changes_nothing(self):
+        report = self._import(self._feed([(self.mart.id, "ing5")]), dry_run=True)
+        self.assertEqual((report.inserted, report.deleted), (1, 3))
+        self.assertEqual(self.stock_of(self.mart), {i.id for i in self.ings[:3]})
+
+    def test_delete_is_single_statement(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self._import(self._feed([(self.mart.id, "ing5")]))
+        deletes = [q for q in ctx.captured_queries if q["sql"].startswith('DELETE FROM "market_marketstock"')]
+        self.assertEqual(len(deletes), 1)
+        self.assertFalse([q for q in ctx.captured_queries if 'SELECT "market_marketstock"."id"' in q["sql"]])
+
+    def test_trad_market_skipped(self):
+        report = self._import(self._feed([(self.trad.id, "ing0"), (self.mart.id, "ing0")]))
+        self.assertEqual((report.trad_markets, report.markets), (1, 1))
+        self.assertFalse(MarketStock.objects.filter(market=self.trad).exists())
+        self.assertIn("trad markets skipped 1", report.summary())
+
+
+# =============================================================================
+# 매칭 결과 캐시 버전 — user-013
+# =============================================================================
+class MatchCacheVersionTests(MarketTestCase):
+    def _names(self, items):
+        return sorted(i["name"] for i in items)
+
+    def test_stock_change_from_other_process_invalidates(self):
+        from .services import stock_log
+        from .utils import match_ingredients_cached
+
+        matched, _ = match_ingredients_cached(self.mart, self.user)
+        self.assertEqual(self._names(matched), ["ing1", "ing2"])
+
+        # 다른 워커의 변경: DB 행 + 로그만 있고 이 프로세스의 캐시/커밋 콜백은 거치지 않음
+        with self.captureOnCommitCallbacks(execute=False):
+            MarketStock.objects.create(market=self.mart, ingredient=self.ings[3])
+        stock_log.record(self.mart.id, added=[self.ings[3].id])
+        get_inventory_index()._synced_at = 0  # 주기 동기화 시점 도래
+        matched, _ = match_ingredients_cached(self.mart, self.user)
+        self.assertEqual(self._names(matched), ["ing1", "ing2", "ing3"])
+
+    def test_cart_version_follows_rows(self):
+        from .services.stock_events import cart_version
+
+        v0 = cart_version(self.shopping_list.id)
+        ShoppingListIngredient.objects.bulk_create(
+            [ShoppingListIngredient(shopping_list=self.shopping_list, ingredient=self.ings[5])]
+        )
+        v1 = cart_version(self.shopping_list.id)
+        ShoppingListIngredient.objects.filter(shopping_list=self.shopping_list, ingredient=self.ings[5]).delete()
+        v2 = cart_version(self.shopping_list.id)
+        ShoppingListIngredient.objects.create(shopping_list=self.shopping_list, ingredient=self.ings[5])
+        v3 = cart_version(self.shopping_list.id)
+        self.assertNotEqual(v1, v0)                  # 시그널 없는 bulk_create 도 반영
+        self.assertEqual(v2, v0)                     # 같은 내용으로 되돌아가면 같은 버전
+        self.assertNotIn(v3, {v0, v1})
+
+
+# =============================================================================
+# 재고 실시간 푸시(SSE) — user-024
+# =============================================================================
+class StockStreamTests(MarketTestCase):
+    def setUp(self):
+        super().setUp()
+        from .services import stock_stream
+
+        self.stock_stream = stock_stream
+        self.names = {i.id: i.name for i in self.ings[1:4]}
+
+    def _wait_until(self, cond, timeout=2.0):
+        import time
+
+        deadline = time.monotonic() + timeout
+        while not cond() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return cond()
+
+    def test_poller_starts_at_head_and_restarts_fresh(self):
+        broker = self.stock_stream.StockBroker(poll_s=0.02)
+        calls = []
+
+        def changes_since(since, **kwargs):
+            calls.append(since)
+            return [], False
+
+        with mock.patch.object(self.stock_stream, "head_seq", return_value=42), \
+                mock.patch.object(self.stock_stream, "changes_since", side_effect=changes_since):
+            sub = broker.subscribe(self.stock_stream.Subscriber(self.mart.id, self.names))
+            # 첫 폴링 전에 이미 기준점이 잡혀 있음(스냅샷과의 사이 변경 누락 없음)
+            self.assertEqual(broker._cursor, 42)
+            self.assertTrue(self._wait_until(lambda: calls))
+            broker.unsubscribe(sub)
+            self.assertTrue(self._wait_until(lambda: broker._poller is None))
+            self.assertIsNone(broker._cursor)
+
+        calls.clear()
+        with mock.patch.object(self.stock_stream, "head_seq", return_value=100), \
+                mock.patch.object(self.stock_stream, "changes_since", side_effect=changes_since):
+            sub = broker.subscribe(self.stock_stream.Subscriber(self.mart.id, self.names))
+            self.assertTrue(self._wait_until(lambda: calls))
+            broker.unsubscribe(sub)
+            self._wait_until(lambda: broker._poller is None)
+        # 예전 기준점(42)부터 재생하지 않음
+        self.assertEqual(set(calls), {100})
+
+    def test_sync_stream_snapshot_then_change(self):
+        # 테스트마다 롤백되어 seq 가 재사용되므로 프로세스 브로커(발행 seq 기억) 대신 새 브로커
+        broker = self.stock_stream.StockBroker(poll_s=0)
+        with mock.patch.object(self.stock_stream, "_broker", broker), \
+                mock.patch.object(self.stock_stream, "STOCK_STREAM_HEARTBEAT_S", 0.05):
+            stream = self.stock_stream.open_stock_stream(self.mart.id, self.names, max_s=0.3)
+            retry, snapshot = next(stream), next(stream)
+            self.assertTrue(retry.startswith("retry:"))
+            self.assertIn('"in_stock": ["ing1", "ing2"]', snapshot)
+            with self.captureOnCommitCallbacks(execute=True):
+                MarketStock.objects.create(market=self.mart, ingredient=self.ings[3])
+            event = next(stream)
+            self.assertIn("event: stock", event)
+            self.assertIn('"name": "ing3"', event)
+            rest = list(stream)
+        self.assertTrue(all(chunk.startswith(": ping") for chunk in rest))
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_sync_connections_capped(self):
+        broker = self.stock_stream.StockBroker(poll_s=0)
+        with mock.patch.object(self.stock_stream, "_broker", broker), \
+                mock.patch.object(self.stock_stream, "STOCK_STREAM_MAX_SYNC", 1):
+            first = self.client.get(f"/market/stream/{self.mart.id}/stock/")
+            self.assertEqual(first["Content-Type"], "text/event-stream")
+            # 상한 초과 → 구독 없이 스냅샷만 보내고 닫는 폴링 응답
+            busy = self.client.get(f"/market/stream/{self.mart.id}/stock/")
+            self.assertEqual(busy.status_code, 200)
+            chunks = [c.decode() for c in busy.streaming_content]
+            self.assertEqual(chunks[0], f"retry: {self.stock_stream.STOCK_STREAM_FALLBACK_POLL_MS}\n\n")
+            self.assertIn("event: snapshot", chunks[1])
+            self.assertEqual(broker.subscriber_count(), 1)
+            # 재연결(Last-Event-ID) → 그 사이 변경만 재생
+            last_id = chunks[1].split("\n")[0].removeprefix("id: ")
+            MarketStock.objects.create(market=self.mart, ingredient=self.ings[3])
+            replay = self.client.get(f"/market/stream/{self.mart.id}/stock/", HTTP_LAST_EVENT_ID=last_id)
+            replay_chunks = [c.decode() for c in replay.streaming_content]
+            self.assertEqual(len(replay_chunks), 2)
+            self.assertIn('"name": "ing3"', replay_chunks[1])
+            first.close()  # 연결 종료 → 자리 반환
+            self.assertEqual(broker.subscriber_count(), 0)
+            again = self.client.get(f"/market/stream/{self.mart.id}/stock/")
+            self.assertEqual(again.status_code, 200)
+            again.close()
+
+    def test_async_stream_drains_on_loop(self):
+        import threading
+        from asgiref.sync import async_to_sync
+
+        broker = self.stock_stream.StockBroker(poll_s=0)
+
+        async def run():
+            stream = self.stock_stream.open_stock_stream(self.mart.id, self.names, asynchronous=True, max_s=0.5)
+            out = [await stream.__anext__(), await stream.__anext__()]
+            change = (10 ** 9, self.mart.id, self.ings[1].id, StockChange.Action.REMOVE)
+            threading.Timer(0.05, broker.publish, args=([change],)).start()
+            out.append(await stream.__anext__())
+            async for chunk in stream:
+                out.append(chunk)
+            return out
+
+        with mock.patch.object(self.stock_stream, "_broker", broker), \
+                mock.patch.object(self.stock_stream, "STOCK_STREAM_HEARTBEAT_S", 0.1), \
+                mock.patch.object(self.stock_stream, "STOCK_STREAM_MAX_SYNC", 0):  # 비동기 연결은 상한과 무관
+            out = async_to_sync(run)()
+        self.assertIn('"in_stock": false', out[2])
+        self.assertEqual(broker.subscriber_count(), 0)
+
+
+# =============================================================================
+# 도착 자동 감지 API — user-017
+# =============================================================================
+class ArrivalPingTests(MarketTestCase):
+    url = "/market/api/arrival-ping/"
+
+    def _post(self, body):
+        return self.client.post(self.url, data=body if isinstance(body, str) else json.dumps(body),
+                                content_type="application/json")
+
+    def test_malformed_bodies_are_rejected(self):
+        for body in ([1, 2], "not json", {"lat": 1}, {"pings": "ab"}, {"pings": [[1]]}, 5, None):
+            with self.subTest(body=body):
+                self.assertEqual(self._post(body).status_code, 400)
+
+    def test_non_finite_coordinates_are_rejected(self):
+        for body in ({"lat": "nan", "lng": 1}, {"lat": 37.6, "lng": "inf"},
+                     {"pings": [[37.65, 127.02], ["-inf", 127.02]]}):
+            with self.subTest(body=body):
+                self.assertEqual(self._post(body).status_code, 400)
+
+    def test_arrival_detected(self):
+        from .services.geofence import get_geofence_index
+
+        get_geofence_index().invalidate()
+        self.shopping_list.market = self.mart
+        self.shopping_list.save()
+        far = self._post({"lat": 37.70, "lng": 127.10}).json()
+        self.assertFalse(far["arrived"])
+        near = self._post({"pings": [[37.70, 127.10], [self.mart.latitude, self.mart.longitude]]}).json()
+        self.assertTrue(near["arrived"])
+        self.assertEqual(near["market_id"], self.mart.id)
+        self.shopping_list.refresh_from_db()
+        self.assertIsNotNone(self.shopping_list.arrived_at)
+
+
+# =============================================================================
+# 경로 폴리라인 — user-009
+# =============================================================================
+class RoutePolylineTests(TestCase):
+    """저장해 둔 TMAP 보행자 응답(testdata/tmap_pedestrian_route.json)을 실제 파서로 읽어 검증."""
+
+    FIXTURE = Path(__file__).resolve().parent / "testdata" / "tmap_pedestrian_route.json"
+
+    def setUp(self):
+        from .integrations import tmap_client
+
+        data = json.loads(self.FIXTURE.read_text())
+        response = mock.Mock(**{"json.return_value": data})
+        with mock.patch.object(tmap_client.http_client, "post", return_value=response):
+            self.route = tmap_client.get_pedestrian_route(37.65, 127.02, 37.66, 127.03)
+        self.path = self.route["path"]
+        self.points = [(p["lat"], p["lng"]) for p in self.path]
+
+    @staticmethod
+    def _dist_to_line_m(p, line):
+        """점 p 에서 폴리라인 line 까지의 최단 거리(m, 국소 평면 근사)."""
+        k = 111_320.0
+        kx = k * math.cos(math.radians(p[0]))
+        px, py = p[1] * kx, p[0] * k
+        best = float("inf")
+        for (alat, alng), (blat, blng) in zip(line, line[1:]):
+            ax, ay, bx, by = alng * kx, alat * k, blng * kx, blat * k
+            dx, dy = bx - ax, by - ay
+            seg2 = dx * dx + dy * dy
+            t = 0.0 if seg2 == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg2))
+            best = min(best, math.hypot(px - ax - t * dx, py - ay - t * dy))
+        return best
+
+    def test_encoded_route_is_much_smaller_than_json_path(self):
+        from .services.polyline import encode_route_path
+
+        self.assertGreater(len(self.path), 500)
+        raw = len(json.dumps(self.path))
+        encoded = len(encode_route_path(self.path))
+        # 이전에는 path 를 JSON 그대로 페이지에 실었음. 커밋 기준 측정치(~130배)에서 여유를 둔 하한
+        self.assertGreaterEqual(raw / encoded, 50, f"raw={raw}B encoded={encoded}B")
+
+    def test_simplified_route_stays_within_tolerance(self):
+        from .services.polyline import decode, encode_route_path, fit_level, tolerance_for_level
+
+        decoded = decode(encode_route_path(self.path))
+        self.assertEqual(decoded[0], tuple(round(v, 5) for v in self.points[0]))
+        self.assertEqual(decoded[-1], tuple(round(v, 5) for v in self.points[-1]))
+        # 단순화 허용 오차 + 1e-5 반올림 오차(대각선 최대 ~1.6m 의 절반)
+        limit = tolerance_for_level(fit_level(self.points)) + 0.8
+        worst = max(self._dist_to_line_m(p, decoded) for p in self.points)
+        self.assertLessEqual(worst, limit)
+
+    def test_encode_decode_round_trip(self):
+        from .services.polyline import decode, encode
+
+        for (lat, lng), (dlat, dlng) in zip(self.points, decode(encode(self.points))):
+            self.assertAlmostEqual(lat, dlat, delta=1e-5)
+            self.assertAlmostEqual(lng, dlng, delta=1e-5)
+        self.assertEqual(len(decode(encode(self.points))), len(self.points))
+
+
+# =============================================================================
+# 지도/경로 페이지 경로 조회 횟수 — user-006
+# =============================================================================
+class MapDirectionRoutingTests(MarketTestCase):
+    url = "/market/direction/"
+    ROUTE = {"path": [{"lat": 37.65, "lng": 127.02}, {"lat": 37.651, "lng": 127.021}],
+             "distance_m": 180, "duration_s": 150}
+
+    def setUp(self):
+        from django.core.cache import cache
+        from .services.route_memo import reset_route_memo_stats
+
+        super().setUp()
+        cache.clear()  # 유저 메모/선계산 결과 초기화
+        reset_route_memo_stats()
+
+    def _get(self):
+        from .services import route_store
+
+        with mock.patch.object(route_store, "route_walk", return_value=dict(self.ROUTE)) as walk:
+            response = self.client.get(self.url, {"market_id": self.mart.id})
+        self.assertEqual(response.status_code, 200)
+        return walk
+
+    def test_one_routing_call_per_request(self):
+        from .services.route_memo import route_memo_stats
+
+        walk = self._get()
+        self.assertEqual(walk.call_count, 1)
+        stats = route_memo_stats()
+        self.assertEqual(stats["routed"], 1)
+        self.assertGreaterEqual(stats["request_hit"], 1)  # get_travel_info 는 같은 요청 메모 재사용
+
+    def test_repeat_visit_reuses_user_memo(self):
+        from .services.route_memo import route_memo_stats
+
+        self._get()
+        walk = self._get()
+        walk.assert_not_called()
+        self.assertEqual(route_memo_stats()["routed"], 1)
+
+    def test_arrival_ping_only_until_arrived(self):
+        from .services import route_store
+
+        def page():
+            with mock.patch.object(route_store, "route_walk", return_value=dict(self.ROUTE)):
+                return self.client.get(self.url, {"market_id": self.mart.id})
+
+        self.assertContains(page(), 'id="arrival-ping"')
+        ShoppingList.objects.filter(id=self.shopping_list.id).update(arrived_at=timezone.now())
+        self.assertNotContains(page(), 'id="arrival-ping"')
+        ShoppingList.objects.filter(id=self.shopping_list.id).update(arrived_at=None, is_done=True)
+        self.assertNotContains(page(), 'id="arrival-ping"')
+
+    def test_estimated_route_is_not_memoized_per_user(self):
+        from .services import route_store
+        from .services.route_memo import route_memo_stats
+
+        estimated = {**self.ROUTE, "provider": "haversine", "estimated": True}
+        with mock.patch.object(route_store, "route_walk", return_value=estimated) as walk:
+            self.client.get(self.url, {"market_id": self.mart.id})
+        self.assertEqual(walk.call_count, 1)  # 같은 요청 안에서는 재사용
+        walk = self._get()                    # 공급자 복구 → 다음 요청은 실제 경로
+        self.assertEqual(walk.call_count, 1)
+        self.assertEqual(route_memo_stats()["user_hit"], 0)
+
+
+# =============================================================================
+# 랭킹 엔진 ↔ 이전 뷰 루프 동등성 — user-004/022
+# =============================================================================
+def legacy_pick(user, filt, when):
+    """기존 nearest_market_view 의 후보 루프 + 정렬 + 폴백 규칙(마켓 1곳 선택)을 그대로 옮긴 기준 구현."""
+    from .utils import get_distance_km, get_latest_shopping_ingredients, is_open_now
+
+    min_m, max_m, min_strict = filt.distance_range_m
+    names = get_latest_shopping_ingredients(user)
+    candidates = []
+    for m in Market.objects.order_by("id"):
+        d_m = int(round(get_distance_km(user.latitude, user.longitude, m.latitude, m.longitude) * 1000))
+        if not ((d_m > min_m if min_strict else d_m >= min_m) and d_m <= max_m):
+            continue
+        if not is_open_now(m.open_days, m.open_time, m.close_time, when):
+            continue
+        n = MarketStock.objects.filter(market=m, ingredient__name__in=names).count() if names else 0
+        candidates.append((m, d_m, n))
+    if not candidates:
+        return None
+
+    pref = filt.type_preference or "none"
+    if pref == "mart":
+        marts = [c for c in candidates if c[0].market_type == "mart"]
+        trads = sorted((c for c in candidates if c[0].market_type == "trad"), key=lambda c: c[1])
+        if marts and all(c[2] == 0 for c in marts) and trads:
+            return trads[0][0].id
+
+    def pri(m):
+        return 0 if pref == "none" or m.market_type == pref else 1
+
+    if pref == "mart":
+        candidates.sort(key=lambda c: (pri(c[0]), -c[2], c[1]))
+    else:
+        candidates.sort(key=lambda c: (pri(c[0]), c[1]))
+    return candidates[0][0].id
+
+
+class OpeningHoursTests(SimpleTestCase):
+    """랭킹 open_mask 와 지도/상세의 WeeklySchedule 이 주간 모든 분에서 같은 판정(마감 분은 종료)."""
+
+    SCHEDULES = [
+        ("월,화,수,목,금,토,일", datetime.time(9, 0), datetime.time(18, 0)),
+        ("월,수,금", datetime.time(22, 0), datetime.time(2, 0)),
+        ("토,일", datetime.time(7, 30), datetime.time(7, 30)),
+        ("화,목", datetime.time(0, 0), datetime.time(23, 59)),
+    ]
+
+    def test_open_mask_agrees_with_weekly_schedule(self):
+        from .services.ranking import MarketArrays, open_mask
+        from .services.schedule import compile_schedule
+
+        arrays = MarketArrays.from_rows(
+            (n, 37.65, 127.02, "mart", days, ot, ct) for n, (days, ot, ct) in enumerate(self.SCHEDULES, 1)
+        )
+        schedules = [compile_schedule(*s) for s in self.SCHEDULES]
+        monday = timezone.make_aware(datetime.datetime(2026, 3, 2))
+        for minute in range(7 * 24 * 60):
+            for second in (0, 59):
+                when = monday + datetime.timedelta(minutes=minute, seconds=second)
+                expected = [s.is_open(when) for s in schedules]
+                if open_mask(arrays, when).tolist() != expected:
+                    self.fail(f"{when:%a %H:%M:%S}: open_mask={open_mask(arrays, when).tolist()} schedule={expected}")
+
+    def test_close_minute_is_closed(self):
+        from .services.ranking import MarketArrays, open_mask
+
+        arrays = MarketArrays.from_rows([(1, 37.65, 127.02, "mart", *self.SCHEDULES[0]),
+                                         (2, 37.65, 127.02, "mart", *self.SCHEDULES[1])])
+        monday = timezone.make_aware(datetime.datetime(2026, 3, 2))
+        self.assertEqual(open_mask(arrays, monday.replace(hour=17, minute=59, second=59)).tolist(), [True, False])
+        self.assertEqual(open_mask(arrays, monday.replace(hour=18)).tolist(), [False, False])
+        self.assertEqual(open_mask(arrays, monday.replace(hour=1, minute=59)).tolist(), [False, True])
+        self.assertEqual(open_mask(arrays, monday.replace(hour=2)).tolist(), [False, False])
+
+    def test_minutes_to_close_agrees_with_weekly_schedule(self):
+        from .services.ranking import MarketArrays, minutes_to_close
+        from .services.schedule import MINUTES_PER_WEEK, compile_schedule
+
+        schedules = self.SCHEDULES + [
+            ("월,화,수,목,금,토,일", datetime.time(0, 0), datetime.time(0, 0)),   # 매일 24시간
+            ("금", datetime.time(22, 0), datetime.time(2, 0)),                   # 다음 날은 휴무
+        ]
+        arrays = MarketArrays.from_rows(
+            (n, 37.65, 127.02, "mart", days, ot, ct) for n, (days, ot, ct) in enumerate(schedules, 1)
+        )
+        compiled = [compile_schedule(*s) for s in schedules]
+        monday = timezone.make_aware(datetime.datetime(2026, 3, 2))
+        for minute in range(0, 7 * 24 * 60, 7):
+            for second in (0, 59):
+                when = monday + datetime.timedelta(minutes=minute, seconds=second)
+                expected = [float(c.minutes_until_close(when)) for c in compiled]
+                if minutes_to_close(arrays, when).tolist() != expected:
+                    self.fail(f"{when:%a %H:%M:%S}: ranking={minutes_to_close(arrays, when).tolist()} schedule={expected}")
+
+        always_open = MarketArrays.from_rows([(1, 37.65, 127.02, "mart", *schedules[4])])
+        self.assertEqual(minutes_to_close(always_open, monday.replace(hour=13)).tolist(), [MINUTES_PER_WEEK])
+        market = Market(open_days=schedules[4][0], open_time=schedules[4][1], close_time=schedules[4][2])
+        self.assertEqual(market.minutes_until_close(monday.replace(hour=13)), MINUTES_PER_WEEK)
+
+
+class RankingEquivalenceTests(MarketTestCase):
+    """무작위 마켓/영업시간/재고에서 rank_for_user 1위 == 이전 뷰 루프 선택."""
+
+    def setUp(self):
+        super().setUp()
+        rnd = random.Random(7)
+        days = ["월", "화", "수", "목", "금", "토", "일"]
+        for n in range(40):
+            ot = datetime.time(rnd.randrange(24), rnd.choice([0, 30]))
+            ct = ot if n % 10 == 0 else datetime.time(rnd.randrange(24), rnd.choice([0, 30]))  # 일부 24시간
+            market = make_market(
+                f"m{n}", 37.65 + rnd.uniform(-0.02, 0.02), 127.02 + rnd.uniform(-0.025, 0.025),
+                market_type=MarketType.TRAD if n % 3 == 0 else MarketType.MART,
+                open_days=",".join(d for d in days if rnd.random() < 0.8), open_time=ot, close_time=ct,
+            )
+            if market.market_type == MarketType.MART:
+                for ing in rnd.sample(self.ings, rnd.randrange(len(self.ings))):
+                    MarketStock.objects.create(market=market, ingredient=ing)
+        get_inventory_index().invalidate()
+        self.filt = MarketFilterSetting.objects.create(user=self.user)
+        # 마감 분 경계를 피한 시각(경계 처리는 OpeningHoursTests 에서 따로 확인)
+        base = timezone.make_aware(datetime.datetime(2026, 3, 2, 0, 7, 13))
+        self.instants = [base + datetime.timedelta(hours=h * 7 + d * 24) for d in range(7) for h in range(4)]
+
+    def _assert_same(self):
+        from .services.recommendation import rank_for_user
+
+        for pref in ("none", "mart", "trad"):
+            for dist_pref in ("within_1km", "any_2km"):
+                self.filt.type_preference, self.filt.distance_preference = pref, dist_pref
+                for when in self.instants:
+                    with self.subTest(pref=pref, dist=dist_pref, when=when):
+                        ranked = rank_for_user(self.user, filt=self.filt, k=1, when=when)
+                        self.assertEqual(ranked[0].market_id if ranked else None,
+                                         legacy_pick(self.user, self.filt, when))
+
+    def test_top_pick_matches_legacy_loop(self):
+        self._assert_same()
+
+    def test_mart_fallback_matches_legacy_loop(self):
+        # 어느 마트에도 없는 재료만 담긴 장바구니 → 마트 우선이면 전통시장으로 폴백
+        ShoppingListIngredient.objects.filter(shopping_list=self.shopping_list).delete()
+        ShoppingListIngredient.objects.create(
+            shopping_list=self.shopping_list, ingredient=Ingredient.objects.create(name="nowhere"),
+        )
+        self._assert_same()
+
+
+# =============================================================================
+# 재고 비트셋 인덱스 ↔ ORM 동등성 — user-012
+# =============================================================================
+class InventoryIndexEquivalenceTests(MarketTestCase):
+    def setUp(self):
+        super().setUp()
+        rnd = random.Random(11)
+        self.markets = [self.mart, self.mart2] + [make_market(f"x{n}") for n in range(8)]
+        for market in self.markets[1:]:
+            for ing in rnd.sample(self.ings, rnd.randrange(len(self.ings) + 1)):
+                MarketStock.objects.create(market=market, ingredient=ing)
+        get_inventory_index().invalidate()
+        self.rnd = rnd
+
+    def _orm_counts(self, cart_ids):
+        return {
+            m.id: MarketStock.objects.filter(market=m, ingredient_id__in=cart_ids).count()
+            for m in self.markets
+        }
+
+    def _assert_same(self):
+        from .utils import count_matches_by_market, match_ingredients
+
+        index = get_inventory_index()
+        market_ids = [m.id for m in self.markets]
+        for size in range(len(self.ings) + 1):
+            cart = self.rnd.sample(self.ings, size)
+            cart_ids = [i.id for i in cart]
+            with self.subTest(cart=cart_ids):
+                self.assertEqual(index.count_matches(market_ids, cart_ids), self._orm_counts(cart_ids))
+                self.assertEqual(count_matches_by_market(market_ids, cart_ids), self._orm_counts(cart_ids))
+                for m in self.markets:
+                    matched, unmatched = match_ingredients(m, {i.name for i in cart})
+                    stocked = set(MarketStock.objects.filter(market=m).values_list("ingredient__name", flat=True))
+                    self.assertEqual({x["name"] for x in matched}, {i.name for i in cart} & stocked)
+                    self.assertEqual({x["name"] for x in unmatched}, {i.name for i in cart} - stocked)
+
+    def test_fresh_index_matches_orm(self):
+        self._assert_same()
+
+    def test_incremental_updates_match_orm(self):
+        get_inventory_index().stock_mask(self.mart.id)  # 적재 후 변경분만 반영되는지 확인
+        with self.captureOnCommitCallbacks(execute=True):
+            MarketStock.objects.filter(market=self.mart, ingredient=self.ings[0]).delete()
+            MarketStock.objects.create(market=self.mart, ingredient=self.ings[5])
+            MarketStock.objects.filter(market=self.markets[3]).delete()
+        self._assert_same()
+
+    def test_ranking_without_index_uses_db_aggregate(self):
+        from .services import recommendation
+
+        items = {i.id: i.name for i in self.ings[:4]}
+        with_index = recommendation.rank_for_user(self.user, shopping_items=items)
+        with mock.patch.object(recommendation, "INVENTORY_INDEX_ENABLED", False), \
+                mock.patch.object(recommendation, "get_inventory_index") as index, \
+                self.assertNumQueries(3):  # 필터, 후보 마켓, 매칭수 집계
+            without_index = recommendation.rank_for_user(self.user, shopping_items=items)
+        index.assert_not_called()
+        self.assertEqual(without_index, with_index)
+
+
+
+class OpenAIClientTests(SimpleTestCase):
+    def test_client_is_created_on_first_use_only(self):
+        from food import utils as food_utils
+        from . import utils
+
+        for module in (utils, food_utils):
+            with self.subTest(module=module.__name__), mock.patch.object(module, "_openai_client", None), \
+                    mock.patch.object(module, "OpenAI") as openai:
+                openai.assert_not_called()
+                self.assertIs(module.get_openai_client(), module.get_openai_client())
+                openai.assert_called_once()
+
+# =============================================================================
+# 오프라인 보행 그래프 — user-020
+# =============================================================================
+class OfflineGraphBudgetTests(SimpleTestCase):
+    def setUp(self):
+        from .services.pedestrian_graph import PedestrianGraph
+
+        # 40×40 격자(약 11m 간격) + 격자와 끊긴 노드 2개 → 도착점까지 가려면 격자 전체를 탐색
+        n, step = 40, 0.0001
+        lat = [37.65 + i * step for i in range(n) for _ in range(n)]
+        lng = [127.02 + j * step for _ in range(n) for j in range(n)]
+        edges = [(i * n + j, i * n + j + 1) for i in range(n) for j in range(n - 1)]
+        edges += [(i * n + j, (i + 1) * n + j) for i in range(n - 1) for j in range(n)]
+        lat += [37.65 - 0.0002, 37.65 - 0.0003]
+        lng += [127.02, 127.02]
+        edges.append((n * n, n * n + 1))
+        self.graph = PedestrianGraph.from_edges(lat, lng, edges)
+        self.start, self.end = (37.651, 127.021), (37.65 - 0.0003, 127.02)
+
+    def test_search_stops_at_deadline(self):
+        from .services.pedestrian_graph import NoRoute, RouteTimeout
+
+        with self.assertRaises(NoRoute):
+            self.graph.route(*self.start, *self.end)
+        with self.assertRaises(RouteTimeout):
+            self.graph.route(*self.start, *self.end, timeout=0)
+        self.assertGreater(self.graph.route(*self.start, 37.652, 127.022, timeout=0)["distance_m"], 0)  # 짧은 탐색은 그대로
+
+    def test_provider_passes_timeout(self):
+        from .services import routing
+
+        with mock.patch.object(routing, "get_pedestrian_graph", return_value=self.graph):
+            with self.assertRaisesMessage(routing.RoutingError, "시간 초과"):
+                routing.OfflineGraphProvider().route(*self.start, *self.end, timeout=0)
+
+    def test_load_failure_is_remembered(self):
+        from .services import pedestrian_graph as pg
+
+        with mock.patch.object(pg, "PEDESTRIAN_GRAPH_PATH", "/nonexistent/seoul.osm.bz2"), \
+                mock.patch.object(pg, "_graph", None), mock.patch.object(pg, "_graph_error", None), \
+                mock.patch.object(pg.PedestrianGraph, "load", side_effect=OSError("missing")) as load, \
+                self.assertLogs(pg.log, "ERROR"):
+            for _ in range(3):
+                with self.assertRaisesMessage(pg.GraphError, "missing"):
+                    pg.get_pedestrian_graph()
+            self.assertEqual(load.call_count, 1)
+
+            load.side_effect, load.return_value = None, self.graph
+            with mock.patch.object(pg, "PEDESTRIAN_GRAPH_RETRY_S", 0):
+                self.assertIs(pg.get_pedestrian_graph(), self.graph)
+            self.assertEqual(load.call_count, 2)
+
+
+class OsmImportTests(SimpleTestCase):
+    OSM = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="37.6500" lon="127.0200"/>
+  <node id="2" lat="37.6505" lon="127.0200"><tag k="amenity" v="bench"/></node>
+  <node id="3" lat="37.6510" lon="127.0200"/>
+  <node id="4" lat="37.6510" lon="127.0210"/>
+  <node id="9" lat="37.7000" lon="127.1000"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="footway"/></way>
+  <way id="11"><nd ref="3"/><nd ref="4"/><tag k="highway" v="motorway"/></way>
+  <way id="12"><nd ref="3"/><nd ref="99"/><tag k="highway" v="footway"/></way>
+  <relation id="20"><member type="way" ref="10" role=""/></relation>
+</osm>
+"""
+
+    def test_keeps_only_walkable_way_nodes(self):
+        import gzip
+        import tempfile
+
+        from .services.pedestrian_graph import PedestrianGraph
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "extract.osm.gz")
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                f.write(self.OSM)
+            graph = PedestrianGraph.from_osm(path)
+        # 노드 4(차도 전용), 9(way 없음), 99(파일에 없음)는 제외
+        self.assertEqual((graph.n_nodes, graph.n_edges), (3, 4))
+        self.assertEqual(sorted(graph.lat.tolist()), [37.65, 37.6505, 37.651])
+        route = graph.route(37.65, 127.02, 37.651, 127.02)
+        self.assertAlmostEqual(route["distance_m"], 111, delta=2)
+
+    def test_parsed_elements_are_released(self):
+        import tempfile
+
+        from .services import pedestrian_graph as pg
+
+        iterparse, roots = pg.ET.iterparse, []
+
+        def capture_root(*args, **kwargs):
+            events = iterparse(*args, **kwargs)
+            first = next(events)
+            roots.append(first[1])
+            yield first
+            yield from events
+
+        body = "".join(f'<node id="{i}" lat="37.65" lon="127.02"><tag k="a" v="b"/></node>' for i in range(1, 20001))
+        with tempfile.NamedTemporaryFile("w", suffix=".osm") as f:
+            f.write(f"<osm>{body}</osm>")
+            f.flush()
+            with mock.patch.object(pg.ET, "iterparse", capture_root):
+                held = [len(roots[0]) for _ in pg._iter_osm(f.name, "node")]
+        self.assertEqual(len(held), 20000)
+        self.assertLess(max(held), 1000)   # 루트에는 파서가 미리 읽은 한 덩어리 분량만(전체가 쌓이지 않음)
+
+
+# =============================================================================
+# 추천 마켓 API 커서/위치 오류 — user-011
+# =============================================================================
+class NearestMarketsApiTests(MarketTestCase):
+    url = "/market/api/nearest/"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        super().setUp()
+        cache.clear()  # 랭킹 세션/선계산 결과 초기화
+
+    def test_cursor_pages(self):
+        first = self.client.get(self.url, {"k": 1}).json()
+        self.assertEqual((first["total"], len(first["items"])), (3, 1))
+        second = self.client.get(self.url, {"k": 1, "cursor": first["next_cursor"]}).json()
+        self.assertTrue(second["ok"])
+        self.assertNotEqual(second["items"][0]["id"], first["items"][0]["id"])
+
+    def test_malformed_cursor_is_400_and_expired_is_410(self):
+        for cursor in ("garbage", "abc:", ":3", "abc:-1"):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(self.url, {"cursor": cursor}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"cursor": "0123456789abcdef:0"}).status_code, 410)
+
+    def test_user_without_location_is_400(self):
+        self.user.latitude = self.user.longitude = None
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get("/market/nearest/").status_code, 400)
+
+
+# =============================================================================
+# 주변 장소 랜덤 API — user-014
+# =============================================================================
+class NearbyRandomApiTests(MarketTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        super().setUp()
+        cache.clear()  # 영업 중 풀 초기화
+        for n in range(12):
+            NearbyPlace.objects.create(
+                market=self.mart, name=f"place{n}", category="cafe", open_days="월,화,수,목,금,토,일",
+                open_time=datetime.time(0, 0), close_time=datetime.time(0, 0), distance_m=50 + n * 20,
+            )
+        self.url = f"/market/nearby/{self.mart.id}/random/"
+
+    def _names(self, **params):
+        response = self.client.get(self.url, params)
+        return [p["name"] for p in response.json()["items"]], response["Cache-Control"]
+
+    def test_same_seed_same_places_and_cacheable(self):
+        names, cache_control = self._names(seed=3141592653)
+        self.assertEqual(len(names), 3)
+        self.assertEqual(self._names(seed=3141592653)[0], names)
+        self.assertTrue(cache_control.startswith("private, max-age="))
+
+    def test_seeds_vary_and_unseeded_is_not_cached(self):
+        self.assertGreater(len({tuple(self._names(seed=s)[0]) for s in range(1, 9)}), 1)
+        self.assertEqual(self._names()[1], "no-store")
+
+
+# =============================================================================
+# 추천/경로 선계산 지문 — user-015
+# =============================================================================
+class PrecomputeFingerprintTests(MarketTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        super().setUp()
+        cache.clear()
+        self.far = make_market("far", 37.75, 127.12)   # 약 14km: 후보 셀 밖
+
+    def _precompute(self):
+        from .services import precompute
+
+        with mock.patch.object(precompute, "route_user_to_market", return_value={"path": [], "distance_m": 140,
+                                                                                  "duration_s": 120}), \
+                mock.patch.object(precompute, "travel_info_for", return_value=(2, 140, 2)), \
+                mock.patch.object(precompute, "rank_for_user", wraps=precompute.rank_for_user) as rank:
+            entry = precompute.precompute_for_user(self.user.id)
+        return entry, rank.call_count
+
+    def test_same_fingerprint_reuses_entry(self):
+        from .services.precompute import load_precomputed
+
+        entry, ranked = self._precompute()
+        self.assertEqual((entry["market_id"], ranked), (self.mart.id, 1))
+        self.assertEqual(self._precompute(), (entry, 0))
+        self.assertEqual(load_precomputed(self.user), entry)
+
+    def test_unrelated_stock_changes_keep_entry(self):
+        from .services.precompute import load_precomputed
+
+        entry, _ = self._precompute()
+        MarketStock.objects.create(market=self.far, ingredient=self.ings[1])    # 다른 지역
+        MarketStock.objects.create(market=self.mart2, ingredient=self.ings[5])  # 장바구니에 없는 재료
+        self.assertEqual(load_precomputed(self.user), entry)
+
+    def test_candidate_stock_cart_and_filter_changes_invalidate(self):
+        from .services.precompute import load_precomputed
+
+        self._precompute()
+        MarketStock.objects.create(market=self.mart2, ingredient=self.ings[3])
+        self.assertIsNone(load_precomputed(self.user))
+
+        self._precompute()
+        ShoppingListIngredient.objects.create(shopping_list=self.shopping_list, ingredient=self.ings[5])
+        self.assertIsNone(load_precomputed(self.user))
+
+        self._precompute()
+        MarketFilterSetting.objects.filter(user=self.user).update(type_preference="trad")
+        self.assertIsNone(load_precomputed(self.user))
+
+
+# =============================================================================
+# 추천 화면 선계산 폴백 — user-016
+# =============================================================================
+class NearestMarketFallbackTests(MarketTestCase):
+    def test_closed_precomputed_top_uses_fresh_ranking_for_plan(self):
+        from . import views
+        from .services.planner import ShoppingPlan
+        from .services.ranking import RankedMarket
+
+        closed = make_market("closed", 37.6501, 127.0201, open_days="")
+        stale = {
+            "market_id": closed.id, "travel": (1, 20, 1),
+            "ranked": [tuple(RankedMarket(closed.id, 20, 3, 0, False)),
+                       tuple(RankedMarket(self.mart.id, 140, 2, 0, False))],
+        }
+        with mock.patch.object(views, "load_precomputed", return_value=stale), \
+                mock.patch.object(views, "travel_info_for", return_value=(2, 140, 2)), \
+                mock.patch.object(views, "plan_for_user", return_value=ShoppingPlan()) as plan:
+            response = self.client.get("/market/nearest/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["market"], self.mart)
+        ranked = plan.call_args.kwargs["ranked"]
+        self.assertNotIn(closed.id, [r.market_id for r in ranked])
+        self.assertEqual(ranked[0].market_id, self.mart.id)
+
+
+class NearestMarketPlanNoteTests(MarketTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        super().setUp()
+        cache.clear()
+        MarketStock.objects.create(market=self.mart2, ingredient=self.ings[3])
+        get_inventory_index().invalidate()
+
+    def test_full_cover_says_everything(self):
+        response = self.client.get("/market/nearest/")
+        plan = response.context["shopping_plan"]
+        self.assertEqual((len(plan["stops"]), plan["uncovered"]), (2, []))
+        self.assertContains(response, "장바구니를 모두 살 수 있어요")
+
+    def test_partial_cover_lists_uncovered_items(self):
+        ShoppingListIngredient.objects.create(shopping_list=self.shopping_list, ingredient=self.ings[5])
+        response = self.client.get("/market/nearest/")
+        self.assertEqual(response.context["shopping_plan"]["uncovered"], ["ing5"])
+        self.assertNotContains(response, "장바구니를 모두 살 수 있어요")
+        self.assertContains(response, "장바구니 대부분을 살 수 있어요")
+        self.assertContains(response, '<span class="pill">ing5</span>', html=True)
+
+    def test_plan_api_requires_location(self):
+        self.user.latitude = self.user.longitude = None
+        self.user.save()
+        response = self.client.get("/market/api/plan/")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "location required")
+
+
+# =============================================================================
+# 백그라운드 DB 쓰기 — user-010
+# =============================================================================
+class BackgroundWriteTests(TransactionTestCase):
+    ROUTE = MapDirectionRoutingTests.ROUTE
+
+    def test_matrix_and_isochrone_refreshes_do_not_lock(self):
+        from accounts.models import Address
+        from .models import AddressWalk, MarketIsochrone
+        from .services import route_store
+        from .services.background import wait_serialized
+
+        user = CustomUser.objects.create_user("bg", password="pw", nickname="bg")
+        with mock.patch.object(route_store, "route_walk", return_value=dict(self.ROUTE)), \
+                self.assertNoLogs("market.services.background", "ERROR"):
+            with transaction.atomic():  # 커밋 후 주소 20 + 마켓 8 곳의 재계산이 한꺼번에 대기열로
+                for n in range(20):
+                    Address.objects.create(user=user, address="a", addr_level1="서울", addr_level2="도봉구",
+                                           latitude=37.65 + n * 0.0005, longitude=127.02)
+                for n in range(8):
+                    make_market(f"bg{n}", 37.65 + n * 0.001, 127.02)
+            wait_serialized(timeout=30)
+        self.assertEqual(MarketIsochrone.objects.count(), 8)
+        self.assertEqual(AddressWalk.objects.count(), 20 * 8)
+
+    def test_lock_errors_are_retried(self):
+        from django.db import OperationalError
+        from .services import background
+
+        job = mock.Mock(__name__="job", side_effect=[OperationalError("database table is locked")] * 2 + ["done"])
+        with mock.patch.object(background.time, "sleep"), self.assertLogs(background.log, "WARNING"):
+            self.assertEqual(background.run_serialized(job).result(timeout=5), "done")
+        self.assertEqual(job.call_count, 3)
+
+        other = mock.Mock(__name__="other", side_effect=OperationalError("no such table: x"))
+        with self.assertLogs(background.log, "ERROR"), self.assertRaises(OperationalError):
+            background.run_serialized(other).result(timeout=5)
+        other.assert_called_once()
+
+    def test_save_without_coordinates_skips_lookup_and_refresh(self):
+        from . import signals
+        from .services.background import wait_serialized
+
+        market = make_market("bg-save")
+        wait_serialized(timeout=30)  # 생성 시 대기열에 들어간 재계산 완료
+        with mock.patch.object(signals, "run_serialized") as queued:
+            market.name = "renamed"
+            with self.assertNumQueries(1):  # UPDATE 만(이전 좌표 조회 없음)
+                market.save(update_fields=["name"])
+            queued.assert_not_called()
+            market.latitude += 0.001
+            market.save()
+            self.assertEqual(queued.call_count, 2)  # 보행 행렬 + 등시선
+
+
+# =============================================================================
+# 경로 공급자 체인 — user-008
+# =============================================================================
+class RoutingChainTests(SimpleTestCase):
+    def test_provider_must_implement_route(self):
+        from .services.routing import RoutingProvider
+
+        class Incomplete(RoutingProvider):
+            name = "incomplete"
+
+        for cls in (RoutingProvider, Incomplete):
+            with self.subTest(cls=cls.__name__), self.assertRaises(TypeError):
+                cls()
+
+    def test_chain_falls_through_to_next_provider(self):
+        from .services.routing import HaversineProvider, RoutingChain, RoutingError, RoutingProvider
+
+        class Down(RoutingProvider):
+            name = "down"
+
+            def route(self, start_lat, start_lng, end_lat, end_lng, timeout):
+                raise RoutingError("down")
+
+        chain = RoutingChain([Down(), HaversineProvider()])
+        route = chain.route(37.65, 127.02, 37.651, 127.021)
+        self.assertEqual((route["provider"], route["estimated"]), ("haversine", True))
+        self.assertEqual(chain.stats()["down"]["failures"], 1)
+
+    def test_kakao_car_route_is_estimated_and_not_stored(self):
+        from .services import route_store, routing
+
+        kakao = {"routes": [{"result_code": 0, "summary": {"distance": 900},
+                             "sections": [{"roads": [{"vertexes": [127.02, 37.65, 127.021, 37.651]}]}]}]}
+        chain = routing.RoutingChain([routing.KakaoProvider(), routing.HaversineProvider()])
+        market = Market(id=1, latitude=37.651, longitude=127.021)
+        with mock.patch.object(routing, "get_directions_api", return_value=kakao), \
+                mock.patch.object(route_store, "route_walk", chain.route), \
+                mock.patch.object(route_store.RouteCache.objects, "filter") as rows, \
+                mock.patch.object(route_store.RouteCache.objects, "update_or_create") as save:
+            rows.return_value.first.return_value = None
+            route = route_store.get_route(37.65, 127.02, market)
+        self.assertEqual((route["provider"], route["estimated"], route["distance_m"]), ("kakao", True, 900))
+        save.assert_not_called()
+
+
+# =============================================================================
+# 위경도 격자 후보 조회 — user-001
+# =============================================================================
+class MarketGridNearTests(TestCase):
+    def test_neighbour_cell_across_boundary_is_included(self):
+        # 위도 37.70 은 셀 경계: 사용자는 아래 셀, 마켓은 22m 위 셀
+        from .services.spatial_index import grid_cell_of
+
+        market = make_market("edge", 37.7001, 127.0051)
+        self.assertNotEqual(market.grid_cell, grid_cell_of(37.6999, 127.0051))
+        self.assertIn(market, Market.objects.near(37.6999, 127.0051, 100))
+
+    def test_far_cells_are_excluded(self):
+        far = make_market("far", 37.75, 127.10)
+        self.assertNotIn(far, Market.objects.near(37.65, 127.02, 1000))
+
+    def test_empty_grid_cell_is_always_included(self):
+        legacy = make_market("legacy", 37.75, 127.10)
+        Market.objects.filter(id=legacy.id).update(grid_cell="")
+        self.assertIn(legacy, Market.objects.near(37.65, 127.02, 1000))
+
+    def test_coordinate_update_moves_grid_cell(self):
+        market = make_market("moving", 37.65, 127.02)
+        market.latitude, market.longitude = 37.75, 127.10
+        market.save(update_fields=["latitude", "longitude"])
+        market.refresh_from_db()
+        self.assertIn(market, Market.objects.near(37.75, 127.10, 100))
+        self.assertNotIn(market, Market.objects.near(37.65, 127.02, 1000))
+
+    def test_no_market_within_radius_is_missed(self):
+        from .services.spatial_index import haversine_m
+
+        rnd = random.Random(3)
+        markets = [make_market(f"m{n}", 37.6 + rnd.random() * 0.1, 127.0 + rnd.random() * 0.1) for n in range(60)]
+        for _ in range(20):
+            lat, lng, radius = 37.6 + rnd.random() * 0.1, 127.0 + rnd.random() * 0.1, rnd.choice([300, 1000, 2000])
+            expected = {m.id for m in markets if haversine_m(lat, lng, m.latitude, m.longitude) <= radius}
+            found = set(Market.objects.near(lat, lng, radius).values_list("id", flat=True))
+            self.assertLessEqual(expected, found)
+
+
+# =============================================================================
+# 보행 경로 저장소 — user-005
+# =============================================================================
+class RouteStoreTests(MarketTestCase):
+    ROUTE = {"path": [{"lat": 37.65, "lng": 127.02}, {"lat": 37.651, "lng": 127.021}],
+             "distance_m": 180, "duration_s": 150, "provider": "tmap", "estimated": False}
+
+    def setUp(self):
+        from .services.route_store import reset_route_store_stats
+
+        super().setUp()
+        reset_route_store_stats()
+
+    def _get(self, lat=37.65, lng=127.02):
+        from .services import route_store
+
+        with mock.patch.object(route_store, "route_walk", return_value=dict(self.ROUTE)) as walk:
+            route = route_store.get_route(lat, lng, self.mart)
+        return route, walk.call_count
+
+    def test_miss_then_hit_from_same_snapped_cell(self):
+        from .models import RouteCache
+        from .services.route_store import route_store_stats
+
+        self.assertEqual(self._get()[1], 1)
+        route, calls = self._get(37.65001, 127.02001)   # 같은 스냅 셀
+        self.assertEqual(calls, 0)
+        self.assertEqual((route["distance_m"], route["duration_s"], route["path"]),
+                         (180, 150, self.ROUTE["path"]))
+        self.assertEqual(route_store_stats(), {"hit": 1, "miss": 1})
+        self.assertEqual(RouteCache.objects.count(), 1)
+
+    def test_other_cell_misses(self):
+        self._get()
+        self.assertEqual(self._get(37.66, 127.03)[1], 1)
+
+    def test_expired_row_is_refreshed(self):
+        from .models import RouteCache
+        from .services.route_store import ROUTE_STORE_TTL_S
+
+        self._get()
+        RouteCache.objects.update(fetched_at=timezone.now() - datetime.timedelta(seconds=ROUTE_STORE_TTL_S + 1))
+        self.assertEqual(self._get()[1], 1)
+        self.assertEqual(RouteCache.objects.count(), 1)
+        self.assertGreater(RouteCache.objects.get().fetched_at,
+                           timezone.now() - datetime.timedelta(seconds=ROUTE_STORE_TTL_S))
+
+
+# =============================================================================
+# 외부 API 공용 HTTP 클라이언트 — user-007
+# =============================================================================
+class PooledHttpClientTests(SimpleTestCase):
+    def setUp(self):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        from .integrations import http_client
+
+        peers = self.peers = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive
+
+            def do_GET(self):
+                peers.append(self.client_address)
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.http_client = http_client
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(http_client.close_clients)
+        http_client.close_clients()
+
+    def test_same_host_reuses_client_and_connection(self):
+        client = self.http_client.get_client(f"{self.base}/a")
+        self.assertIs(self.http_client.get_client(f"{self.base}/b?x=1"), client)
+        self.assertIsNot(self.http_client.get_client("https://apis.openapi.sk.com/tmap"), client)
+
+        for n in range(5):
+            self.assertEqual(self.http_client.get(f"{self.base}/{n}").text, "ok")
+        self.assertEqual(len(self.peers), 5)
+        self.assertEqual(len(set(self.peers)), 1)   # TCP 연결 1개로 5건
+
+    def test_close_clients_drops_pool(self):
+        client = self.http_client.get_client(self.base)
+        self.http_client.close_clients()
+        self.assertTrue(client.is_closed)
+        self.assertIsNot(self.http_client.get_client(self.base), client)
+
+
+# =============================================================================
+# 재고 변경 로그 증분 동기화 API — user-019
+# =============================================================================
+class StockChangesApiTests(MarketTestCase):
+    url = "/market/api/stock-changes/"
+
+    def setUp(self):
+        super().setUp()
+        # MarketTestCase 재고 3건(ADD) + 추가 2건 + 삭제 1건
+        MarketStock.objects.create(market=self.mart2, ingredient=self.ings[4])
+        MarketStock.objects.create(market=self.mart2, ingredient=self.ings[5])
+        MarketStock.objects.filter(market=self.mart, ingredient=self.ings[0]).delete()
+        self.log = list(StockChange.objects.order_by("seq").values_list("seq", "market_id", "ingredient_id", "action"))
+
+    def _all_pages(self, **params):
+        seen, since, pages = [], params.pop("since", 0), 0
+        while True:
+            data = self.client.get(self.url, {"since": since, **params}).json()
+            seen += [(c["seq"], c["market_id"], c["ingredient_id"], c["action"]) for c in data["changes"]]
+            pages += 1
+            since = data["next"]
+            if not data["has_more"]:
+                return seen, since, pages
+
+    def test_pages_cover_log_in_order_without_gaps(self):
+        self.assertEqual(len(self.log), 6)
+        seen, last, pages = self._all_pages(limit=4)
+        self.assertEqual(seen, self.log)
+        self.assertEqual((last, pages), (self.log[-1][0], 2))
+        self.assertEqual(self.client.get(self.url, {"since": last}).json()["changes"], [])
+
+    def test_resume_from_cursor_sees_only_new_changes(self):
+        _, last, _ = self._all_pages()
+        MarketStock.objects.create(market=self.mart, ingredient=self.ings[3])
+        data = self.client.get(self.url, {"since": last}).json()
+        self.assertEqual([(c["ingredient_id"], c["action"]) for c in data["changes"]], [(self.ings[3].id, "add")])
+        self.assertEqual(data["head"], data["next"])
+
+    def test_market_filter_and_bad_params(self):
+        seen, _, _ = self._all_pages(limit=1, market=self.mart2.id)
+        self.assertEqual(seen, [c for c in self.log if c[1] == self.mart2.id])
+        for params in ({"since": "x"}, {"limit": "many"}, {"market": "a"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+# =============================================================================
+# 걸어서 N분 필터(도보 등시선) — user-021
+# =============================================================================
+class IsochroneWalkFilterTests(MarketTestCase):
+    def setUp(self):
+        super().setUp()
+        self.filt, _ = MarketFilterSetting.objects.get_or_create(user=self.user)
+        self.near5 = make_market("near5", 37.6505, 127.0205)
+        self._isochrone(self.near5, 5)
+        self._isochrone(self.mart, 10)                       # 직선 140m 지만 도보로는 10분 구간
+        self._isochrone(self.trad, 15, lat=37.66, lng=127.03)  # 사용자 셀은 등시선 밖
+        # mart2: 등시선 없음 → 직선거리 범위로 판단
+
+    def _isochrone(self, market, minutes, lat=37.65, lng=127.02):
+        from .models import MarketIsochrone
+        from .services.isochrone import ISOCHRONE_CELL_DEG, pack_cells
+
+        i, j = math.floor(lat / ISOCHRONE_CELL_DEG), math.floor(lng / ISOCHRONE_CELL_DEG)
+        MarketIsochrone.objects.create(
+            market=market, cell_deg=ISOCHRONE_CELL_DEG, cells_blob=pack_cells(np.array([[i, j, minutes]])),
+            source=MarketIsochrone.Source.ESTIMATE,
+        )
+
+    def _ranked(self, pref):
+        from .services.isochrone import get_isochrone_index
+        from .services.recommendation import rank_for_user
+
+        self.filt.distance_preference = pref
+        self.filt.save()
+        get_isochrone_index().invalidate()
+        return {r.market_id for r in rank_for_user(self.user, filt=self.filt)}
+
+    def test_walk_bands_filter_by_isochrone(self):
+        Pref = MarketFilterSetting.DistancePref
+        # 5분(직선 400m): near5 만. mart 는 10분 구간, mart2/trad 는 거리 밖
+        self.assertEqual(self._ranked(Pref.WALK_5), {self.near5.id})
+        # 10분(직선 800m): mart 추가, 등시선 없는 mart2 는 직선거리로 포함, trad 는 등시선 밖이라 제외
+        self.assertEqual(self._ranked(Pref.WALK_10), {self.near5.id, self.mart.id, self.mart2.id})
+
+    def test_plain_distance_filter_ignores_isochrones(self):
+        self.assertEqual(self._ranked(MarketFilterSetting.DistancePref.WITHIN_1KM),
+                         {self.near5.id, self.mart.id, self.mart2.id, self.trad.id})
+
+
+# =============================================================================
+# 일괄 점수 계산 = 요청별 계산 — user-022
+# =============================================================================
+class ScoringBatchEquivalenceTests(SimpleTestCase):
+    def _requests(self, rng, n):
+        reqs = []
+        for g in range(n):
+            m = int(rng.integers(0, 12)) if g else 0   # 후보 없는 요청도 포함
+            reqs.append(ScoringBatch.single(
+                rng.integers(1, 10_000, m),
+                rng.integers(0, 5, m) * 100,            # 거리 동점이 많도록
+                rng.integers(0, 2, m),
+                rng.integers(0, 3, m) * rng.integers(0, 2),   # 일부 요청은 마트 일치 0 → 폴백
+                rng.choice([5.0, 20.0, 600.0, 10080.0], m),
+                type_pref=['none', 'mart', 'trad'][g % 3], cart_size=int(rng.integers(0, 4)),
+            ))
+        return reqs
+
+    def test_batch_top_k_matches_per_request(self):
+        rng = np.random.default_rng(22)
+        weights = DEFAULT_WEIGHTS.with_(closing_soon=1000.0)
+        for _ in range(20):
+            reqs = self._requests(rng, int(rng.integers(1, 8)))
+            batch = ScoringBatch.concat(reqs)
+            scored = score(batch, weights)
+            offsets = np.cumsum([0] + [len(r) for r in reqs])
+            for k in (None, 1, 3):
+                per_group = top_k_per_group(batch, scored.score, k)
+                self.assertEqual(len(per_group), batch.n_groups)   # 끝의 빈 요청은 목록에 없음
+                for g, req in enumerate(reqs):
+                    single = score(req, weights)
+                    np.testing.assert_allclose(scored.score[offsets[g]:offsets[g + 1]], single.score)
+                    np.testing.assert_array_equal(scored.fallback[offsets[g]:offsets[g + 1]], single.fallback)
+                    got = per_group[g] - offsets[g] if g < len(per_group) else np.empty(0, dtype=np.int64)
+                    self.assertEqual(got.tolist(), top_k(single.score, k).tolist())
+
+
+# =============================================================================
+# 추천 기록 재생 명령 — user-023
+# =============================================================================
+class ReplayCommandTests(MarketTestCase):
+    def setUp(self):
+        super().setUp()
+        for ing in self.ings[1:4]:
+            MarketStock.objects.create(market=self.mart2, ingredient=ing)
+        self.shopping_list.market = self.mart2      # 실제로는 재료가 다 있는 mart2 를 고름
+        self.shopping_list.save()
+        get_inventory_index().invalidate()
+
+    def _run(self, *args):
+        out = io.StringIO()
+        call_command("replay_recommendations", *args, stdout=out)
+        return out.getvalue()
+
+    def test_reports_latency_and_engine_difference(self):
+        # A: 기본(선호 없음 → 가장 가까운 mart), B: 선호 없음에도 커버리지 반영 → mart2
+        out = self._run("--b", '{"coverage_prefs": ["none", "mart"]}', "--no-travel")
+        self.assertIn("1 requests", out)
+        self.assertRegex(out, r"\[a\] p50=[\d.]+ ms .* queries avg=[\d.]+ max=\d+  no candidate=0")
+        self.assertRegex(out, r"\[b\] p50=[\d.]+ ms ")
+        self.assertIn("chosen market changed: 1/1 (100.0%)", out)
+        self.assertIn("historical hit rate a=0.0% b=100.0% (labelled 1)", out)
+
+    def test_same_weights_change_nothing(self):
+        out = self._run()
+        self.assertIn("chosen market changed: 0/1 (0.0%)", out)
+
+    def test_empty_period_and_bad_weights(self):
+        self.assertIn("재생할 기록이 없습니다.", self._run("--since", "2999-01-01"))
+        with self.assertRaises(CommandError):
+            self._run("--b", "{not json")
+        with self.assertRaises(CommandError):
+            self._run("--a", '{"no_such_weight": 1}')
@@ -7,8 +7,11 @@ urlpatterns = [
     path("filter/recipe", edit_market_filter_recipe, name="edit_market_filter_recipe"),
     path("filter/ingredient", edit_market_filter_ingredient, name="edit_market_filter_ingredient"),
     path('nearest/', nearest_market_view, name = "nearest_market"),
+    path("api/nearest/", nearest_markets_api, name="nearest_markets_api"),
+    path("api/plan/", shopping_plan_api, name="shopping_plan_api"),
     path('direction/', map_direction_view, name='map_direction'),
     path('arrival/<int:shoppinglist_id>/', market_arrival_view, name='market_arrival'),
+    path("api/arrival-ping/", arrival_ping_api, name="arrival_ping_api"),
     path("arrival/<int:shoppinglist_id>/save", save_selected_ingredients_view, name="save_selected_ingredients"),
     path("tip", ingredient_tip_page, name="ingredient_tip_page"),
     path("api/ingredient-tip", ingredient_tip_api, name="ingredient_tip_api"),
@@ -16,4 +19,6 @@ urlpatterns = [
     path('secret-input/<int:market_id>/', secret_input_view, name='secret_input'),
     path('success/<int:shoppinglist_id>/', shopping_success_view, name='shopping_success'),
     path("nearby/<int:market_id>/random/", nearby_places_random_api, name="nearby_random"),
+    path("api/stock-changes/", stock_changes_api, name="stock_changes_api"),
+    path("stream/<int:market_id>/stock/", stock_stream_view, name="stock_stream"),
 ]
\ No newline at end of file
@@ -1,12 +1,16 @@
-import datetime, math, re, requests
+import datetime, math, re
 from math import radians, cos, sin, sqrt, atan2
 from typing import Iterable, Optional, Sequence, Tuple, Set, Dict, Any, List
 from django.conf import settings
 from django.core.cache import cache
+from django.db.models import Count
 from django.utils import timezone
 from django.conf import settings
 from openai import OpenAI
 from .models import Market, MarketStock, ShoppingList, ShoppingListIngredient
+from .integrations import http_client
+from .services.inventory_index import get_inventory_index
+from .services.stock_events import cart_version, stock_version
 from food.models import Ingredient
 
 # 한국 요일 약어
@@ -29,7 +33,7 @@ def _cache_key(prefix: str, *parts: Any) -> str:
     return prefix + ":" + ":".join(str(p) for p in parts)
 
 
-def get_directions_api(start_x: float, start_y: float, end_x: float, end_y: float) -> Optional[Dict[str, Any]]:
+def get_directions_api(start_x: float, start_y: float, end_x: float, end_y: float, timeout: float = 3) -> Optional[Dict[str, Any]]:
     """
     Kakao Mobility Directions API. (자동차 경로 기반이지만, 폴리라인 추출 용도)
     - 캐시: 60초
@@ -52,7 +56,7 @@ def get_directions_api(start_x: float, start_y: float, end_x: float, end_y: floa
     }
 
     try:
-        resp = requests.get(url, headers=headers, params=params, timeout=3)
+        resp = http_client.get(url, headers=headers, params=params, timeout=timeout)
         if resp.status_code == 200:
             data = resp.json()
             cache.set(ck, data, 60)
@@ -83,17 +87,22 @@ def get_walking_directions(start_lat: float, start_lng: float, end_lat: float, e
         return []
 
 
-def get_travel_info(user_lat: float, user_lng: float, market_lat: float, market_lng: float) -> Tuple[int, int, int]:
+def get_travel_info(user_lat: float, user_lng: float, market_lat: float, market_lng: float, *, market: Optional[Market] = None) -> Tuple[int, int, int]:
     """
     (예상시간(분), 거리(m), 적립포인트) 반환.
-    - 1순위: TMAP 보행자 경로 (distance_m, duration_s)
+    - 경로 공급자 체인(TMAP → Kakao → 오프라인 보행 그래프(설정 시) → Haversine 추정, 지연 예산/서킷 브레이커 적용)
+      market 을 넘기면 요청 메모 → 보행 경로 저장소(RouteCache)를 거쳐 조회
     - 폴백: Haversine + 80m/분 가정
     """
     distance_m, duration_s = 0, 0
     try:
-        # 지연 import: 의존성 최소화
-        from .integrations.tmap_client import get_pedestrian_route
-        route = get_pedestrian_route(user_lat, user_lng, market_lat, market_lng)
+        # 함수 안 import: services.routing 이 이 모듈을 import 하므로(순환 방지)
+        if market is not None:
+            from .services.route_memo import memoized_route
+            route = memoized_route(user_lat, user_lng, market)
+        else:
+            from .services.routing import route_walk
+            route = route_walk(user_lat, user_lng, market_lat, market_lng)
         distance_m = int(route.get("distance_m", 0))
         duration_s = int(route.get("duration_s", 0))
     except Exception:
@@ -115,9 +124,9 @@ def get_travel_info(user_lat: float, user_lng: float, market_lat: float, market_
 # =============================================================================
 # B. 장바구니/재고 매칭
 # =============================================================================
-def get_latest_shopping_ingredients(user) -> Set[str]:
+def get_latest_shopping_items(user) -> Dict[int, str]:
     """
-    유저의 is_done=False 최신 장바구니의 재료명 set. 없으면 빈 set.
+    유저의 is_done=False 최신 장바구니의 {재료 id: 재료명}. 없으면 빈 dict.
     """
     qs = (
         ShoppingList.objects
@@ -126,34 +135,97 @@ def get_latest_shopping_ingredients(user) -> Set[str]:
     )
     sl = qs.first()
     if not sl:
-        return set()
-    names = (
+        return {}
+    rows = (
         ShoppingListIngredient.objects
         .filter(shopping_list=sl)
-        .values_list('ingredient__name', flat=True)
+        .values_list('ingredient_id', 'ingredient__name')
     )
-    return set(names)
+    return dict(rows)
+
+
+def get_latest_shopping_ingredients(user) -> Set[str]:
+    """
+    유저의 is_done=False 최신 장바구니의 재료명 set. 없으면 빈 set.
+    """
+    return set(get_latest_shopping_items(user).values())
+
+
+def count_matches_by_market(market_ids: Iterable[int], ingredient_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    여러 마켓의 장바구니 재료 일치 개수를 한 번의 집계 쿼리로 계산.
+    재고 비트셋 인덱스를 끈 경우(INVENTORY_INDEX_ENABLED=False)의 DB 경로.
+    반환: {market_id: 일치 개수} (일치 0인 마켓도 0으로 포함)
+    """
+    market_ids = list(market_ids)
+    ingredient_ids = list(ingredient_ids)
+    counts = dict.fromkeys(market_ids, 0)
+    if not market_ids or not ingredient_ids:
+        return counts
+
+    rows = (
+        MarketStock.objects
+        .filter(market_id__in=market_ids, ingredient_id__in=ingredient_ids)
+        .values('market_id')
+        .annotate(n=Count('ingredient_id', distinct=True))
+        .values_list('market_id', 'n')
+    )
+    counts.update(rows)
+    return counts
 
 
 def match_ingredients(market: Market, shopping_ingredients_set: Set[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
-    마켓 재고와 유저 장바구니 재료를 비교.
+    마켓 재고와 유저 장바구니 재료를 비교(재고 비트셋 인덱스 AND, 재고 DB 조회 없음).
     반환: (matched[], unmatched[]) with {'name', 'image'}
     """
-    stocks = MarketStock.objects.filter(market=market).select_related('ingredient')
-    stocked_names = {s.ingredient.name for s in stocks}
-
     ings = Ingredient.objects.filter(name__in=shopping_ingredients_set)
     img_map = {i.name: (i.image.url if i.image else None) for i in ings}
+    ids_by_name: Dict[str, List[int]] = {}
+    for i in ings:
+        ids_by_name.setdefault(i.name, []).append(i.id)
 
+    index = get_inventory_index()
+    stock = index.stock_mask(market.id)
     matched, unmatched = [], []
     for name in sorted(shopping_ingredients_set):
         item = {"name": name, "image": img_map.get(name)}
-        (matched if name in stocked_names else unmatched).append(item)
-
+        (matched if stock & index.mask_of(ids_by_name.get(name, ())) else unmatched).append(item)
     return matched, unmatched
 
 
+MATCH_CACHE_TTL_S = getattr(settings, "MATCH_CACHE_TTL_S", 60 * 10)
+
+
+def match_ingredients_cached(market: Market, user) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    유저 최신 장바구니 × 마켓 재료 매칭(match_ingredients) 결과 캐시.
+    키에 (마켓 재고 버전, 장바구니 버전)을 포함 → 재고/장바구니가 바뀌면 자동으로 새 키
+    (버전은 services.stock_events 가 DB 에서 읽음 → 다른 워커가 바꾼 재고/장바구니도 바로 반영).
+    """
+    sl_id = (
+        ShoppingList.objects
+        .filter(user=user, is_done=False)
+        .order_by('-created_at')
+        .values_list('id', flat=True)
+        .first()
+    )
+    if sl_id is None:
+        return [], []
+
+    key = f"match:{market.id}:{sl_id}:{stock_version(market.id)}:{cart_version(sl_id)}"
+    result = cache.get(key)
+    if result is None:
+        names = set(
+            ShoppingListIngredient.objects
+            .filter(shopping_list_id=sl_id)
+            .values_list('ingredient__name', flat=True)
+        )
+        result = match_ingredients(market, names)
+        cache.set(key, result, MATCH_CACHE_TTL_S)
+    return result
+
+
 # =============================================================================
 # C. 사용자 활동/ 마켓 영업정보
 # =============================================================================
@@ -262,7 +334,16 @@ def reset_cart_session(request) -> None:
 AI_MODEL_TIPS = getattr(settings, "AI_MODEL_TIPS", "gpt-4o")
 AI_TEMPERATURE_DEFAULT = getattr(settings, "AI_TEMPERATURE_DEFAULT", 0.6)
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+_openai_client: Optional[OpenAI] = None
+
+
+def get_openai_client() -> OpenAI:
+    """OpenAI 클라이언트(첫 호출 시 생성). 모듈 import 만으로는 API 키가 필요 없음."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    return _openai_client
+
 
 def generate_tip_text(name: str, followup: str | None = None) -> str:
     """
@@ -293,7 +374,7 @@ def generate_tip_text(name: str, followup: str | None = None) -> str:
             "색/향 → 크기 → 손상 → 보관법 순서로, 각 줄은 접두사 없이 '주제: 설명' 문장으로."
         )
 
-    resp = client.chat.completions.create(
+    resp = get_openai_client().chat.completions.create(
         model=AI_MODEL_TIPS,
         messages=[
             {"role": "system", "content": system_prompt},
@@ -331,7 +412,7 @@ def generate_arrival_praises(market_name: str, dong: str | None, distance_m: int
         "두 줄은 줄바꿈으로 구분하고, 형식 규칙을 반드시 지켜."
     )
 
-    resp = client.chat.completions.create(
+    resp = get_openai_client().chat.completions.create(
         model=AI_MODEL_TIPS,
         messages=[
             {"role": "system", "content": system_prompt},
@@ -1,4 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_POST
@@ -6,13 +7,23 @@ from django.views.decorators.cache import never_cache
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.db.models import Sum, Value, IntegerField
 from django.db.models.functions import Coalesce
 from django.core.cache import cache
-import json, random, logging
+import json, math, random, logging
 from decimal import Decimal
 from .services.route_service import route_user_to_market
+from .services.recommendation import CursorError, CursorExpired, decode_cursor, load_page, rank_for_user, serialize_page, start_session
+from .services.polyline import encode_route_path
+from .services.walking_matrix import travel_info_for
+from .services.stock_log import STOCK_LOG_PAGE_MAX, changes_since, head_seq, serialize_changes
+from .services.stock_stream import open_stock_stream
+from .services.precompute import load_precomputed, ranked_of, schedule_precompute
+from .services.geofence import arrived_market
+from .services.planner import plan_for_user, serialize_plan
+from .services.nearby_pool import get_open_pool, sample as sample_nearby, serialize as serialize_nearby
 from .models import *
 from food.models import Ingredient
 from point.models import UserPoint
@@ -56,6 +67,9 @@ def edit_market_filter_recipe(request):
         if changed:
             filt.save()
 
+        # 다음 화면(가까운 마켓)용 추천/경로를 미리 계산
+        schedule_precompute(request.user)
+
         return redirect("food:confirm_shopping_list")
 
     # GET: 설정 폼 렌더
@@ -97,6 +111,9 @@ def edit_market_filter_ingredient(request):
         if changed:
             filt.save()
 
+        # 다음 화면(가까운 마켓)용 추천/경로를 미리 계산
+        schedule_precompute(request.user)
+
         return redirect("food:ingredient_result")
 
     # GET: 설정 폼 렌더
@@ -123,86 +140,39 @@ def nearest_market_view(request):
     4) 최종 선택 마켓의 이동 시간/거리/포인트, 재료 매칭 결과를 템플릿에 전달
     """
     user = request.user
-    user_lat, user_lng = user.latitude, user.longitude
-
-    # 사용자 필터
-    filt, _ = MarketFilterSetting.objects.get_or_create(user=user)
-    min_m, max_m, min_strict = filt.distance_range_m
-
-    def in_range(d):
-        return (d > min_m if min_strict else d >= min_m) and d <= max_m
-
-    # 내 장바구니 재료 set (교집합 개수로 가중치)
-    shopping_ingredients_set = get_latest_shopping_ingredients(user)
-
-    # 후보 수집: (영업 중 + 거리 범위)
-    candidates = []
-    for m in Market.objects.all():
-        if m.latitude is None or m.longitude is None:
-            continue
-        d_m = int(round(get_distance_km(user_lat, user_lng, m.latitude, m.longitude) * 1000))
-        if not in_range(d_m):
-            continue
-        if not is_open_now(m.open_days, m.open_time, m.close_time):
-            continue
-
-        # 장바구니와의 재료 매칭 개수
-        if shopping_ingredients_set:
-            match_count = MarketStock.objects.filter(
-                market=m, ingredient__name__in=shopping_ingredients_set
-            ).count()
-        else:
-            match_count = 0
+    if user.latitude is None or user.longitude is None:
+        return HttpResponseBadRequest("location required")
+
+    # 장바구니 확정/필터 저장 때 미리 계산해 둔 결과가 아직 유효하면 그대로 사용
+    pre = load_precomputed(user)
+    nearest = None
+    if pre is not None and pre["market_id"] is not None:
+        nearest = Market.objects.filter(id=pre["market_id"]).first()
+        if nearest is not None and not nearest.is_open_now():
+            nearest = None
+
+    if nearest is not None:
+        ranked = ranked_of(pre)
+        expected_time, distance_m, point_earned = pre["travel"]
+    else:
+        # 후보 수집 → 정렬: 격자 인덱스로 반경 셀의 마켓만 배열로 적재 후 벡터 연산으로 한 번에
+        #   (영업 중 + 거리 범위) → 타입 우선 → (마트 우선 시) 매칭수 ↓ → 거리 ↑, 마트→전통시장 폴백 포함
+        #   선계산 결과가 없거나 1위가 그새 닫았으면 새로 계산(아래 여러 마켓 동선도 이 랭킹 사용)
+        ranked = rank_for_user(user)
+
+        # 후보 없으면 안내 화면
+        if not ranked:
+            return render(request, 'market/nearest_market.html', {
+                "market": None, "distance_m": 0, "expected_time": -1,
+                "closing_in_minutes": 0, "point_earned": 0,
+            })
 
-        candidates.append((m, d_m, match_count))   # (마켓, 거리(m), 재료일치수)
+        nearest = Market.objects.get(id=ranked[0].market_id)
 
-    # 후보 없으면 안내 화면
-    if not candidates:
-        return render(request, 'market/nearest_market.html', {
-            "market": None, "distance_m": 0, "expected_time": -1,
-            "closing_in_minutes": 0, "point_earned": 0,
-        })
-
-    # 정렬 로직: 타입 우선 → (마트 우선 시) 매칭수 ↓ → 거리 ↑
-    type_pref = (filt.type_preference or "none")  # 'mart' | 'trad' | 'none'
-
-    def type_priority(market_type: str) -> int:
-        mt = (market_type or "").lower()
-        if type_pref == "mart":
-            return 0 if mt == "mart" else 1
-        if type_pref == "trad":
-            return 0 if mt == "trad" else 1
-        return 0
-
-    # 폴백: 'mart' 우선인데 모든 마트가 매칭 0이면 → trad 중 최단거리 선택
-    selected_market = None
-    if type_pref == "mart":
-        marts = [t for t in candidates if (t[0].market_type or "").lower() == "mart"]
-        if marts and all(t[2] == 0 for t in marts):
-            trads = [t for t in candidates if (t[0].market_type or "").lower() == "trad"]
-            if trads:
-                trads.sort(key=lambda x: x[1])  # 거리 오름차순
-                selected_market = trads[0][0]
-
-    # 일반 정렬: (타입 우선), 마트 우선이면 매칭수 내림차순도 포함
-    if selected_market is None:
-        def sort_key(tup):
-            m, dist, match_cnt = tup
-            if type_pref == "mart":
-                return (type_priority(m.market_type), -match_cnt, dist)
-            else:
-                return (type_priority(m.market_type), dist)
-        candidates.sort(key=sort_key)
-        selected_market = candidates[0][0]
-
-    nearest = selected_market
-
-    # 이동/포인트 계산 (TMAP 보행자 + 폴백)
-    expected_time, distance_m, point_earned = get_travel_info(
-        user_lat, user_lng, nearest.latitude, nearest.longitude
-    )
+        # 이동/포인트: 주소×마켓 보행 행렬 → 없으면 TMAP 보행자 + 폴백
+        expected_time, distance_m, point_earned = travel_info_for(user, nearest)
     # 마감까지 남은 시간(분)
-    closing_in_minutes = minutes_until_close(nearest.open_time, nearest.close_time)
+    closing_in_minutes = nearest.minutes_until_close()
 
     # 내 최신 장바구니에 마켓 연결(한 번만)
     shopping_list = user.shoppinglist_set.order_by('-created_at').first()
@@ -210,8 +180,16 @@ def nearest_market_view(request):
         shopping_list.market = nearest
         shopping_list.save(update_fields=['market'])
 
-    # 재료 매칭 결과
-    matched_ingredients, unmatched_ingredients = match_ingredients(nearest, shopping_ingredients_set)
+    # 재료 매칭 결과 (재고/장바구니 버전 키 캐시)
+    matched_ingredients, unmatched_ingredients = match_ingredients_cached(nearest, user)
+
+    # 한 곳에서 다 못 사면: 장바구니 전체를 덮는 여러 마켓 동선(지연 예산 내)
+    shopping_plan = None
+    if unmatched_ingredients:
+        shopping_items = get_latest_shopping_items(user)
+        plan = plan_for_user(user, shopping_items=shopping_items, ranked=ranked)
+        if len(plan.stops) > 1:
+            shopping_plan = serialize_plan(plan, shopping_items)
 
     items_count = cart_items_count(user)
     total_point = get_user_total_point(user)
@@ -226,9 +204,68 @@ def nearest_market_view(request):
         "unmatched_ingredients": unmatched_ingredients,
         "cart_items_count": items_count,
         "total_point": total_point,
+        "shopping_plan": shopping_plan,
     })
 
 
+@require_GET
+@login_required
+def nearest_markets_api(request):
+    """
+    [추천 마켓 상위 K API]
+    - nearest_market_view 와 같은 필터/정렬/폴백 규칙의 상위 k개(기본 5, 최대 20)
+    - 응답의 next_cursor 로 다음 후보 페이지 조회(?cursor=...) → 랭킹을 다시 계산하지 않음
+    - 경로(TMAP) 조회 없이 직선거리 기준
+    - 위치 미설정 / 잘못된 커서 → 400, 만료된 커서 → 410(프론트는 커서 없이 처음부터 다시 요청)
+    """
+    user = request.user
+    if user.latitude is None or user.longitude is None:
+        return JsonResponse({"ok": False, "error": "location required"}, status=400)
+    try:
+        k = min(max(int(request.GET.get("k", 5)), 1), 20)
+    except ValueError:
+        return HttpResponseBadRequest("invalid k")
+
+    shopping_items = get_latest_shopping_items(user)
+    cursor = request.GET.get("cursor")
+    try:
+        if cursor:
+            token, offset = decode_cursor(cursor)
+        else:
+            pre = load_precomputed(user)
+            ranked = ranked_of(pre) if pre is not None else rank_for_user(user, shopping_items=shopping_items)
+            token, offset = start_session(user, ranked), 0
+        page, next_cursor, total = load_page(user, token, offset, k)
+    except CursorExpired as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=410)
+    except CursorError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+    return JsonResponse({
+        "ok": True,
+        "total": total,
+        "items": serialize_page(page, offset, cart_size=len(shopping_items)),
+        "next_cursor": next_cursor,
+    })
+
+
+@require_GET
+@login_required
+def shopping_plan_api(request):
+    """
+    [여러 마켓 장보기 동선 API]
+    - 장바구니 전체를 덮는 영업 중 마켓 조합(최대 PLANNER_MAX_STOPS 곳) + 도보 방문 순서
+    - 지연 예산(PLANNER_BUDGET_MS) 안에서 최선 해, optimal=False 면 예산 초과로 탐색 중단
+    - 위치 미설정 → 400
+    """
+    user = request.user
+    if user.latitude is None or user.longitude is None:
+        return JsonResponse({"ok": False, "error": "location required"}, status=400)
+    shopping_items = get_latest_shopping_items(user)
+    plan = plan_for_user(user, shopping_items=shopping_items)
+    return JsonResponse({"ok": True, **serialize_plan(plan, shopping_items)})
+
+
 # =============================================================================
 # C. 지도/경로 보기 (TMAP 보행자)
 # =============================================================================
@@ -244,14 +281,22 @@ def map_direction_view(request):
     market_id = request.GET.get('market_id')
     market = get_object_or_404(Market, id=market_id)
 
-    # 1) 경로(보행자) 조회: polyline/거리/시간
-    route = route_user_to_market(user, market)  # {'path': [{lat,lng},...], 'distance_m': int, 'duration_s': int}
-    polyline = route["path"]
+    # 1) 경로(보행자) 조회: polyline/거리/시간 — 선계산 결과가 이 마켓 것이고 유효하면 재사용
+    pre = load_precomputed(user)
+    if pre is not None and pre["market_id"] == market.id:
+        route = pre["route"]
+    else:
+        pre = None
+        route = route_user_to_market(user, market)  # {'path': [{lat,lng},...], 'distance_m': int, 'duration_s': int}
+    polyline = encode_route_path(route["path"])  # 단순화 + 인코딩 문자열 (static/js/polyline.js 로 디코딩)
 
     # 2) 포인트 등 산출(유저↔마켓)
-    expected_time, distance_m, point_earned = get_travel_info(
-        user.latitude, user.longitude, market.latitude, market.longitude
-    )
+    if pre is not None:
+        expected_time, distance_m, point_earned = pre["travel"]
+    else:
+        expected_time, distance_m, point_earned = get_travel_info(
+            user.latitude, user.longitude, market.latitude, market.longitude, market=market
+        )
 
     # 3) 최신 장바구니에 마켓 연결(없을 때만)
     shopping_list = user.shoppinglist_set.order_by('-created_at').first()
@@ -259,16 +304,15 @@ def map_direction_view(request):
         shopping_list.market = market
         shopping_list.save()
 
-    # 4) 재료 매칭 결과
-    shopping_ingredients_set = get_latest_shopping_ingredients(user)
-    matched_ingredients, unmatched_ingredients = match_ingredients(market, shopping_ingredients_set)
+    # 4) 재료 매칭 결과 (재고/장바구니 버전 키 캐시)
+    matched_ingredients, unmatched_ingredients = match_ingredients_cached(market, user)
 
     items_count = cart_items_count(user)
     total_point = get_user_total_point(user)
 
     # 5) 영업 여부
-    is_open = is_open_now(market.open_days, market.open_time, market.close_time)
-    closing_in_minutes = minutes_until_close(market.open_time, market.close_time) if is_open else 0
+    is_open = market.is_open_now()
+    closing_in_minutes = market.minutes_until_close() if is_open else 0
 
     # 5) 렌더
     context = {
@@ -278,7 +322,7 @@ def map_direction_view(request):
         'distance_m': distance_m,
         'point_earned': point_earned,
         'kakao_key': settings.KAKAO_JS_API_KEY,
-        'polyline': json.dumps(polyline),
+        'polyline': polyline,
         'matched_ingredients': matched_ingredients,
         'unmatched_ingredients': unmatched_ingredients,
         "cart_items_count": items_count,
@@ -301,7 +345,7 @@ log = logging.getLogger(__name__)
 def market_arrival_view(request, shoppinglist_id):
     """
     [마켓 도착 화면]
-    - 이동정보(분/미터/포인트)와 재료 매칭 결과 표시
+    - 이동정보(분/미터/포인트)와 재료 매칭 결과 표시 (이동정보는 주소×마켓 보행 행렬 우선)
     - AI 칭찬 문구는 실패 시 기본 2줄로 폴백
     - 매 요청마다 재계산/재생성 & 캐시 금지
     """
@@ -309,14 +353,11 @@ def market_arrival_view(request, shoppinglist_id):
     shopping_list = get_object_or_404(ShoppingList, id=shoppinglist_id, user=user)
     market = shopping_list.market
 
-    # 1) 이동정보는 매 요청마다 재계산
-    expected_time, distance_m, point_earned = get_travel_info(
-        user.latitude, user.longitude, market.latitude, market.longitude
-    )
+    # 1) 이동정보: 주소×마켓 보행 행렬 → 없으면 재계산
+    expected_time, distance_m, point_earned = travel_info_for(user, market)
 
-    # 2) 재료 매칭도 매 요청마다 실행
-    shopping_ingredients_set = get_latest_shopping_ingredients(user)
-    matched_ingredients, unmatched_ingredients = match_ingredients(market, shopping_ingredients_set)
+    # 2) 재료 매칭: 재고/장바구니가 바뀌었을 때만 재계산(버전 키 캐시)
+    matched_ingredients, unmatched_ingredients = match_ingredients_cached(market, user)
 
     items_count = cart_items_count(user)
     total_point = get_user_total_point(user)
@@ -361,6 +402,57 @@ def market_arrival_view(request, shoppinglist_id):
     return resp
 
 
+@login_required
+@require_POST
+def arrival_ping_api(request):
+    """
+    [도착 자동 감지 API]
+    - body: {"pings": [[lat, lng], ...]} (시간순) 또는 {"lat": .., "lng": ..}
+    - 지오펜스 격자 인덱스로만 판정(외부 API 없음), 도착이면 진행 중 장바구니에 arrived_at 기록
+    - 장바구니에 마켓이 정해져 있으면 그 마켓 도착만 인정
+    """
+    try:
+        body = json.loads(request.body or b"{}")
+        if not isinstance(body, dict):
+            raise TypeError("body must be an object")
+        pings = body.get("pings") or [[body["lat"], body["lng"]]]
+        pings = [(float(lat), float(lng)) for lat, lng in pings[-20:]]
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest("invalid pings")
+    # NaN/inf 는 float() 를 통과하지만 격자 계산(math.floor)에서 실패
+    if not all(math.isfinite(lat) and math.isfinite(lng) for lat, lng in pings):
+        return HttpResponseBadRequest("invalid pings")
+
+    # 대부분의 핑은 어느 지오펜스에도 안 걸림 → DB 조회 없이 바로 응답
+    if arrived_market(pings) is None:
+        return JsonResponse({"ok": True, "arrived": False})
+
+    shopping_list = (
+        ShoppingList.objects
+        .filter(user=request.user, is_done=False)
+        .order_by('-created_at')
+        .first()
+    )
+    if shopping_list is None:
+        return JsonResponse({"ok": True, "arrived": False})
+
+    market_id = arrived_market(pings, target_market_id=shopping_list.market_id)
+    if market_id is None:
+        return JsonResponse({"ok": True, "arrived": False})
+
+    if shopping_list.arrived_at is None:
+        shopping_list.arrived_at = timezone.now()
+        shopping_list.market_id = shopping_list.market_id or market_id
+        shopping_list.save(update_fields=["arrived_at", "market"])
+
+    return JsonResponse({
+        "ok": True,
+        "arrived": True,
+        "market_id": market_id,
+        "arrival_url": reverse("market:market_arrival", args=[shopping_list.id]),
+    })
+
+
 @login_required
 @require_POST
 def save_selected_ingredients_view(request, shoppinglist_id):
@@ -515,16 +607,9 @@ def shopping_success_view(request, shoppinglist_id):
     shopping_list = get_object_or_404(ShoppingList, id=shoppinglist_id, user=user)
     market = shopping_list.market
 
-    # 1) 주변 장소: 영업 중만 필터 → 랜덤 3개
-    places_qs = NearbyPlace.objects.filter(market=market)
-    open_places = []
-    for p in places_qs:
-        if is_open_now(p.open_days, p.open_time, p.close_time):
-            p.is_open = True
-            p.closing_in_minutes = minutes_until_close(p.open_time, p.close_time)
-            open_places.append(p)
-    random.shuffle(open_places)
-    nearby_sample = open_places[:3]
+    # 1) 주변 장소: 영업 중 풀(캐시)에서 거리/카테고리 가중 샘플 3개
+    pool, _ = get_open_pool(market.id)
+    nearby_sample = [serialize_nearby(e) for e in sample_nearby(pool, k=3)]
 
     total_steps = ActivityLog.objects.filter(user=user).aggregate(
         total_steps=Coalesce(Sum('steps'), Value(0), output_field=IntegerField())
@@ -542,10 +627,8 @@ def shopping_success_view(request, shoppinglist_id):
             "total_steps": total_steps,
         })
 
-    # 3) 이동정보(분/미터/포인트)
-    expected_time_min, distance_m, point_earned = get_travel_info(
-        user.latitude, user.longitude, market.latitude, market.longitude
-    )
+    # 3) 이동정보(분/미터/포인트): 주소×마켓 보행 행렬 → 없으면 TMAP/폴백
+    expected_time_min, distance_m, point_earned = travel_info_for(user, market)
 
     # 4) 걸음/칼로리
     steps = estimate_steps(distance_m)
@@ -590,20 +673,75 @@ def shopping_success_view(request, shoppinglist_id):
 def nearby_places_random_api(request, market_id: int):
     """
     [주변 장소 3개 랜덤 API]
-    - 영업 중인 곳만 추려서 3개 반환
+    - 영업 중 풀(다음 개점/마감 전환까지 캐시)에서 거리/카테고리 가중 샘플 3개
+    - ?seed= 가 있으면 같은 seed 는 같은 결과 → 풀이 유효한 동안 브라우저 캐시 허용
+      (새로고침 버튼은 seed 를 바꿔서 호출)
     """
     market = get_object_or_404(Market, id=market_id)
-    items = []
-    for p in NearbyPlace.objects.filter(market=market):
-        if is_open_now(p.open_days, p.open_time, p.close_time):
-            items.append({
-                "name": p.name,
-                "category": p.category,
-                "info": p.info,
-                "distance_m": p.distance_m,
-                "image_url": (p.image.url if p.image else ""),
-                "link_url": p.link_url or "",
-                "closing_in_minutes": minutes_until_close(p.open_time, p.close_time),
-            })
-    random.shuffle(items)
-    return JsonResponse({"ok": True, "items": items[:3]})
+    pool, ttl = get_open_pool(market.id)
+
+    seed = request.GET.get("seed")
+    rng = random.Random(f"{market.id}:{seed}") if seed else None
+    items = [serialize_nearby(e) for e in sample_nearby(pool, k=3, rng=rng)]
+
+    resp = JsonResponse({"ok": True, "items": items})
+    if seed:
+        resp["Cache-Control"] = f"private, max-age={ttl}"
+    else:
+        resp["Cache-Control"] = "no-store"
+    return resp
+
+
+# =============================================================================
+# I. 재고 변경 로그 API (증분 동기화)
+# =============================================================================
+@require_GET
+@login_required
+def stock_changes_api(request):
+    """
+    [재고 변경 API]
+    - ?since=<seq> 이후 변경을 seq 순으로(기본 500, 최대 STOCK_LOG_PAGE_MAX), ?market=<id> 로 마켓 한정
+    - 응답 next 를 다음 요청의 since 로 사용, has_more=False 가 될 때까지 반복
+    - since 없이 처음 동기화하는 소비자는 head 를 기준점으로 전체 재고를 한 번 읽은 뒤 이어서 받음
+    """
+    try:
+        since = max(int(request.GET.get("since", 0)), 0)
+        limit = min(max(int(request.GET.get("limit", 500)), 1), STOCK_LOG_PAGE_MAX)
+        market_id = int(request.GET["market"]) if request.GET.get("market") else None
+    except ValueError:
+        return HttpResponseBadRequest("invalid since/limit/market")
+
+    rows, has_more = changes_since(since, limit=limit, market_id=market_id)
+    return JsonResponse({
+        "ok": True,
+        "changes": serialize_changes(rows),
+        "next": rows[-1][0] if rows else since,
+        "has_more": has_more,
+        "head": head_seq(),
+    })
+
+
+# =============================================================================
+# J. 재고 실시간 푸시 (SSE)
+# =============================================================================
+@require_GET
+@login_required
+def stock_stream_view(request, market_id: int):
+    """
+    [재고 스트림]
+    - 지도/도착 화면이 EventSource 로 연결 → 이 마켓에서 내 장바구니 재료 재고가 바뀌면 바로 수신
+    - 연결 시 snapshot(현재 있음/없음), 이후 stock 이벤트, 주기적 하트비트
+    - 일정 시간 후 서버가 끊고 브라우저가 Last-Event-ID 로 재연결 → 놓친 변경만 재생
+    - 많은 동시 연결은 ASGI 배포 전제. WSGI 에서는 연결마다 스레드를 잡으므로 프로세스당 상한,
+      넘으면 첫 이벤트만 보내고 닫는 폴링 응답(브라우저가 retry 간격으로 재연결)
+    """
+    market = get_object_or_404(Market, id=market_id)
+    names = get_latest_shopping_items(request.user)
+    stream = open_stock_stream(
+        market.id, names, request.headers.get("Last-Event-ID"),
+        asynchronous=isinstance(request, ASGIRequest),
+    )
+    resp = StreamingHttpResponse(stream, content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"  # 프록시(nginx) 버퍼링 끄기
+    return resp
@@ -0,0 +1,43 @@
+// 지도/경로 화면: 현재 위치를 주기적으로 서버에 보내 마켓 도착을 자동 감지
+// <div id="arrival-ping" data-url="..." data-csrf="..."> 가 있는 페이지에서만 동작
+document.addEventListener("DOMContentLoaded", () => {
+  const el = document.getElementById("arrival-ping");
+  if (!el || !navigator.geolocation) return;
+
+  const SEND_INTERVAL_MS = 5000;
+  let pending = [];
+  let lastSent = 0;
+  let done = false;
+
+  async function flush() {
+    if (done || pending.length === 0) return;
+    const pings = pending;
+    pending = [];
+    lastSent = Date.now();
+    try {
+      const res = await fetch(el.dataset.url, {
+        method: "POST",
+        headers: { "Content-Type": "application/json", "X-CSRFToken": el.dataset.csrf },
+        body: JSON.stringify({ pings }),
+      });
+      if (!res.ok) return;
+      const data = await res.json();
+      if (data.arrived) {
+        done = true;
+        navigator.geolocation.clearWatch(watchId);
+        window.location.href = data.arrival_url;
+      }
+    } catch (e) {
+      console.error(e);
+    }
+  }
+
+  const watchId = navigator.geolocation.watchPosition(
+    (pos) => {
+      pending.push([pos.coords.latitude, pos.coords.longitude]);
+      if (Date.now() - lastSent >= SEND_INTERVAL_MS) flush();
+    },
+    (err) => console.warn("geolocation", err.message),
+    { enableHighAccuracy: true, maximumAge: 5000 }
+  );
+});
@@ -0,0 +1,28 @@
+// Encoded Polyline 디코더 (market/services/polyline.py encode() 와 짝)
+// "_p~iF~ps|U..." → [{ lat, lng }, ...]
+function decodePolyline(encoded, precision = 5) {
+  const factor = Math.pow(10, precision);
+  const points = [];
+  let index = 0;
+  let lat = 0;
+  let lng = 0;
+
+  const nextValue = () => {
+    let shift = 0;
+    let result = 0;
+    let b;
+    do {
+      b = encoded.charCodeAt(index++) - 63;
+      result |= (b & 0x1f) << shift;
+      shift += 5;
+    } while (b >= 0x20);
+    return result & 1 ? ~(result >> 1) : result >> 1;
+  };
+
+  while (encoded && index < encoded.length) {
+    lat += nextValue();
+    lng += nextValue();
+    points.push({ lat: lat / factor, lng: lng / factor });
+  }
+  return points;
+}
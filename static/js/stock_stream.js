@@ -0,0 +1,60 @@
+// 지도/도착 화면: 이 마켓의 장바구니 재료 재고 변경을 실시간(SSE)으로 받아 표시
+// <div id="stock-stream" data-url="..."> 가 있는 페이지에서만 동작, 재료 요소는 data-ingredient="재료명"
+document.addEventListener("DOMContentLoaded", () => {
+  const el = document.getElementById("stock-stream");
+  if (!el || !window.EventSource) return;
+
+  const note = document.getElementById("stock-stream-note");
+  let noteTimer = null;
+
+  function mark(name, inStock) {
+    document.querySelectorAll("[data-ingredient]").forEach((node) => {
+      if (node.dataset.ingredient !== name) return;
+      node.classList.toggle("is-in-stock", inStock);
+      node.classList.toggle("is-out-of-stock", !inStock);
+    });
+  }
+
+  function show(text) {
+    if (!note) return;
+    note.textContent = text;
+    note.hidden = false;
+    clearTimeout(noteTimer);
+    noteTimer = setTimeout(() => (note.hidden = true), 5000);
+  }
+
+  // 서버가 바쁘면 첫 이벤트만 보내고 닫음 → 브라우저가 retry 간격으로 재연결(폴링)
+  // 오류 응답(5xx 등)으로 연결이 완전히 닫히면 브라우저는 재연결하지 않음 → 잠시 후 직접 다시 연결
+  const ERROR_RETRY_MS = 30000;
+  let source = null;
+  let closed = false;
+
+  function connect() {
+    source = new EventSource(el.dataset.url);
+
+    // 연결/재연결 시 현재 상태 전체
+    source.addEventListener("snapshot", (e) => {
+      const data = JSON.parse(e.data);
+      data.in_stock.forEach((name) => mark(name, true));
+      data.out_of_stock.forEach((name) => mark(name, false));
+    });
+
+    // 개별 변경
+    source.addEventListener("stock", (e) => {
+      const data = JSON.parse(e.data);
+      if (!data.name) return;
+      mark(data.name, data.in_stock);
+      show(data.in_stock ? `${data.name} 재고가 들어왔어요.` : `${data.name} 재고가 방금 떨어졌어요.`);
+    });
+
+    source.addEventListener("error", () => {
+      if (!closed && source.readyState === EventSource.CLOSED) setTimeout(connect, ERROR_RETRY_MS);
+    });
+  }
+
+  connect();
+  window.addEventListener("pagehide", () => {
+    closed = true;
+    source.close();
+  });
+});